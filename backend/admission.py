@@ -0,0 +1,361 @@
+"""
+Admission Control - Concurrency cap, token budget and priority queue for agent work
+
+Every request that starts model calls (planning, research, drafting, reports, batches)
+asks for admission first. At most ADMISSION_MAX_CONCURRENT run at once; the rest wait
+in a priority queue, so an approval or a voice report overtakes queued research. A
+token bucket refilled at ADMISSION_TOKENS_PER_MINUTE keeps bursts under the model
+provider's rate limit: each admission reserves its class's estimated cost until it
+finishes, and the tokens actually used (reported by llm_backend) are charged as the
+calls complete.
+
+Overload is answered quickly instead of slowly. acquire() raises AdmissionRejected,
+which the services turn into 429 with Retry-After, when the queue is full, when the
+estimated wait is longer than ADMISSION_QUEUE_TIMEOUT or when the token budget cannot
+cover the request in time. A full queue drops its newest lowest-priority entry to make
+room for more important work. Nothing waits longer than ADMISSION_QUEUE_TIMEOUT, which
+bounds tail latency under bursts.
+
+AdmissionController blocks the calling thread; AsyncAdmissionController awaits.
+
+Priority classes, most important first: approval, report, research, batch
+
+Configuration:
+    ADMISSION_MAX_CONCURRENT      Agent requests running at once (default: 8)
+    ADMISSION_MAX_QUEUE           Requests waiting for a slot (default: 32)
+    ADMISSION_QUEUE_TIMEOUT       Longest wait for a slot in milliseconds (default: 15000)
+    ADMISSION_TOKENS_PER_MINUTE   Token budget refill rate (default: 0 = no token budget)
+    ADMISSION_TOKEN_BURST         Token bucket size (default: one minute of tokens)
+    ADMISSION_COST_<CLASS>        Estimated tokens per request, e.g. ADMISSION_COST_RESEARCH
+                                  (defaults: approval 6000, report 3000, research 10000,
+                                  batch 12000 per goal)
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import metrics
+
+PRIORITIES = ("approval", "report", "research", "batch")
+DEFAULT_COSTS = {"approval": 6000, "report": 3000, "research": 10000, "batch": 12000}
+MAX_RETRY_AFTER = 120
+
+
+class AdmissionRejected(RuntimeError):
+    """Raised when agent work is refused; the services answer 429 with Retry-After"""
+
+    def __init__(self, priority: str, reason: str, retry_after: float):
+        super().__init__(f"{priority} request rejected: {reason}")
+        self.priority = priority
+        self.reason = reason
+        self.retry_after = max(1, min(MAX_RETRY_AFTER, math.ceil(retry_after)))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "error": "Server busy, retry later",
+            "details": self.reason,
+            "priority": self.priority,
+            "retry_after": self.retry_after
+        }
+
+
+class Permit:
+    """An admission slot; release() or leaving the with block frees it (releasing twice is safe)"""
+
+    def __init__(self, controller: "_Admission", priority: str, tokens: int):
+        self.priority = priority
+        self.tokens = tokens
+        self.admitted_at = time.monotonic()
+        self.released = False
+        self._controller = controller
+
+    def release(self):
+        self._controller._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class _Waiter:
+    """A queued request; wake() is called when it is admitted or dropped"""
+
+    def __init__(self, rank: int, seq: int, priority: str, tokens: int, wake: Callable[[], None], timeout: float):
+        self.rank = rank
+        self.seq = seq
+        self.priority = priority
+        self.tokens = tokens
+        self.wake = wake
+        self.enqueued = time.monotonic()
+        self.deadline = self.enqueued + timeout
+        self.permit: Optional[Permit] = None
+        self.rejection: Optional[AdmissionRejected] = None
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.rank, self.seq) < (other.rank, other.seq)
+
+
+class _Admission:
+    """Queue, slot and token bookkeeping shared by the thread and asyncio controllers"""
+
+    def __init__(
+        self,
+        service: str,
+        max_concurrent: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        token_burst: Optional[float] = None
+    ):
+        self.service = service
+        self.max_concurrent = max(1, max_concurrent or int(os.getenv('ADMISSION_MAX_CONCURRENT', '8')))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv('ADMISSION_MAX_QUEUE', '32'))
+        if queue_timeout is None:
+            queue_timeout = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '15000')) / 1000
+        self.queue_timeout = queue_timeout
+        if tokens_per_minute is None:
+            tokens_per_minute = float(os.getenv('ADMISSION_TOKENS_PER_MINUTE', '0'))
+        self.tokens_per_minute = tokens_per_minute
+        self.token_rate = tokens_per_minute / 60
+        self.token_burst = token_burst or float(os.getenv('ADMISSION_TOKEN_BURST', '0')) or tokens_per_minute
+        self.costs = {
+            priority: int(os.getenv(f'ADMISSION_COST_{priority.upper()}', str(DEFAULT_COSTS[priority])))
+            for priority in PRIORITIES
+        }
+
+        self._lock = threading.Lock()
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._tokens = self.token_burst
+        self._refilled = time.monotonic()
+        self._hold: Optional[float] = None  # moving average of seconds a slot is held
+        self._decisions: Dict[str, Dict[str, int]] = {priority: {} for priority in PRIORITIES}
+
+        metrics.admission_in_flight.set_function(lambda: self._in_flight, service=service)
+        metrics.admission_queued.set_function(lambda: len(self._queue), service=service)
+        if self.token_rate:
+            metrics.admission_tokens.set_function(lambda: self._tokens, service=service)
+
+    def cost(self, priority: str, units: int = 1) -> int:
+        """Estimated tokens for a request of this class (units: goals in a batch)"""
+        return self.costs[priority] * max(1, units)
+
+    # ---- Token budget (caller holds the lock) ----
+
+    def _refill(self, now: float):
+        if self.token_rate:
+            self._tokens = min(self.token_burst, self._tokens + (now - self._refilled) * self.token_rate)
+        self._refilled = now
+
+    def _token_wait(self, tokens: float) -> float:
+        """Seconds until the bucket holds tokens (requests above the burst wait for a full bucket)"""
+        if not self.token_rate:
+            return 0.0
+        return max(0.0, (min(tokens, self.token_burst) - self._tokens) / self.token_rate)
+
+    def consume(self, tokens: int):
+        """Charge tokens a model call actually used (an llm_backend token listener)"""
+        if not self.token_rate:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = max(-self.token_burst, self._tokens - tokens)
+
+    # ---- Queue (caller holds the lock) ----
+
+    def _record(self, priority: str, result: str):
+        counts = self._decisions[priority]
+        counts[result] = counts.get(result, 0) + 1
+        metrics.admission.inc(service=self.service, priority=priority, result=result)
+
+    def _reject(self, priority: str, result: str, reason: str, retry_after: float) -> AdmissionRejected:
+        self._record(priority, result)
+        return AdmissionRejected(priority, reason, retry_after)
+
+    def _estimated_wait(self, position: int, tokens_ahead: float) -> float:
+        """Rough seconds until the position-th queued request (1 = next) is admitted"""
+        slot_wait = 0.0
+        excess = position - (self.max_concurrent - self._in_flight)
+        if excess > 0 and self._hold:
+            slot_wait = self._hold * excess / self.max_concurrent
+        token_wait = max(0.0, (tokens_ahead - self._tokens) / self.token_rate) if self.token_rate else 0.0
+        return max(slot_wait, token_wait)
+
+    def _admit(self, priority: str, tokens: int) -> Permit:
+        self._in_flight += 1
+        if self.token_rate:
+            self._tokens -= tokens
+        self._record(priority, "admitted")
+        return Permit(self, priority, tokens)
+
+    def _enter(self, priority: str, tokens: Optional[int], wake: Callable[[], None]) -> Tuple[Optional[Permit], Optional[_Waiter]]:
+        """Admit now, or queue and return the waiter; raises AdmissionRejected on overload"""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority class '{priority}' (expected one of {', '.join(PRIORITIES)})")
+        tokens = self.cost(priority) if tokens is None else tokens
+        rank = PRIORITIES.index(priority)
+
+        with self._lock:
+            self._refill(time.monotonic())
+            if not self._queue and self._in_flight < self.max_concurrent and not self._token_wait(tokens):
+                return self._admit(priority, tokens), None
+
+            if len(self._queue) >= self.max_queue:
+                victim = max(self._queue, key=lambda waiter: (waiter.rank, waiter.seq)) if self._queue else None
+                if victim is None or victim.rank <= rank:
+                    wait = self._estimated_wait(len(self._queue) + 1, sum(w.tokens for w in self._queue) + tokens)
+                    raise self._reject(priority, "rejected", "admission queue is full", wait)
+                # Make room by dropping the newest request of the least important class
+                self._queue.remove(victim)
+                heapq.heapify(self._queue)
+                victim.rejection = self._reject(victim.priority, "shed", "dropped for higher-priority work",
+                                                self._estimated_wait(len(self._queue) + 1, 0))
+                victim.wake()
+
+            ahead = [waiter for waiter in self._queue if waiter.rank <= rank]
+            wait = self._estimated_wait(len(ahead) + 1, sum(waiter.tokens for waiter in ahead) + tokens)
+            if wait > self.queue_timeout:
+                reason = "token budget exhausted" if self._token_wait(tokens) else "estimated wait too long"
+                raise self._reject(priority, "rejected", reason, wait)
+
+            waiter = _Waiter(rank, next(self._seq), priority, tokens, wake, self.queue_timeout)
+            heapq.heappush(self._queue, waiter)
+            self._record(priority, "queued")
+            return None, waiter
+
+    def _dispatch(self, now: float) -> Optional[float]:
+        """Admit queued requests in priority order; returns seconds until tokens allow the next"""
+        self._refill(now)
+        while self._queue and self._in_flight < self.max_concurrent:
+            head = self._queue[0]
+            wait = self._token_wait(head.tokens)
+            if wait:
+                return wait
+            heapq.heappop(self._queue)
+            head.permit = self._admit(head.priority, head.tokens)
+            metrics.admission_wait.observe(now - head.enqueued, service=self.service, priority=head.priority)
+            head.wake()
+        return None
+
+    def _poll(self, waiter: _Waiter) -> Tuple[Optional[Permit], float]:
+        """The waiter's permit, or how long to sleep before polling again; raises once it is dropped"""
+        with self._lock:
+            now = time.monotonic()
+            retry_in = self._dispatch(now)
+            if waiter.permit:
+                return waiter.permit, 0.0
+            if waiter.rejection:
+                raise waiter.rejection
+            remaining = waiter.deadline - now
+            if remaining <= 0:
+                self._queue.remove(waiter)
+                heapq.heapify(self._queue)
+                position = sum(1 for other in self._queue if other < waiter) + 1
+                raise self._reject(waiter.priority, "timed_out", "timed out waiting for capacity",
+                                   self._estimated_wait(position, waiter.tokens))
+            return None, min(remaining, retry_in) if retry_in else remaining
+
+    def _cancel(self, waiter: _Waiter):
+        """Withdraw a waiter whose caller went away; a permit granted meanwhile is released"""
+        with self._lock:
+            if waiter in self._queue:
+                self._queue.remove(waiter)
+                heapq.heapify(self._queue)
+                self._record(waiter.priority, "cancelled")
+        if waiter.permit:
+            waiter.permit.release()
+
+    def _release(self, permit: Permit):
+        with self._lock:
+            if permit.released:
+                return
+            permit.released = True
+            now = time.monotonic()
+            self._in_flight -= 1
+            if self.token_rate:
+                # Return the reservation; what the calls used was charged by consume()
+                self._refill(now)
+                self._tokens = min(self.token_burst, self._tokens + permit.tokens)
+            held = now - permit.admitted_at
+            self._hold = held if self._hold is None else 0.8 * self._hold + 0.2 * held
+            self._dispatch(now)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill(time.monotonic())
+            queued = {priority: 0 for priority in PRIORITIES}
+            for waiter in self._queue:
+                queued[waiter.priority] += 1
+            return {
+                "max_concurrent": self.max_concurrent,
+                "in_flight": self._in_flight,
+                "max_queue": self.max_queue,
+                "queued": queued,
+                "queue_timeout_ms": round(self.queue_timeout * 1000),
+                "avg_hold_ms": round(self._hold * 1000, 1) if self._hold is not None else None,
+                "token_budget": {
+                    "tokens_per_minute": self.tokens_per_minute,
+                    "burst": self.token_burst,
+                    "available": round(self._tokens)
+                } if self.token_rate else None,
+                "costs": dict(self.costs),
+                "decisions": {priority: dict(counts) for priority, counts in self._decisions.items()}
+            }
+
+
+class AdmissionController(_Admission):
+    """Admission for threaded servers: acquire() blocks until admitted or rejected"""
+
+    def acquire(self, priority: str, tokens: Optional[int] = None) -> Permit:
+        """
+        Wait for a slot (at most queue_timeout seconds)
+
+        Args:
+            priority: Priority class, one of PRIORITIES
+            tokens: Estimated tokens, defaults to the class cost
+
+        Returns:
+            Permit to release when the work is done (usable as a context manager)
+
+        Raises:
+            AdmissionRejected: The service is overloaded; retry after .retry_after seconds
+        """
+        event = threading.Event()
+        permit, waiter = self._enter(priority, tokens, event.set)
+        while permit is None:
+            permit, timeout = self._poll(waiter)
+            if permit is None:
+                event.wait(timeout)
+                event.clear()
+        return permit
+
+
+class AsyncAdmissionController(_Admission):
+    """Admission for the asyncio orchestrator: acquire() awaits instead of blocking"""
+
+    async def acquire(self, priority: str, tokens: Optional[int] = None) -> Permit:
+        """Wait for a slot on the running loop (see AdmissionController.acquire)"""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        permit, waiter = self._enter(priority, tokens, lambda: loop.call_soon_threadsafe(event.set))
+        try:
+            while permit is None:
+                permit, timeout = self._poll(waiter)
+                if permit is None:
+                    try:
+                        await asyncio.wait_for(event.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    event.clear()
+        except asyncio.CancelledError:
+            self._cancel(waiter)
+            raise
+        return permit
@@ -0,0 +1,636 @@
+"""
+Async Orchestration Engine - asyncio serving mode for the multi-agent workflow
+
+Same endpoints and JSON contract as orchestrator.py, served by Quart on one event loop.
+Agent calls use the async Anthropic and ElevenLabs clients, so an in-flight workflow is a
+suspended coroutine rather than a blocked OS thread: one process can hold hundreds of
+workflows waiting on Claude at the same time.
+
+Run with:
+    python async_orchestrator.py
+    hypercorn async_orchestrator:app --bind 0.0.0.0:5000
+
+Keep to one worker process per workflow store: each one rolls back the stages left running
+by the last shutdown as it starts, which would include the stages running in the others.
+
+Configuration:
+    ORCHESTRATOR_PORT   Port for `python async_orchestrator.py` (default: 5000)
+    JOB_WORKERS         Stage jobs running at once; the rest wait queued (default: 8)
+    DRAIN_TIMEOUT       Seconds running stages may take to finish on shutdown before
+                        they are cancelled (default: 30)
+"""
+from quart import Quart, request, jsonify, Response
+from quart_cors import cors
+import asyncio
+import os
+from dotenv import load_dotenv
+import pathlib
+
+# Import agent modules
+from researcher import datasets_loaded, load_suppliers_cached, preload_datasets
+from resilience import get_resilience_stats
+from model_router import get_route, get_route_stats
+from llm_backend import add_token_listener, get_backend
+from batch_runner import parse_batch_request, run_batch
+from workflow_store import new_workflow_state, open_workflow_store, recover_interrupted
+from workflow_stages import WorkflowStages, public_state
+from jobs import AsyncJobManager
+from plan_executor import execute_steps_async
+import effects
+import response_codec
+import metrics
+from workflow_events import WorkflowEventBus, encode_sse, format_event_id, heartbeat_seconds, parse_last_event_id
+from service_health import ServiceHealth, install_health_routes
+from admission import AdmissionRejected, AsyncAdmissionController
+from single_flight import AsyncSingleFlight
+
+# Load environment variables from root directory
+root_dir = pathlib.Path(__file__).parent.parent
+load_dotenv(root_dir / './env_files/api.env')
+
+app = Quart(__name__)
+app = cors(app, allow_origin="*", expose_headers=["ETag", "Location"])  # Enable CORS for frontend communication
+response_codec.install_quart(app)  # orjson + gzip/brotli for large responses
+metrics.install_quart(app, 'orchestrator-async')  # Prometheus metrics at /metrics
+
+# Workflows keyed by ID, one per submitted goal (persisted unless WORKFLOW_STORE=memory)
+workflow_store = open_workflow_store()
+
+# Stage jobs run as asyncio tasks on the serving loop
+job_manager = AsyncJobManager()
+
+# Stage transitions and job progress, pushed to dashboards over server-sent events
+workflow_events = WorkflowEventBus()
+
+# Concurrency cap, token budget and priority queue in front of every agent call
+admission = AsyncAdmissionController('orchestrator-async')
+add_token_listener(admission.consume)
+
+# Identical goals and reports requested at the same time share one set of agent calls
+single_flight = AsyncSingleFlight('orchestrator-async')
+
+
+def publish_state_change(workflow_id, version, changes):
+    """Store listener: every workflow change becomes a 'state' event (or 'deleted')"""
+    if version is None:
+        workflow_events.publish(workflow_id, "deleted", {"workflow_id": workflow_id})
+        workflow_events.discard(workflow_id)
+        return
+    workflow_events.publish(workflow_id, "state", {
+        "workflow_id": workflow_id,
+        "version": version,
+        "changes": public_state(dict(changes))
+    })
+
+
+workflow_store.add_listener(publish_state_change)
+job_manager.add_listener(
+    lambda job: workflow_events.publish(job.workflow_id, "job", job.to_dict(include_result=False))
+)
+metrics.watch_jobs('orchestrator-async', job_manager)
+metrics.sse_listeners.set_function(workflow_events.subscriber_count, service='orchestrator-async')
+metrics.workflows.set_function(workflow_store.count, service='orchestrator-async')
+
+# Configuration
+ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY')
+ELEVENLABS_API_KEY = os.getenv('ELEVENLABS_API_KEY')
+INVENTORY_FILE = os.getenv('INVENTORY_FILE', os.path.join(os.path.dirname(__file__), '..', 'data', 'Retail', 'retail_inventory_snapshot_30_10_25_cleaned.csv'))
+SALES_FILE = os.getenv('SALES_FILE', os.path.join(os.path.dirname(__file__), '..', 'data', 'Retail', 'retail_sales_data_01_09_2023_to_31_10_2025_cleaned.csv'))
+BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', '8'))
+BATCH_MAX_GOALS = int(os.getenv('BATCH_MAX_GOALS', '500'))
+PORT = int(os.getenv('ORCHESTRATOR_PORT', '5000'))
+DRAIN_TIMEOUT = float(os.getenv('DRAIN_TIMEOUT', '30'))
+
+# The same stages as orchestrator.py, driven on the event loop
+stages = WorkflowStages(
+    'orchestrator-async', workflow_store, admission, single_flight, execute_steps_async, effects.arun,
+    INVENTORY_FILE, SALES_FILE, ANTHROPIC_API_KEY, ELEVENLABS_API_KEY
+)
+
+# Liveness/readiness at /api/health/live and /api/health/ready
+health = ServiceHealth("orchestrator-async")
+health.add_check("datasets", lambda: datasets_loaded(INVENTORY_FILE, SALES_FILE))
+health.add_check("workflow_store", lambda: workflow_store.count() >= 0)
+# Once per start, before the server accepts requests
+health.add_startup("recover_interrupted", lambda: recover_interrupted(workflow_store))
+# Run once the server is listening (serve.py runs them before forking workers instead)
+health.add_warmup("datasets", lambda: preload_datasets(INVENTORY_FILE, SALES_FILE))
+health.add_warmup("model_backend", lambda: get_backend().warm_up())
+install_health_routes(app, health)
+
+
+@app.errorhandler(AdmissionRejected)
+async def admission_rejected(error):
+    """Overload: answer at once with 429 and when to retry"""
+    return jsonify(error.to_dict()), 429, {"Retry-After": str(error.retry_after)}
+
+
+@app.route('/', methods=['GET'])
+async def home():
+    """Root endpoint"""
+    return jsonify({
+        "message": "SourceBot Multi-Agent Orchestrator (async)",
+        "version": "1.0",
+        "endpoints": {
+            "health": "/api/health",
+            "ready": "/api/health/ready",
+            "metrics": "/metrics",
+            "submit_goal": "/api/submit-goal",
+            "execute_research": "/api/execute-research",
+            "approve_findings": "/api/approve-findings",
+            "get_voice_report": "/api/get-voice-report",
+            "get_text_report": "/api/get-text-report",
+            "get_state": "/api/state",
+            "resume": "/api/resume",
+            "workflows": "/api/workflows",
+            "workflow_events": "/api/workflows/<workflow_id>/events",
+            "jobs": "/api/jobs",
+            "routes": "/api/routes",
+            "batch": "/api/batch",
+            "reset": "/api/reset"
+        }
+    })
+
+
+@app.route('/api/health', methods=['GET'])
+async def health_check():
+    """Health check endpoint"""
+    return jsonify({
+        "status": "healthy",
+        "message": "Orchestrator is running",
+        "mode": "asyncio",
+        "in_flight_tasks": len(asyncio.all_tasks()),
+        "resilience": get_resilience_stats(),
+        "admission": admission.stats(),
+        "single_flight": single_flight.stats()
+    })
+
+
+async def get_workflow_id():
+    """Workflow ID from the query string or JSON body, or None (never another manager's latest)"""
+    data = await request.get_json(silent=True) or {}
+    return request.args.get('workflow_id') or data.get('workflow_id') or None
+
+
+def workflow_id_required():
+    return jsonify({"error": "workflow_id is required"}), 400
+
+
+def workflow_not_found(workflow_id):
+    return jsonify({"error": f"Workflow {workflow_id} not found"}), 404
+
+
+@app.route('/api/submit-goal', methods=['POST'])
+async def submit_goal():
+    """
+    Step 1: Receive goal from frontend and initiate planning
+    """
+    data = await request.get_json(silent=True) or {}
+    goal = data.get('goal')
+
+    if not goal:
+        return jsonify({"error": "Goal is required"}), 400
+
+    payload, status_code = await effects.arun(stages.submit_goal(goal))
+    return jsonify(payload), status_code
+
+
+def wants_sync():
+    """Clients can opt back into blocking behaviour with ?wait=true"""
+    return request.args.get('wait', '').lower() == 'true'
+
+
+async def dispatch_stage(workflow_id, stage):
+    """
+    Run a claimed stage as a background task and answer 202 with a job ID (or inline with
+    ?wait=true); admission and rollback as in orchestrator.dispatch_stage
+
+    The rollback is written from a worker thread and awaited before the job is reported
+    failed or cancelled, so a client retrying on that report finds the workflow rolled back.
+
+    Args:
+        workflow_id: Workflow the stage belongs to
+        stage: StageRun from one of the stages' claims
+    """
+    def rollback():
+        return asyncio.to_thread(workflow_store.update, workflow_id, **stage.rollback)
+
+    try:
+        permit = await admission.acquire(stage.priority)
+    except (AdmissionRejected, asyncio.CancelledError):
+        await rollback()
+        raise
+
+    if wants_sync():
+        try:
+            with permit:
+                payload, status_code = await effects.arun(stage.runner(None))
+        except (Exception, asyncio.CancelledError):
+            await rollback()
+            raise
+        if status_code >= 400:
+            metrics.errors.inc(service='orchestrator-async', stage=stage.kind)
+        return jsonify(payload), status_code
+
+    async def run(job):
+        try:
+            with permit:
+                payload, _ = await effects.arun(stage.runner(job))
+        except (Exception, asyncio.CancelledError):
+            await rollback()
+            raise
+        return payload
+
+    def cancelled(job):
+        permit.release()
+        if not job.started_at:
+            # Cancelled before run() started, so nothing has rolled back yet
+            asyncio.ensure_future(rollback())
+
+    job = job_manager.submit(stage.kind, run, workflow_id=workflow_id, on_cancel=cancelled)
+    await asyncio.to_thread(workflow_store.update, workflow_id, job_id=job.id)
+
+    return jsonify({
+        "message": f"{stage.kind.capitalize()} started",
+        "workflow_id": workflow_id,
+        "job": job.to_dict()
+    }), 202, {"Location": f"/api/jobs/{job.id}"}
+
+
+@app.route('/api/execute-research', methods=['POST'])
+async def execute_research():
+    """
+    Step 2: Execute research phase; returns 202 Accepted with a job
+    """
+    workflow_id = await get_workflow_id()
+
+    if not workflow_id:
+        return workflow_id_required()
+    if not await asyncio.to_thread(workflow_store.exists, workflow_id):
+        return workflow_not_found(workflow_id)
+
+    stage, answer = await asyncio.to_thread(stages.claim_research, workflow_id)
+    if answer:
+        return jsonify(answer[0]), answer[1]
+    return await dispatch_stage(workflow_id, stage)
+
+
+@app.route('/api/approve-findings', methods=['POST'])
+async def approve_findings():
+    """
+    Step 3: Human-in-the-loop approval of findings
+    """
+    workflow_id = await get_workflow_id()
+
+    if not workflow_id:
+        return workflow_id_required()
+    if not await asyncio.to_thread(workflow_store.exists, workflow_id):
+        return workflow_not_found(workflow_id)
+
+    data = await request.get_json(silent=True) or {}
+    stage, answer = await asyncio.to_thread(stages.claim_approval, workflow_id, data.get('approved', False))
+    if answer:
+        return jsonify(answer[0]), answer[1]
+    return await dispatch_stage(workflow_id, stage)
+
+
+async def current_state_or_error():
+    """(workflow_id, state snapshot, None) or (workflow_id, None, error response)"""
+    workflow_id = await get_workflow_id()
+    if not workflow_id:
+        return workflow_id, None, workflow_id_required()
+    if not await asyncio.to_thread(workflow_store.exists, workflow_id):
+        return workflow_id, None, workflow_not_found(workflow_id)
+
+    state, answer = await asyncio.to_thread(stages.report_state, workflow_id)
+    if answer:
+        return workflow_id, None, (jsonify(answer[0]), answer[1])
+    return workflow_id, state, None
+
+
+@app.route('/api/resume', methods=['POST'])
+async def resume_workflow():
+    """
+    Resume a failed or interrupted workflow from its first stage without a current
+    checkpoint; unchanged stages are skipped (see WorkflowStages.claim_resume)
+    """
+    workflow_id = await get_workflow_id()
+
+    if not workflow_id:
+        return workflow_id_required()
+    if not await asyncio.to_thread(workflow_store.exists, workflow_id):
+        return workflow_not_found(workflow_id)
+
+    stage, answer = await asyncio.to_thread(stages.claim_resume, workflow_id)
+    if answer:
+        return jsonify(answer[0]), answer[1]
+    return await dispatch_stage(workflow_id, stage)
+
+
+@app.route('/api/get-voice-report', methods=['GET'])
+async def get_voice_report():
+    """
+    Step 4: Generate voice report at any time
+    """
+    workflow_id, state, error = await current_state_or_error()
+    if error:
+        return error
+
+    report_result, voice_result = await effects.arun(stages.voice_report(workflow_id, state))
+
+    if not report_result.get('success'):
+        return jsonify({
+            "error": "Failed to generate report",
+            "details": report_result.get('error')
+        }), 500
+
+    report_text = report_result["report"]
+
+    if not voice_result.get('success'):
+        return jsonify({
+            "error": "Failed to generate voice",
+            "details": voice_result.get('error'),
+            "text_report": report_text  # Return text as fallback
+        }), 500
+
+    return Response(
+        voice_result["audio_data"],
+        mimetype='audio/mpeg',
+        headers={"Content-Disposition": "inline; filename=status_report.mp3"}
+    )
+
+
+@app.route('/api/get-text-report', methods=['GET'])
+async def get_text_report():
+    """
+    Alternative: Get text-only status report
+    """
+    workflow_id, state, error = await current_state_or_error()
+    if error:
+        return error
+
+    report_result = await effects.arun(stages.status_report(workflow_id, state))
+
+    if not report_result.get('success'):
+        return jsonify({
+            "error": "Failed to generate report",
+            "details": report_result.get('error')
+        }), 500
+
+    return jsonify({
+        "workflow_id": workflow_id,
+        "report": report_result["report"],
+        "degraded": report_result.get("degraded", False)
+    })
+
+
+@app.route('/api/state', methods=['GET'])
+async def get_state():
+    """
+    Get current workflow state (without ?workflow_id=, the state of a new, idle workflow)
+
+    Responses carry a weak ETag, the same whichever Content-Encoding the body is sent with;
+    sending it back in If-None-Match (weak or strong form) answers 304 Not Modified while
+    the workflow is unchanged. With ?since=<version> only the fields updated after
+    that version are returned: {"workflow_id", "version", "since", "changes": {...}}.
+    """
+    workflow_id = await get_workflow_id()
+    if workflow_id and not await asyncio.to_thread(workflow_store.exists, workflow_id):
+        return workflow_not_found(workflow_id)
+
+    if not workflow_id:
+        return jsonify(public_state(new_workflow_state()))
+
+    # Revalidation only reads the version, never the state itself
+    etag = f"{workflow_id}:{await asyncio.to_thread(workflow_store.version, workflow_id)}"
+    if request.if_none_match.contains_weak(etag):
+        metrics.state_requests.inc(service='orchestrator-async', result="not_modified")
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+
+    payload, kind = await asyncio.to_thread(stages.state_payload, workflow_id, request.args.get('since', type=int))
+    metrics.state_requests.inc(service='orchestrator-async', result=kind)
+
+    response = jsonify(payload)
+    response.set_etag(f"{workflow_id}:{payload['version']}", weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@app.route('/api/workflows', methods=['GET'])
+async def list_workflows():
+    """
+    List all workflows on this instance, newest first
+    """
+    workflows = await asyncio.to_thread(workflow_store.list)
+    return jsonify({
+        "count": len(workflows),
+        "workflows": workflows
+    })
+
+
+@app.route('/api/workflows/<workflow_id>/events', methods=['GET'])
+async def workflow_event_stream(workflow_id):
+    """
+    Server-sent events for one workflow (see orchestrator.py for the event types)
+
+    Each open stream is a coroutine waiting on a queue, not a thread.
+    """
+    if not await asyncio.to_thread(workflow_store.exists, workflow_id):
+        return workflow_not_found(workflow_id)
+
+    last_event_id = parse_last_event_id(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
+    loop = asyncio.get_running_loop()
+    pending = asyncio.Queue()
+    missed, current_id, unsubscribe = workflow_events.subscribe(
+        workflow_id,
+        lambda item: loop.call_soon_threadsafe(pending.put_nowait, item),
+        last_event_id
+    )
+
+    # Subscribed before reading, so nothing between the snapshot and live events is lost
+    snapshot = await asyncio.to_thread(workflow_store.snapshot, workflow_id) if missed is None else None
+    heartbeat = heartbeat_seconds()
+
+    async def generate():
+        try:
+            yield "retry: 3000\n\n"
+            if missed is None:
+                if snapshot is None:
+                    yield encode_sse("deleted", {"workflow_id": workflow_id})
+                    return
+                yield encode_sse("snapshot", public_state(snapshot), format_event_id(current_id))
+                sent = current_id
+            else:
+                sent = last_event_id
+                for item in missed:
+                    yield item.to_sse()
+                    sent = item.id
+
+            while True:
+                try:
+                    item = await asyncio.wait_for(pending.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    if health.draining:
+                        return  # Shutting down; the client reconnects elsewhere
+                    yield ": keep-alive\n\n"
+                    continue
+                if item.id <= sent:
+                    continue
+                yield item.to_sse()
+                sent = item.id
+                if item.event == "deleted":
+                    return
+        finally:
+            unsubscribe()
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Don't let proxies buffer the stream
+    response.timeout = None  # Streams stay open as long as the client listens
+    return response
+
+
+@app.route('/api/jobs', methods=['GET'])
+async def list_jobs():
+    """
+    List background jobs, optionally filtered by ?workflow_id=
+    """
+    jobs = job_manager.list(request.args.get('workflow_id'))
+    return jsonify({
+        "count": len(jobs),
+        "queue_depth": job_manager.queue_depth(),
+        "jobs": [job.to_dict() for job in jobs]
+    })
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+async def get_job(job_id):
+    """
+    Status, progress and (once finished) result of a background job
+    """
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({"error": f"Job {job_id} not found"}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+async def cancel_job(job_id):
+    """
+    Cancel a background job; the workflow returns to the status it had before the stage
+    """
+    job = job_manager.cancel(job_id)
+    if not job:
+        return jsonify({"error": f"Job {job_id} not found"}), 404
+    return jsonify({"message": "Cancellation requested", "job": job.to_dict()})
+
+
+@app.route('/api/batch', methods=['POST'])
+async def run_batch_endpoint():
+    """
+    Run many goals concurrently; streams NDJSON (see orchestrator.py for the body format)
+
+    The batch runner keeps its own worker threads; results are handed to the event
+    loop as they finish.
+    """
+    data = await request.get_json(silent=True) or {}
+    try:
+        goals, workers, draft = parse_batch_request(data, BATCH_MAX_WORKERS, BATCH_MAX_GOALS)
+    except ValueError as e:
+        return jsonify({"error": "Invalid batch request", "details": str(e)}), 400
+
+    data_result = await asyncio.to_thread(load_suppliers_cached, INVENTORY_FILE, SALES_FILE)
+    if not data_result.get('success'):
+        return jsonify({
+            "error": "Failed to load data",
+            "details": data_result.get('error')
+        }), 500
+
+    # One slot for the whole batch, budgeted for every goal in it
+    permit = await admission.acquire("batch", admission.cost("batch", len(goals)))
+    loop = asyncio.get_running_loop()
+    lines = asyncio.Queue()
+
+    def put(line):
+        loop.call_soon_threadsafe(lines.put_nowait, line)
+
+    def run():
+        try:
+            put(run_batch(
+                goals,
+                data_result["combined_data"],
+                ANTHROPIC_API_KEY,
+                workers=workers,
+                draft=draft,
+                on_result=put
+            ))
+        except Exception as e:
+            put({"type": "error", "error": str(e)})
+        finally:
+            permit.release()
+            put(None)
+
+    loop.run_in_executor(None, run)
+
+    async def generate():
+        while True:
+            line = await lines.get()
+            if line is None:
+                break
+            yield response_codec.dumps_text(line) + "\n"
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+
+@app.route('/api/routes', methods=['GET'])
+async def get_routes():
+    """
+    Per-agent model routing and per-route latency stats
+    """
+    return jsonify(get_route_stats())
+
+
+@app.route('/api/reset', methods=['POST'])
+async def reset_workflow():
+    """
+    Reset a workflow to start fresh (cancels its jobs and removes it from the store)
+    """
+    workflow_id = await get_workflow_id()
+    if not workflow_id:
+        return workflow_id_required()
+    for job in job_manager.list(workflow_id):
+        job_manager.cancel(job.id)
+    await asyncio.to_thread(workflow_store.delete, workflow_id)
+    return jsonify({"message": "Workflow reset", "workflow_id": workflow_id, "state": new_workflow_state()})
+
+
+@app.before_serving
+async def start_service():
+    # Recovery finishes before the first request; warm-up runs off the loop, so hypercorn starts
+    # listening at once and /api/health/ready reports 503 until it is done
+    await asyncio.to_thread(health.start)
+
+
+@app.after_serving
+async def shutdown_jobs():
+    health.begin_drain()
+    if not await job_manager.drain(DRAIN_TIMEOUT):
+        print(f"⚠ Stages still running after {DRAIN_TIMEOUT:.0f}s; cancelling them")
+    await job_manager.shutdown()
+
+
+if __name__ == '__main__':
+    if not ANTHROPIC_API_KEY:
+        print("WARNING: ANTHROPIC_API_KEY not found in environment")
+    if not ELEVENLABS_API_KEY:
+        print("WARNING: ELEVENLABS_API_KEY not found in environment")
+
+    print(f"Starting async orchestrator on port {PORT}...")
+    print(f"Model backend: {os.getenv('LLM_BACKEND', 'remote')}")
+    for agent in ("planner", "researcher", "communicator", "reporter"):
+        route = get_route(agent)
+        print(f"  {agent}: {route.primary} (fallback: {route.fallback or 'none'})")
+
+    app.run(host='0.0.0.0', port=PORT)
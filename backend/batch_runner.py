@@ -0,0 +1,267 @@
+"""
+Batch Goal Runner - Runs many goals through planner → researcher → communicator
+
+The inventory and sales datasets are loaded once and shared by every goal; goals run
+on a bounded worker pool and each result is written as one NDJSON line as soon as it
+finishes. A final summary reports throughput and per-stage latency percentiles.
+
+Usage:
+    python backend/batch_runner.py ./-guides/EXAMPLE_QUESTIONS.md --workers 4 --output results.ndjson
+
+Goal files may be plain text (one goal per line), Markdown (quoted bullet items, as in
+-guides/EXAMPLE_QUESTIONS.md), JSON (a list of strings or {"goal": ...} objects) or NDJSON.
+"""
+import argparse
+import json
+import os
+import pathlib
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from planner import create_plan
+from researcher import analyze_suppliers, load_suppliers_from_file
+from communicator import draft_emails
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'Retail')
+DEFAULT_INVENTORY_FILE = os.path.join(DATA_DIR, 'retail_inventory_snapshot_30_10_25_cleaned.csv')
+DEFAULT_SALES_FILE = os.path.join(DATA_DIR, 'retail_sales_data_01_09_2023_to_31_10_2025_cleaned.csv')
+
+STAGES = ("planning", "research", "drafting")
+
+
+def read_goals(path: str) -> List[str]:
+    """Read goals from a .txt, .md, .json or .ndjson file"""
+    text = pathlib.Path(path).read_text(encoding='utf-8')
+    suffix = pathlib.Path(path).suffix.lower()
+
+    if suffix == '.json':
+        items = json.loads(text)
+    elif suffix in ('.ndjson', '.jsonl'):
+        items = [json.loads(line) for line in text.splitlines() if line.strip()]
+    elif suffix == '.md':
+        # Markdown bullet items wrapped in quotes: - "Source 500 units of ..."
+        items = re.findall(r'^\s*[-*]\s+"(.+?)"\s*$', text, flags=re.M)
+    else:
+        items = [line.strip() for line in text.splitlines() if line.strip() and not line.startswith('#')]
+
+    goals = [item.get('goal') if isinstance(item, dict) else item for item in items]
+    return [goal for goal in goals if goal]
+
+
+def parse_batch_request(data: Dict[str, Any], max_workers: int, max_goals: int) -> Tuple[List[str], int, bool]:
+    """
+    Validate a /api/batch body
+
+    Returns:
+        (goals, workers capped at max_workers, draft)
+
+    Raises:
+        ValueError: goals is not a non-empty list of at most max_goals strings, or workers
+            is not an integer
+    """
+    goals = data.get('goals')
+    if not isinstance(goals, list) or not all(isinstance(goal, str) for goal in goals):
+        raise ValueError("goals must be a list of strings")
+    goals = [goal for goal in goals if goal.strip()]
+    if not goals:
+        raise ValueError("At least one goal is required")
+    if len(goals) > max_goals:
+        raise ValueError(f"At most {max_goals} goals per batch")
+
+    workers = data.get('workers', 4)
+    if isinstance(workers, bool) or not isinstance(workers, int):
+        raise ValueError("workers must be an integer")
+
+    return goals, max(1, min(workers, max_workers)), bool(data.get('draft', True))
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def run_goal(
+    goal: str,
+    combined_data: Dict[str, Any],
+    api_key: Optional[str],
+    draft: bool = True
+) -> Dict[str, Any]:
+    """
+    Run one goal through the agents, timing each stage
+
+    Findings are approved automatically; there is no human in the loop in batch mode.
+
+    Returns:
+        dict: Result record with plan, findings, drafts, status and per-stage timings (ms)
+    """
+    record = {
+        "goal": goal,
+        "status": "planning",
+        "plan": [],
+        "findings": None,
+        "drafts": None,
+        "error": None,
+        "timings_ms": {}
+    }
+    started = time.perf_counter()
+
+    def timed(stage: str, fn: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        stage_start = time.perf_counter()
+        result = fn()
+        record["timings_ms"][stage] = round((time.perf_counter() - stage_start) * 1000, 1)
+        if not result.get('success'):
+            record["status"] = "error"
+            record["error"] = f"{stage} failed: {result.get('error', 'Unknown error')}"
+        return result
+
+    plan_result = timed("planning", lambda: create_plan(goal, api_key))
+    if record["status"] != "error":
+        record["plan"] = plan_result["plan"]
+        record["status"] = "researching"
+        research_result = timed("research", lambda: analyze_suppliers(goal, combined_data, api_key))
+        if record["status"] != "error":
+            record["findings"] = research_result["findings"]
+            record["status"] = "drafting" if draft else "completed"
+
+    if draft and record["status"] == "drafting":
+        relevant_suppliers = record["findings"].get("relevant_suppliers", [])
+        draft_result = timed("drafting", lambda: draft_emails(goal, record["findings"], relevant_suppliers, api_key))
+        if record["status"] != "error":
+            record["drafts"] = draft_result["drafts"]
+            record["status"] = "completed"
+
+    record["timings_ms"]["total"] = round((time.perf_counter() - started) * 1000, 1)
+    return record
+
+
+def run_batch(
+    goals: List[str],
+    combined_data: Dict[str, Any],
+    api_key: Optional[str],
+    workers: int = 4,
+    draft: bool = True,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Run goals concurrently on a bounded worker pool over one shared dataset
+
+    Args:
+        goals: Goals to process
+        combined_data: Dataset loaded once with load_suppliers_from_file
+        api_key: Anthropic API key
+        workers: Maximum goals in flight at once
+        draft: Whether to run the communicator stage
+        on_result: Called with each result record as soon as its goal finishes
+
+    Returns:
+        dict: Aggregate summary (throughput, success counts, per-stage latency)
+    """
+    started = time.perf_counter()
+    stage_timings: Dict[str, List[float]] = {stage: [] for stage in STAGES + ("total",)}
+    counts = {"completed": 0, "error": 0}
+    lock = threading.Lock()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="batch") as pool:
+        futures = {
+            pool.submit(run_goal, goal, combined_data, api_key, draft): index
+            for index, goal in enumerate(goals)
+        }
+        for future in as_completed(futures):
+            record = future.result()
+            record["index"] = futures[future]
+            with lock:
+                counts["completed" if record["status"] == "completed" else "error"] += 1
+                for stage, ms in record["timings_ms"].items():
+                    stage_timings[stage].append(ms)
+                done = counts["completed"] + counts["error"]
+            print(f"[BATCH] {done}/{len(goals)} {record['status']} in {record['timings_ms']['total']:.0f}ms: {record['goal'][:60]}")
+            if on_result:
+                on_result(record)
+
+    wall_seconds = time.perf_counter() - started
+    return {
+        "type": "summary",
+        "goals": len(goals),
+        "completed": counts["completed"],
+        "failed": counts["error"],
+        "workers": workers,
+        "wall_time_s": round(wall_seconds, 3),
+        "throughput_goals_per_min": round(len(goals) / wall_seconds * 60, 2) if wall_seconds else None,
+        "stage_latency_ms": {
+            stage: {
+                "p50": _percentile(values, 0.5),
+                "p95": _percentile(values, 0.95),
+                "max": max(values) if values else None
+            }
+            for stage, values in stage_timings.items()
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a file of goals through the SourceBot agents")
+    parser.add_argument('goals_file', help="Goals file (.txt, .md, .json or .ndjson)")
+    parser.add_argument('--output', '-o', default='batch_results.ndjson', help="NDJSON output path ('-' for stdout)")
+    parser.add_argument('--workers', '-w', type=int, default=int(os.getenv('BATCH_WORKERS', '4')))
+    parser.add_argument('--no-drafts', action='store_true', help="Stop after research (skip email drafting)")
+    parser.add_argument('--inventory', default=DEFAULT_INVENTORY_FILE)
+    parser.add_argument('--sales', default=DEFAULT_SALES_FILE)
+    args = parser.parse_args()
+
+    root_dir = pathlib.Path(__file__).parent.parent
+    load_dotenv(root_dir / './env_files/api.env')
+    api_key = os.getenv('ANTHROPIC_API_KEY')
+
+    goals = read_goals(args.goals_file)
+    if not goals:
+        print(f"No goals found in {args.goals_file}")
+        sys.exit(1)
+
+    load_start = time.perf_counter()
+    data_result = load_suppliers_from_file(args.inventory, args.sales)
+    if not data_result.get('success'):
+        print(f"✗ Failed to load data: {data_result.get('error')}")
+        sys.exit(1)
+    print(f"✓ Loaded datasets once in {(time.perf_counter() - load_start) * 1000:.0f}ms")
+    print(f"Running {len(goals)} goals on {args.workers} workers...")
+
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    write_lock = threading.Lock()
+
+    def write_line(record):
+        with write_lock:
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+
+    try:
+        summary = run_batch(
+            goals,
+            data_result["combined_data"],
+            api_key,
+            workers=args.workers,
+            draft=not args.no_drafts,
+            on_result=write_line
+        )
+        write_line(summary)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(f"\n✓ {summary['completed']}/{summary['goals']} goals completed in {summary['wall_time_s']}s "
+          f"({summary['throughput_goals_per_min']} goals/min)")
+    for stage, stats in summary["stage_latency_ms"].items():
+        print(f"  {stage:<9} p50={stats['p50']}ms p95={stats['p95']}ms")
+    if args.output != '-':
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
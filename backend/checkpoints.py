@@ -0,0 +1,96 @@
+"""
+Checkpoints - Which workflow stages a resumed workflow can skip
+
+A workflow runs planning → research → approval → drafting, and each stage's output is
+kept on the workflow (plan, findings, the manager's approval, drafts). When a stage
+succeeds, a checkpoint records a hash of the inputs it ran on:
+
+    planning    the goal (normalized)
+    research    the goal, the plan's research steps and the dataset version
+    approval    the findings the manager approved
+    drafting    the goal, the approved findings and the plan's drafting steps
+
+Resuming walks the stages in order and skips every stage whose checkpoint matches the
+hash of its current inputs. The first stage without a matching checkpoint (it failed,
+never ran, or something it depends on changed) runs again, and so does everything after
+it unless its inputs come out the same. Approval is never given automatically: when the
+findings changed, the workflow stops at awaiting_approval.
+
+Checkpoints live in the workflow's "checkpoints" field: {stage: {"inputs", "at"}}.
+"""
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from plan_executor import normalize_plan, phase_steps
+from single_flight import normalize_text
+
+STAGES = ("planning", "research", "approval", "drafting")
+
+# Workflow status while a stage runs
+STAGE_STATUS = {"planning": "planning", "research": "researching", "drafting": "drafting"}
+
+# Statuses a workflow can be resumed from (running, rejected and completed ones cannot)
+RESUMABLE = ("error", "planned", "awaiting_approval")
+
+# Step fields that define what a step does (status and timings are left out)
+_STEP_SPEC = ("step_number", "title", "description", "agent", "depends_on")
+
+
+def inputs_hash(value: Any) -> str:
+    """Stable hash of JSON-like inputs"""
+    encoded = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+def _phase_specs(plan: List[Dict[str, Any]], phase: str) -> List[Dict[str, Any]]:
+    if not all(isinstance(step, dict) and "agent" in step and "depends_on" in step for step in plan):
+        plan = normalize_plan(plan)
+    numbers = set(phase_steps(plan, phase)) if plan else set()
+    return [{key: step.get(key) for key in _STEP_SPEC} for step in plan if step["step_number"] in numbers]
+
+
+def stage_inputs(stage: str, state: Dict[str, Any], dataset: Optional[str]) -> str:
+    """
+    Hash of what the stage depends on in the workflow's current state
+
+    Args:
+        stage: One of STAGES
+        state: Workflow state; approval and drafting need its "findings"
+        dataset: Dataset version (researcher.dataset_version)
+    """
+    goal = normalize_text(state.get("goal") or "")
+    plan = state.get("plan") or []
+    if stage == "planning":
+        return inputs_hash({"goal": goal})
+    if stage == "research":
+        return inputs_hash({"goal": goal, "steps": _phase_specs(plan, "research"), "dataset": dataset})
+    if stage == "approval":
+        return inputs_hash({"findings": state.get("findings")})
+    if stage == "drafting":
+        return inputs_hash({"goal": goal, "findings": state.get("findings"), "steps": _phase_specs(plan, "drafting")})
+    raise ValueError(f"Unknown stage '{stage}'")
+
+
+def record(checkpoints: Optional[Dict[str, Any]], stage: str, digest: str) -> Dict[str, Any]:
+    """Checkpoints with the stage marked as done on the given inputs"""
+    return {**(checkpoints or {}), stage: {"inputs": digest, "at": datetime.utcnow().isoformat()}}
+
+
+def is_current(state: Dict[str, Any], stage: str, dataset: Optional[str]) -> bool:
+    """True when the stage succeeded on exactly the workflow's current inputs"""
+    checkpoint = (state.get("checkpoints") or {}).get(stage)
+    if not checkpoint:
+        return False
+    if stage == "planning" and not state.get("plan"):
+        return False
+    return checkpoint.get("inputs") == stage_inputs(stage, state, dataset)
+
+
+def first_incomplete(state: Dict[str, Any], dataset: Optional[str]) -> Optional[str]:
+    """The first stage to run when resuming, or None when every stage is up to date"""
+    for stage in STAGES:
+        if not is_current(state, stage, dataset):
+            return stage
+    return None
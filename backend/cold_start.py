@@ -0,0 +1,198 @@
+"""
+Cold Start - Time to listening, time to ready and first-request latency of a service
+
+Starts a service the way `python orchestrator.py` does (debug reloader off, so there is
+one process to time), then measures from the moment the process is spawned:
+
+    import_ms          Importing the service module alone (separate process)
+    listen_ms          Until <health>/live first answers: the port is open
+    ready_ms           Until <health>/ready returns 200: warm-up (datasets, SDK imports)
+                       has finished; the per-task warm-up report is kept
+    first_request_ms   The first workflow requests after ready (orchestrator: submit goal
+                       and research; notifications: create and list pending), and the same
+                       requests again once warm, so one-off costs show as the difference
+
+With --immediate the first requests are sent as soon as the port opens instead of after
+ready, showing what a client that ignores readiness would see during warm-up.
+
+Services run on the local LLM stand-in by default (--backend remote to include the real
+SDKs). Each measurement is the median of --runs cold starts; --max-listen-ms and
+--max-first-request-ms turn it into a check (exit code 1 when exceeded).
+
+Usage:
+    python backend/cold_start.py orchestrator --runs 3
+    python backend/cold_start.py notifications --json cold_start.json
+    python backend/cold_start.py orchestrator --max-listen-ms 1500 --max-first-request-ms 500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+import requests
+
+# Service -> (script, module, health prefix)
+SERVICES = {
+    "orchestrator": ("orchestrator.py", "orchestrator", "/api/health"),
+    "orchestrator-async": ("async_orchestrator.py", "async_orchestrator", "/api/health"),
+    "notifications": ("notification_system.py", "notification_system", "/api/notifications/health"),
+}
+GOAL = "Find fast-selling analgesics that are low on stock"
+POLL_SECONDS = 0.01
+
+
+def _env(service: str, port: int, backend: str) -> Dict[str, str]:
+    env = dict(os.environ, FLASK_DEBUG="false", LLM_BACKEND=backend, PYTHONUNBUFFERED="1")
+    env.setdefault("WORKFLOW_STORE", "memory")
+    env["NOTIFICATION_PORT" if service == "notifications" else "ORCHESTRATOR_PORT"] = str(port)
+    return env
+
+
+def measure_import(service: str, port: int, backend: str) -> float:
+    """Milliseconds to import the service module in a fresh interpreter"""
+    _, module, _ = SERVICES[service]
+    code = (f"import time; start = time.perf_counter(); import {module}; "
+            f"print('IMPORT_MS', (time.perf_counter() - start) * 1000)")
+    here = os.path.dirname(os.path.abspath(__file__))
+    completed = subprocess.run([sys.executable, "-c", code], cwd=here, env=_env(service, port, backend),
+                               capture_output=True, text=True)
+    for line in completed.stdout.splitlines():
+        if line.startswith("IMPORT_MS"):
+            return round(float(line.split()[1]), 1)
+    raise RuntimeError(f"importing {module} failed:\n{completed.stderr[-2000:]}")
+
+
+def _wait_for(url: str, process: subprocess.Popen, status: int, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"service exited with code {process.returncode} (see --service-log)")
+        try:
+            response = requests.get(url, timeout=2)
+            if response.status_code == status:
+                return response
+        except requests.RequestException:
+            pass
+        time.sleep(POLL_SECONDS)
+    raise RuntimeError(f"{url} did not return {status} within {timeout:.0f} s")
+
+
+def _timed(method: str, url: str, **kwargs) -> Dict[str, Any]:
+    start = time.perf_counter()
+    response = requests.request(method, url, timeout=120, **kwargs)
+    elapsed = round((time.perf_counter() - start) * 1000, 1)
+    if response.status_code >= 400:
+        raise RuntimeError(f"{method} {url} returned {response.status_code}: {response.text[:200]}")
+    return {"ms": elapsed, "response": response}
+
+
+def first_requests(service: str, base: str) -> Dict[str, float]:
+    """One pass of the service's typical first requests; milliseconds per request"""
+    if service == "notifications":
+        created = _timed("POST", f"{base}/api/notifications/create", json={
+            "type": "approval_request", "title": "Cold start", "message": "First notification",
+            "requires_approval": True, "generate_voice": False
+        })
+        pending = _timed("GET", f"{base}/api/notifications/pending")
+        return {"create": created["ms"], "pending": pending["ms"]}
+
+    submitted = _timed("POST", f"{base}/api/submit-goal", json={"goal": GOAL})
+    workflow_id = submitted["response"].json()["workflow_id"]
+    research = _timed("POST", f"{base}/api/execute-research?wait=true", json={"workflow_id": workflow_id})
+    return {"submit_goal": submitted["ms"], "research": research["ms"]}
+
+
+def cold_start(service: str, port: int, backend: str, immediate: bool, log) -> Dict[str, Any]:
+    script, _, health = SERVICES[service]
+    base = f"http://127.0.0.1:{port}"
+    here = os.path.dirname(os.path.abspath(__file__))
+    spawned = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(here, script)], cwd=here,
+                               env=_env(service, port, backend), stdout=log, stderr=subprocess.STDOUT)
+    try:
+        _wait_for(f"{base}{health}/live", process, 200, 60)
+        listen_ms = (time.perf_counter() - spawned) * 1000
+
+        first = first_requests(service, base) if immediate else None
+        ready = _wait_for(f"{base}{health}/ready", process, 200, 300)
+        ready_ms = (time.perf_counter() - spawned) * 1000
+        if first is None:
+            first = first_requests(service, base)
+        warm = first_requests(service, base)
+        return {
+            "listen_ms": round(listen_ms, 1),
+            "ready_ms": round(ready_ms, 1),
+            "first_request_ms": round(sum(first.values()), 1),
+            "warm_request_ms": round(sum(warm.values()), 1),
+            "first": first,
+            "warm": warm,
+            "warmup": ready.json().get("warmup")
+        }
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure service cold start and first-request latency")
+    parser.add_argument("service", choices=sorted(SERVICES))
+    parser.add_argument("--runs", type=int, default=3, help="Cold starts to take the median of (default: 3)")
+    parser.add_argument("--port", type=int, default=5099, help="Port for the measured service (default: 5099)")
+    parser.add_argument("--backend", choices=("standin", "remote"), default="standin",
+                        help="LLM_BACKEND for the service (default: standin)")
+    parser.add_argument("--immediate", action="store_true", help="Send the first requests before ready")
+    parser.add_argument("--service-log", default=os.devnull, help="Where the service writes its output")
+    parser.add_argument("--json", dest="json_path", help="Write the results to this JSON file")
+    parser.add_argument("--max-listen-ms", type=float, help="Fail when the median time to listening is higher")
+    parser.add_argument("--max-first-request-ms", type=float, help="Fail when the median first-request time is higher")
+    args = parser.parse_args(argv)
+
+    runs: List[Dict[str, Any]] = []
+    with open(args.service_log, "a") as log:
+        try:
+            import_ms = measure_import(args.service, args.port, args.backend)
+            for number in range(1, max(1, args.runs) + 1):
+                run = cold_start(args.service, args.port, args.backend, args.immediate, log)
+                runs.append(run)
+                print(f"run {number}: listening {run['listen_ms']:.0f} ms, ready {run['ready_ms']:.0f} ms, "
+                      f"first requests {run['first_request_ms']:.0f} ms (warm {run['warm_request_ms']:.0f} ms)")
+        except RuntimeError as e:
+            print(f"✗ {e}")
+            return 1
+
+    summary = {key: round(statistics.median(run[key] for run in runs), 1)
+               for key in ("listen_ms", "ready_ms", "first_request_ms", "warm_request_ms")}
+    report = {"service": args.service, "backend": args.backend, "immediate": args.immediate,
+              "import_ms": import_ms, **summary, "runs": runs}
+
+    print(f"\n{args.service}: import {import_ms:.0f} ms, listening {summary['listen_ms']:.0f} ms, "
+          f"ready {summary['ready_ms']:.0f} ms, first requests {summary['first_request_ms']:.0f} ms "
+          f"(warm {summary['warm_request_ms']:.0f} ms) — median of {len(runs)}")
+    warmup = runs[-1].get("warmup") or {}
+    for name, task in warmup.get("tasks", {}).items():
+        print(f"  warm-up {name}: {task['status']} in {task.get('duration_ms', 0):.0f} ms")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Results written to {args.json_path}")
+
+    failed = False
+    if args.max_listen_ms is not None and summary["listen_ms"] > args.max_listen_ms:
+        print(f"✗ Time to listening {summary['listen_ms']:.0f} ms exceeds {args.max_listen_ms:.0f} ms")
+        failed = True
+    if args.max_first_request_ms is not None and summary["first_request_ms"] > args.max_first_request_ms:
+        print(f"✗ First requests took {summary['first_request_ms']:.0f} ms, over {args.max_first_request_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,29 +1,18 @@
 """
 Communicator Agent - Drafts emails to suppliers based on findings
 """
-import anthropic
+from llm_backend import get_backend
+from model_router import routed_call_effects
+from resilience import sdk_timeout
+import effects
 import json
 
-def draft_emails(goal, findings, relevant_suppliers, api_key, model="claude-sonnet-4-5-20250929"):
-    """
-    Creates email drafts for suppliers based on research findings
-    
-    Args:
-        goal (str): The original goal
-        findings (dict): Research findings from the Researcher agent
-        relevant_suppliers (list): List of relevant suppliers
-        api_key (str): Anthropic API key
-        model (str): Claude model to use
-    
-    Returns:
-        dict: Email drafts for each supplier
-    """
-    client = anthropic.Anthropic(api_key=api_key)
-    
+def build_email_prompt(goal, findings, relevant_suppliers):
+    """Prompt asking Claude for supplier email drafts"""
     findings_summary = json.dumps(findings, indent=2)
     suppliers_summary = json.dumps(relevant_suppliers, indent=2)
     
-    prompt = f"""You are a professional business communication specialist.
+    return f"""You are a professional business communication specialist.
 
 Goal: {goal}
 
@@ -53,42 +42,91 @@ Return your response as a JSON object:
 
 Only return the JSON object, no other text."""
 
+
+def parse_drafts_response(response_text):
+    """Turn Claude's response text into the communicator result dict"""
+    response_text = response_text.strip()
+
+    # Remove markdown code blocks if present
+    if response_text.startswith("```json"):
+        response_text = response_text[7:]
+    elif response_text.startswith("```"):
+        response_text = response_text[3:]
+    
+    if response_text.endswith("```"):
+        response_text = response_text[:-3]
+    
+    response_text = response_text.strip()
+    
     try:
-        message = client.messages.create(
-            model=model,
-            max_tokens=4000,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
-        
-        response_text = message.content[0].text.strip()
-        
-        # Remove markdown code blocks if present
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        elif response_text.startswith("```"):
-            response_text = response_text[3:]
-        
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        
-        response_text = response_text.strip()
-        
         drafts = json.loads(response_text)
-        
-        return {
-            "success": True,
-            "drafts": drafts
-        }
-        
     except json.JSONDecodeError as e:
         return {
             "success": False,
             "error": f"JSON parsing error: {str(e)}"
         }
+
+    return {
+        "success": True,
+        "drafts": drafts
+    }
+
+
+
+def merge_drafts(drafts_list):
+    """Combine the drafts of several communicator steps; one email per recipient"""
+    drafts_list = [drafts for drafts in drafts_list if drafts]
+    if len(drafts_list) == 1:
+        return drafts_list[0]
+    
+    emails, seen = [], set()
+    for drafts in drafts_list:
+        for email in drafts.get("emails", []):
+            key = email.get("to") or email.get("supplier_name")
+            if key not in seen:
+                seen.add(key)
+                emails.append(email)
+    return {
+        "emails": emails,
+        "summary": " ".join(drafts.get("summary", "") for drafts in drafts_list).strip()
+    }
+
+
+def draft_emails(goal, findings, relevant_suppliers, api_key, model=None):
+    """Creates email drafts for suppliers based on research findings (see draft_emails_effects)"""
+    return effects.run(draft_emails_effects(goal, findings, relevant_suppliers, api_key, model))
+
+
+def draft_emails_effects(goal, findings, relevant_suppliers, api_key, model=None):
+    """
+    Creates email drafts for suppliers based on research findings, as a generator of effects
+    
+    Args:
+        goal (str): The original goal
+        findings (dict): Research findings from the Researcher agent
+        relevant_suppliers (list): List of relevant suppliers
+        api_key (str): Anthropic API key
+        model (str): Claude model to use (default: the agent's configured route)
+    
+    Returns:
+        dict: Email drafts for each supplier
+    """
+    backend = get_backend()
+    prompt = build_email_prompt(goal, findings, relevant_suppliers)
+
+    try:
+        response_text = yield from routed_call_effects(
+            "communicator",
+            lambda routed_model: effects.Either(
+                backend.complete, backend.acomplete, "communicator", routed_model, prompt,
+                max_tokens=4000, api_key=api_key, timeout=sdk_timeout("communicator")
+            ),
+            model=model
+        )
     except Exception as e:
         return {
             "success": False,
             "error": str(e)
         }
+
+    return parse_drafts_response(response_text)
@@ -0,0 +1,328 @@
+"""
+Data Path Benchmark - Time, peak RSS and allocations of the CSV-to-prompt stages
+
+Measures the code that turns the retail CSVs into a researcher prompt and reads the
+findings back, over synthetic datasets of several sizes (see dataset_generator.py):
+
+    load        load_suppliers_from_file(): the rows the researcher sees today
+    aggregate   A full pass over both files: stock per supplier, units/turnover/profit
+                per product, lines per department and branch
+    join        Index inventory by Headoffice ID (supplier) and (product, branch) (stock),
+                then join every sale line to its supplier and stock level
+    prompt      build_research_prompt() on the loaded data
+    parse       parse_findings_response() on a fenced findings JSON whose
+                relevant_suppliers grow with the dataset (one per 1,000 rows)
+
+Each stage runs in its own process so peak RSS belongs to that stage alone. Timings
+are --repeat runs (min and median); allocations come from one extra run under
+tracemalloc (peak traced bytes, and bytes still held by the result). Results are
+written as JSON with the git commit, so runs on two commits can be compared with
+--compare (and fail with --max-regression).
+
+Usage:
+    python backend/data_path_bench.py --sizes 10k,100k,1M --json bench/data_path.json
+    python backend/data_path_bench.py --sizes 10k,100k --compare bench/data_path.json --max-regression 0.2
+"""
+import argparse
+import csv
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not reported
+    resource = None
+
+from dataset_generator import DEFAULT_OUT_DIR, INVENTORY_FILENAME, SALES_FILENAME, generate, parse_count
+
+STAGES = ("load", "aggregate", "join", "prompt", "parse")
+GOAL = "Find fast-selling analgesics that are low on stock and the suppliers to reorder from"
+DEFAULT_DATA_DIR = os.path.join(DEFAULT_OUT_DIR, 'bench')
+
+
+def _read_rows(path: str):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        yield from csv.DictReader(f)
+
+
+def _number(value: str) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def aggregate_dataset(inventory_path: str, sales_path: str) -> Dict[str, Any]:
+    """One pass over each file: the totals a full-data research step would start from"""
+    suppliers = defaultdict(lambda: {"lines": 0, "stock_units": 0.0, "stock_value": 0.0})
+    departments = defaultdict(int)
+    for row in _read_rows(inventory_path):
+        supplier = suppliers[row["OrderList"]]
+        stock = _number(row["Branch Stock Level"])
+        supplier["lines"] += 1
+        supplier["stock_units"] += stock
+        supplier["stock_value"] += stock * _number(row["Trade Price"])
+        departments[row["Dept Fullname"]] += 1
+
+    products = defaultdict(lambda: [0.0, 0.0, 0.0])  # qty, turnover, profit
+    branches = defaultdict(float)
+    for row in _read_rows(sales_path):
+        totals = products[row["Product"]]
+        totals[0] += _number(row["Qty Sold"])
+        totals[1] += _number(row["Turnover"])
+        totals[2] += _number(row["Profit"])
+        branches[row["Branch Name"]] += _number(row["Turnover"])
+
+    top = sorted(products.items(), key=lambda item: item[1][0], reverse=True)[:50]
+    return {
+        "suppliers": dict(suppliers),
+        "departments": dict(departments),
+        "branches": dict(branches),
+        "top_selling_products": [{"product": name, "qty_sold": qty, "turnover": round(turnover, 2)}
+                                 for name, (qty, turnover, _) in top]
+    }
+
+
+def join_sales_to_suppliers(inventory_path: str, sales_path: str) -> Dict[str, Any]:
+    """Index inventory, then attribute every sale line to a supplier and its branch stock"""
+    supplier_by_id = {}
+    stock_by_branch = {}
+    for row in _read_rows(inventory_path):
+        supplier_by_id[row["Headoffice ID"]] = row["OrderList"]
+        stock_by_branch[(row["Headoffice ID"], row["Branch Name"])] = _number(row["Branch Stock Level"])
+
+    turnover_by_supplier = defaultdict(float)
+    low_stock_sellers = set()
+    unmatched = 0
+    for row in _read_rows(sales_path):
+        supplier = supplier_by_id.get(row["Headoffice ID"])
+        if supplier is None:
+            unmatched += 1
+            continue
+        turnover_by_supplier[supplier] += _number(row["Turnover"])
+        if stock_by_branch.get((row["Headoffice ID"], row["Branch Name"]), 0) <= 2:
+            low_stock_sellers.add(row["Headoffice ID"])
+    return {
+        "indexed_products": len(supplier_by_id),
+        "indexed_stock_lines": len(stock_by_branch),
+        "turnover_by_supplier": dict(turnover_by_supplier),
+        "low_stock_sellers": len(low_stock_sellers),
+        "unmatched_sales": unmatched
+    }
+
+
+def findings_response(inventory_path: str, suppliers: int) -> str:
+    """A model-style (fenced) findings JSON with `suppliers` relevant_suppliers entries"""
+    relevant = []
+    for row in _read_rows(inventory_path):
+        if len(relevant) >= suppliers:
+            break
+        relevant.append({
+            "supplier": row["OrderList"], "product": row["Product"], "department": row["Dept Fullname"],
+            "trade_price": _number(row["Trade Price"]), "rrp": _number(row["RRP"]),
+            "stock_level": _number(row["Branch Stock Level"]), "qty_sold": 0, "turnover": 0, "profit": 0,
+            "reason": f"{row['Product']} is stocked at {row['Branch Name']} and sells steadily"
+        })
+    findings = {
+        "summary": "Benchmark findings",
+        "key_findings": [f"Finding {i}" for i in range(10)],
+        "relevant_suppliers": relevant,
+        "statistics": {"total_products": len(relevant)},
+        "recommendations": ["Reorder the fastest sellers"]
+    }
+    return "```json\n" + json.dumps(findings, indent=2) + "\n```"
+
+
+def prepare_stage(stage: str, inventory_path: str, sales_path: str, rows: int) -> Callable[[], Any]:
+    """Untimed setup for a stage; returns the call to measure"""
+    from researcher import build_research_prompt, load_suppliers_from_file, parse_findings_response
+
+    if stage == "load":
+        return lambda: load_suppliers_from_file(inventory_path, sales_path)
+    if stage == "aggregate":
+        return lambda: aggregate_dataset(inventory_path, sales_path)
+    if stage == "join":
+        return lambda: join_sales_to_suppliers(inventory_path, sales_path)
+    if stage == "prompt":
+        combined = load_suppliers_from_file(inventory_path, sales_path)["combined_data"]
+        return lambda: build_research_prompt(GOAL, combined)
+    if stage == "parse":
+        text = findings_response(inventory_path, max(10, rows // 1000))
+        return lambda: parse_findings_response(text)
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def _peak_rss_mb() -> Optional[float]:
+    # Linux keeps ru_maxrss across exec (the parent's peak would leak into the child),
+    # while VmHWM belongs to this process image
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def measure_stage(stage: str, inventory_path: str, sales_path: str, rows: int, repeat: int) -> Dict[str, Any]:
+    """Run one stage in this process (called in a fresh child per stage)"""
+    run = prepare_stage(stage, inventory_path, sales_path, rows)
+    gc.collect()
+    rss_before = _peak_rss_mb()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        timings.append((time.perf_counter() - start) * 1000)
+        del result
+        gc.collect()
+    peak_rss = _peak_rss_mb()
+
+    tracemalloc.start()
+    result = run()
+    retained, alloc_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    return {
+        "stage": stage,
+        "rows": rows,
+        "time_ms_min": round(min(timings), 3),
+        "time_ms_median": round(statistics.median(timings), 3),
+        "peak_rss_mb": peak_rss,
+        "stage_rss_mb": round(peak_rss - rss_before, 1) if peak_rss is not None else None,
+        "alloc_peak_mb": round(alloc_peak / 1e6, 3),
+        "retained_mb": round(retained / 1e6, 3)
+    }
+
+
+def run_stage_in_child(stage: str, inventory_path: str, sales_path: str, rows: int, repeat: int) -> Dict[str, Any]:
+    command = [sys.executable, os.path.abspath(__file__), "--child", stage, inventory_path, sales_path,
+               str(rows), str(repeat)]
+    completed = subprocess.run(command, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if completed.returncode != 0:
+        raise RuntimeError(f"{stage} failed:\n{completed.stderr[-2000:]}")
+    # Agent modules print on import; the result is the last line
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def dataset_for(size: int, seed: int, data_dir: str) -> Dict[str, str]:
+    """Generated files for this size and seed, created on first use"""
+    out_dir = os.path.join(data_dir, f"{size}-seed{seed}")
+    paths = {"inventory": os.path.join(out_dir, INVENTORY_FILENAME), "sales": os.path.join(out_dir, SALES_FILENAME)}
+    if not all(os.path.exists(path) for path in paths.values()):
+        generate(out_dir, size, size, seed)
+    return paths
+
+
+def git_revision() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                                    text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip())
+    except OSError:
+        return {"commit": None, "dirty": None}
+    return {"commit": commit or None, "dirty": dirty}
+
+
+def compare(report: Dict[str, Any], previous: Dict[str, Any], max_regression: Optional[float]) -> List[str]:
+    """Print median time and allocation changes; returns the regressions beyond max_regression"""
+    before = {(row["rows"], row["stage"]): row for row in previous.get("results", [])}
+    print(f"\nCompared with {previous.get('git', {}).get('commit') or 'previous run'}:")
+    print(f"{'rows':>10}  {'stage':<10}{'median ms':>12}{'before':>12}{'change':>9}{'alloc MB':>11}{'before':>10}")
+    regressions = []
+    for row in report["results"]:
+        old = before.get((row["rows"], row["stage"]))
+        if not old:
+            continue
+        change = row["time_ms_median"] / old["time_ms_median"] - 1 if old["time_ms_median"] else 0.0
+        print(f"{row['rows']:>10,}  {row['stage']:<10}{row['time_ms_median']:>12.2f}{old['time_ms_median']:>12.2f}"
+              f"{change:>+9.0%}{row['alloc_peak_mb']:>11.2f}{old['alloc_peak_mb']:>10.2f}")
+        # Sub-millisecond stages are too noisy for a relative threshold alone
+        if max_regression is not None and change > max_regression and \
+                row["time_ms_median"] - old["time_ms_median"] > 1.0:
+            regressions.append(f"{row['stage']} at {row['rows']:,} rows: {change:+.0%} median time")
+    return regressions
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--child"]:
+        stage, inventory_path, sales_path, rows, repeat = argv[1:6]
+        print(json.dumps(measure_stage(stage, inventory_path, sales_path, int(rows), int(repeat))))
+        return 0
+
+    parser = argparse.ArgumentParser(description="Benchmark loading, aggregation and prompt building over CSV datasets")
+    parser.add_argument("--sizes", default="10k,100k,1M", help="Rows per file, comma-separated (default: 10k,100k,1M)")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"Stages to run (default: {','.join(STAGES)})")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage (default: 3)")
+    parser.add_argument("--seed", type=int, default=1, help="Dataset generator seed (default: 1)")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="Where generated datasets are kept and reused")
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Results JSON from an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, help="Fail when a median time grows by more than this fraction")
+    args = parser.parse_args(argv)
+
+    sizes = [parse_count(size) for size in args.sizes.split(",") if size.strip()]
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+
+    report = {
+        "benchmark": "data_path",
+        "created_at": datetime.utcnow().isoformat(),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": []
+    }
+    print(f"{'rows':>10}  {'stage':<10}{'min ms':>11}{'median ms':>11}{'peak RSS MB':>13}{'stage RSS MB':>14}"
+          f"{'alloc MB':>10}{'held MB':>9}")
+    for size in sizes:
+        paths = dataset_for(size, args.seed, os.path.abspath(args.data_dir))
+        for stage in stages:
+            row = run_stage_in_child(stage, paths["inventory"], paths["sales"], size, args.repeat)
+            report["results"].append(row)
+            rss = f"{row['peak_rss_mb']:>13.1f}{row['stage_rss_mb']:>14.1f}" if row["peak_rss_mb"] is not None \
+                else f"{'n/a':>13}{'n/a':>14}"
+            print(f"{size:>10,}  {stage:<10}{row['time_ms_min']:>11.2f}{row['time_ms_median']:>11.2f}{rss}"
+                  f"{row['alloc_peak_mb']:>10.2f}{row['retained_mb']:>9.2f}")
+
+    if args.json_path:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json_path)), exist_ok=True)
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Results written to {args.json_path}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.max_regression)
+        for regression in regressions:
+            print(f"✗ Regression: {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,355 @@
+"""
+Dataset Generator - Deterministic synthetic retail inventory and sales CSVs for benchmarks
+
+The real retail CSVs are Git LFS objects, so a fresh clone has only pointer files. This
+writes files with the exact cleaned schemas that load_suppliers_from_file() reads (see
+data/data-cleaning), shaped after data/Retail/*-analysis-results:
+
+    inventory   One row per product stocked at a branch. The 10 real branches stock
+                67-90k lines each; 96 departments ("Top : Sub"), ~270 groups, skewed
+                towards Gifts, Self Selection Stands and Jewellery; messy Packsize values
+                ('1', '', '0', '50ml', '20caps', '28 Sachets', stray product codes).
+    sales       One row per sale line. Product popularity is Zipf-like (a few analgesics
+                and cold remedies sell thousands of units, most products a handful),
+                branches are weighted by their real transaction counts, and Turnover,
+                VAT, discounts and Profit are consistent with the prices.
+
+The same seed and row counts always produce byte-identical files. Rows are streamed to
+disk, so 50M rows need only the product catalog in memory. Inventory rows are
+products x branches: above ~1M rows the catalog stops growing (--products) and more
+branches are added instead.
+
+Usage:
+    python backend/dataset_generator.py --inventory-rows 100k --sales-rows 200k
+    python backend/dataset_generator.py --inventory-rows 10M --sales-rows 50M --seed 7 --out-dir /data/bench
+    INVENTORY_FILE=data/synthetic/retail_inventory_synthetic.csv \\
+    SALES_FILE=data/synthetic/retail_sales_synthetic.csv python backend/orchestrator.py
+"""
+import argparse
+import bisect
+import csv
+import itertools
+import math
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+INVENTORY_COLUMNS = [
+    "Product", "Packsize", "Headoffice ID", "Barcode", "OrderList", "Case Size", "Trade Price", "RRP",
+    "Dept Fullname", "Group Fullname", "Branch Name", "Branch Stock Level"
+]
+SALES_COLUMNS = [
+    "Product", "Packsize", "Headoffice ID", "Branch Name", "Dept Fullname", "Group Fullname", "Trade Price", "RRP",
+    "Sale ID", "Qty Sold", "Turnover", "Vat Amount", "Sale VAT Rate", "Turnover ex VAT", "Disc Amount", "Profit",
+    "Refund Value"
+]
+
+DEFAULT_OUT_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'synthetic')
+INVENTORY_FILENAME = "retail_inventory_synthetic.csv"
+SALES_FILENAME = "retail_sales_synthetic.csv"
+
+# Branch -> (inventory lines, sales transactions) from the analysis results
+BRANCHES = {
+    "Baggot St": (89521, 292807),
+    "Barrow St": (89518, 222894),
+    "Castletymon": (89516, 87077),
+    "Ranelagh Village": (89509, 99610),
+    "Glenview": (89474, 66072),
+    "Sandford Rd": (89459, 47807),
+    "Mater Hospital": (74228, 140261),
+    "Kinvara": (74071, 125576),
+    "Churchtown": (71108, 173865),
+    "Bhagwans": (67961, 68082),
+}
+
+# 96 departments, listed roughly from most to least stocked
+DEPARTMENTS = [
+    "Gifts : Gifts", "Self Selection Stands : Self Selection Stands", "Jewellery : Jewellery",
+    "Toiletries : Skincare", "Beauty Accessories : Beauty Accessories", "Cosmetics : Face", "Cosmetics : Eyes",
+    "Cosmetics : Lips", "Fragrance : Womens Fragrance", "Fragrance : Mens Fragrance", "Gifts : Christmas",
+    "Toiletries : Haircare", "Toiletries : Bodycare", "Vitamins", "OTC", "OTC : Analgesics", "OTC : First Aid",
+    "OTC : Cold & Flu", "OTC : GIT", "OTC : Eye Ear Nose & Throat", "Dermo Skincare", "Dermo Skincare : La Roche Posay",
+    "Dermo Skincare : CeraVe", "Dermo Skincare : Vichy", "Dermo Skincare : Avene", "Dermo Skincare : Bioderma",
+    "Dermo Skincare : Eucerin", "Gifts : Greeting Cards", "Gifts : Seasonal", "Gifts : Gift Wrap", "Gifts : Candles",
+    "Toiletries : Deodorants", "Toiletries : Shaving", "Toiletries : Sun Care", "Toiletries : Dental",
+    "Toiletries : Feminine Hygiene", "Toiletries : Hand Care", "Cosmetics : Nails", "Cosmetics : Brushes",
+    "Fragrance : Gift Sets", "Beauty Accessories : Hair Accessories", "Jewellery : Watches", "Hair : Hair Colour",
+    "Hair : Hair Styling", "Babycare : Accessories", "Babycare : Baby Feeding", "Babycare : Nappies",
+    "Babycare : Baby Food", "Babycare : Babycare Toiletries", "Vitamins : Multivitamins", "Vitamins : Vitamin D",
+    "Vitamins : Probiotics", "Vitamins : Omega 3", "Vitamins : Kids Vitamins", "Vitamins : Minerals",
+    "OTC : Allergy", "OTC : Skin Treatments", "OTC : Smoking Cessation", "OTC : Sleep Aids", "OTC : Womens Health",
+    "OTC : Mens Health", "OTC : Foot Care", "OTC : Oral Care", "OTC : Travel", "OTC : Pharmacy Only",
+    "Nutritional Supplements : Protein", "Nutritional Supplements : Slimming",
+    "Nutritional Supplements : Sports Nutrition", "Nutritional Supplements : Kinetica Nutrition",
+    "Sunglasses & Readers : Reading Glasses", "Sunglasses & Readers : Sunglasses", "Confectionery : Confectionery",
+    "Confectionery : Drinks", "Photo : Photo Printing", "Photo : Passport Photos", "HomeCare : Mobility",
+    "HomeCare : Incontinence", "HomeCare : Blood Pressure Monitors", "HomeCare : Thermometers",
+    "HomeCare : Compression Stockings", "Sexual Health : Sexual Health", "Stationery : Stationery",
+    "Pet Care : Pet Care", "Household : Household", "SkinLab : Skinlab", "Prescriptions : GMS Rx",
+    "Prescriptions : LTI Rx", "Prescriptions : Psychiatric Rx", "Prescriptions : DPS Rx", "Prescriptions : Private Rx",
+    "Consultation Services : Flu Vaccine", "Consultation Services : Blood Pressure",
+    "Consultation Services : Travel Vaccines", "Consultation Services : Blood Glucose",
+    "Dermo Skincare : Skin Lab Treatment", "Consultation Services : Pneumococcal Vaccine",
+]
+
+# Medicines sell far more units than their share of the catalog; gifts and jewellery far fewer
+SALES_BOOST = {"OTC": 12.0, "Vitamins": 6.0, "Dermo Skincare": 3.0, "Nutritional Supplements": 2.0,
+               "Babycare": 1.5, "Gifts": 0.3, "Jewellery": 0.2, "Self Selection Stands": 0.6}
+ZERO_VAT = ("OTC", "Vitamins", "Nutritional Supplements", "Prescriptions", "Consultation Services", "Babycare")
+
+BRANDS = [
+    "Nurofen", "Panadol", "Solpadeine", "Perrigo", "Cetrine", "Benylin", "Sudafed", "Strepsils", "Calpol",
+    "Mepore", "Medporex", "Jakemans", "Revive Active", "Symprove", "Hylo", "Daktarin", "Imodium", "Piriton",
+    "La Roche Posay", "CeraVe", "Vichy", "Avene", "Bioderma", "Eucerin", "Caudalie", "Catrice", "L'Oreal", "NYX",
+    "Rimmel", "Maybelline", "Sanctuary", "Baylis & Harding", "Yankee", "Colgate", "Oral-B", "Nivea", "Dove",
+    "Pampers", "Aptamil", "Centrum", "Solgar", "Kinetica", "Calvin Klein", "Hugo Boss", "Newgrange", "Tipperary Crystal",
+]
+FORMS = [
+    "Tablets", "Film Coated Tablets", "Capsules", "Soluble Tablets", "Cream", "Gel", "Spray", "Nasal Spray",
+    "Syrup", "Lotion", "Eye Drops", "Shampoo", "Serum", "Balm", "Lozenges", "Sachets", "Wipes", "Plasters",
+    "Dressing", "Gift Set", "Candle", "Eau de Toilette", "Mascara", "Lipstick", "Foundation", "Necklace", "Bracelet",
+]
+STRENGTHS = ["", "", "", "200mg ", "400mg ", "500mg ", "1000iu ", "Maximum Strength ", "Sugar Free ", "Extra ", "Kids "]
+SUPPLIERS = [
+    ("Uniphar", 30), ("United Drug", 25), ("Sifco", 8), ("Cosmetica", 6), ("Fragrance Direct", 5),
+    ("Delisted Products", 4), ("Allcare Wholesale", 3), ("Medicare Distribution", 3), ("Boyne Gifts", 2),
+    ("Celtic Jewellery Co", 2), ("Clonmel Healthcare", 2), ("Beauty Brands Ireland", 2), ("Kinetica Sports", 1),
+    ("Novum Pharma", 1), ("Mayo Crystal", 1), ("Whiterock Cards", 1), ("Harbour Confectionery", 1),
+]
+GROUP_SUFFIXES = ["", "Other", "Premium", "Value", "Seasonal"]
+
+# Packsize -> weight: the real column mixes units, counts, blanks and stray product codes
+PACKSIZES = [
+    ("1", 150), ("", 55), ("0", 30), ("50ml", 35), ("200ml", 26), ("24", 25), ("30", 20), ("100ml", 18),
+    ("12", 12), ("16", 8), ("20", 8), ("60", 6), ("90", 4), ("30ml", 10), ("150ml", 8), ("400ml", 6),
+    ("7.5ml", 3), ("73g", 3), ("2g", 2), ("30g", 4), ("20caps", 2), ("40caps", 1), ("80caps", 1),
+    ("28 Sachets", 1), ("90 Capsules", 1), ("2 x 10ml", 1), ("50 ML", 2), ("50Ml", 1), (" 200ml", 1),
+    ("12s", 3), ("24S", 1), ("each", 2), ("1x1", 1), ("EM61", 1), ("TT1317-6", 1),
+]
+
+# Past this many inventory rows the catalog stops growing and more branches are added
+MAX_PRODUCTS = 100_000
+
+
+def parse_count(value: str) -> int:
+    """'10000', '10k', '2.5M' -> int"""
+    text = value.strip().lower().replace("_", "").replace(",", "")
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    if multiplier > 1:
+        text = text[:-1]
+    count = int(float(text) * multiplier)
+    if count < 1:
+        raise argparse.ArgumentTypeError(f"row count must be positive: {value}")
+    return count
+
+
+def _cumulative(weights: List[float]) -> List[float]:
+    return list(itertools.accumulate(weights))
+
+
+def _pick(rng: random.Random, values: List[Any], cumulative: List[float]) -> Any:
+    return values[bisect.bisect(cumulative, rng.random() * cumulative[-1])]
+
+
+def build_branches(count: int, rng: random.Random) -> List[Tuple[str, float, float]]:
+    """(name, share of the catalog stocked, sales weight) for count branches"""
+    largest = max(lines for lines, _ in BRANCHES.values())
+    branches = [(name, lines / largest, sales) for name, (lines, sales) in BRANCHES.items()][:count]
+    for number in range(len(branches) + 1, count + 1):
+        branches.append((f"Branch {number:03d}", rng.uniform(0.75, 1.0), rng.uniform(45_000, 300_000)))
+    return branches
+
+
+def build_groups(rng: random.Random) -> Dict[str, List[str]]:
+    """Department -> its product groups (~270 in all, as in the real data)"""
+    groups = {}
+    for dept in DEPARTMENTS:
+        top, _, sub = dept.partition(" : ")
+        base = sub or top
+        names = [base]
+        for brand in rng.sample(BRANDS, rng.randint(0, 4)):
+            suffix = rng.choice(GROUP_SUFFIXES)
+            names.append(f"{brand} {top}" + (f" {suffix}" if suffix else ""))
+        groups[dept] = names
+    return groups
+
+
+def build_catalog(products: int, seed: int) -> List[Tuple]:
+    """
+    Product catalog: (product, packsize, headoffice_id, barcode, supplier, case_size,
+    trade_price, rrp, dept, group, sales_weight); sales weights are Zipf-like over a
+    popularity ranking that puts medicines first more often than gifts
+    """
+    rng = random.Random(seed * 7919 + 1)
+    groups = build_groups(rng)
+    dept_cumulative = _cumulative([1 / (rank + 3) ** 1.15 for rank in range(len(DEPARTMENTS))])
+    supplier_names = [name for name, _ in SUPPLIERS]
+    supplier_cumulative = _cumulative([weight for _, weight in SUPPLIERS])
+    pack_values = [value for value, _ in PACKSIZES]
+    pack_cumulative = _cumulative([weight for _, weight in PACKSIZES])
+    catalog, ranking_keys = [], []
+    for index in range(products):
+        dept = _pick(rng, DEPARTMENTS, dept_cumulative)
+        top = dept.partition(" : ")[0]
+        packsize = _pick(rng, pack_values, pack_cumulative)
+        count = rng.choice((10, 12, 16, 20, 24, 30, 60, 90))
+        name = f"{rng.choice(BRANDS)} {rng.choice(STRENGTHS)}{rng.choice(FORMS)} {count}s"
+        if rng.random() < 0.3:
+            name = f"{name} {rng.choice(('Pack', 'Twin Pack', 'Value', 'New', 'XL', 'Travel'))}"
+        trade = round(min(rng.lognormvariate(1.6, 0.8), 400.0), 2)
+        if top in ("Prescriptions", "Consultation Services") and rng.random() < 0.6:
+            trade, rrp = 0.0, 0.0
+        else:
+            rrp = round(math.ceil(trade * rng.uniform(1.3, 2.2)) - rng.choice((0.01, 0.05, 0.51)), 2)
+            rrp = max(rrp, trade)
+        barcode = "" if rng.random() < 0.04 else str(rng.randrange(10 ** 11, 10 ** 13)).zfill(13)
+        ranking_keys.append(rng.random() ** (1 / SALES_BOOST.get(top, 1.0)))
+        catalog.append((
+            name, packsize, 100000 + index, barcode, _pick(rng, supplier_names, supplier_cumulative),
+            rng.choice((1, 1, 1, 6, 12, 24)), trade, rrp, dept, rng.choice(groups[dept])
+        ))
+
+    # Rank 0 is the best seller; the top 50 then sell ~4x more than the 50th (as in the real data)
+    ranking = sorted(range(products), key=lambda index: -ranking_keys[index])
+    weights = [0.0] * products
+    for rank, index in enumerate(ranking):
+        weights[index] = 1 / (rank + 15)
+    return [product + (weight,) for product, weight in zip(catalog, weights)]
+
+
+def inventory_rows(catalog: List[Tuple], branches: List[Tuple[str, float, float]], rows: int,
+                   seed: int) -> Iterator[Tuple]:
+    """Stocked (product, branch) lines until `rows` have been produced"""
+    rng = random.Random(seed * 7919 + 2)
+    produced = 0
+    while True:
+        for product in catalog:
+            name, packsize, headoffice_id, barcode, supplier, case_size, trade, rrp, dept, group, _ = product
+            for branch, stocked_share, _ in branches:
+                if rng.random() >= stocked_share:
+                    continue
+                level = 0 if rng.random() < 0.35 else int(rng.expovariate(0.12))
+                if rng.random() < 0.02:
+                    level = -rng.randint(1, 6)  # sold before the delivery was booked in
+                yield (name, packsize, headoffice_id, barcode, supplier, case_size, trade, rrp,
+                       dept, group, branch, level)
+                produced += 1
+                if produced >= rows:
+                    return
+
+
+def sales_rows(catalog: List[Tuple], branches: List[Tuple[str, float, float]], rows: int,
+               seed: int, batch: int = 10_000) -> Iterator[Tuple]:
+    """Sale lines drawn by product popularity and branch weight"""
+    rng = random.Random(seed * 7919 + 3)
+    product_cumulative = _cumulative([product[-1] for product in catalog])
+    branch_names = [name for name, _, _ in branches]
+    branch_cumulative = _cumulative([weight for _, _, weight in branches])
+    sale_id = 5_000_000
+    produced = 0
+    while produced < rows:
+        count = min(batch, rows - produced)
+        products = rng.choices(catalog, cum_weights=product_cumulative, k=count)
+        branch_draws = rng.choices(branch_names, cum_weights=branch_cumulative, k=count)
+        for product, branch in zip(products, branch_draws):
+            name, packsize, headoffice_id, _, _, _, trade, rrp, dept, group, _ = product
+            if rng.random() < 0.6:
+                sale_id += 1  # otherwise another line of the same basket
+            roll = rng.random()
+            qty = 1 if roll < 0.86 else 2 if roll < 0.95 else rng.randint(3, 12)
+            refund = 0.0
+            if rng.random() < 0.01:
+                qty, refund = 0, round(rrp * rng.randint(1, 2), 2)
+            gross = qty * rrp
+            discount = round(gross * rng.choice((0.05, 0.1, 0.2, 0.3)), 2) if rng.random() < 0.08 else 0.0
+            turnover = round(gross - discount, 2)
+            vat_rate = 0.0 if dept.partition(" : ")[0] in ZERO_VAT else 23.0
+            vat = round(turnover * vat_rate / (100 + vat_rate), 2)
+            ex_vat = round(turnover - vat, 2)
+            profit = round(ex_vat - qty * trade, 2)
+            yield (name, packsize, headoffice_id, branch, dept, group, trade, rrp, sale_id, qty, turnover,
+                   vat, vat_rate, ex_vat, discount, profit, refund)
+        produced += count
+
+
+def write_csv(path: str, columns: List[str], rows: Iterator[Tuple], total: int, label: str) -> Dict[str, Any]:
+    """Stream rows to path, printing progress every million rows"""
+    start = time.perf_counter()
+    written = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(columns)
+        while True:
+            chunk = list(itertools.islice(rows, 100_000))
+            if not chunk:
+                break
+            writer.writerows(chunk)
+            previous, written = written, written + len(chunk)
+            if written // 1_000_000 > previous // 1_000_000:
+                rate = written / (time.perf_counter() - start)
+                print(f"  {label}: {written:,}/{total:,} rows ({rate:,.0f} rows/s)")
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(path)
+    print(f"✓ {label}: {written:,} rows, {size / 1e6:,.1f} MB in {elapsed:.1f} s → {path}")
+    return {"path": path, "rows": written, "bytes": size, "seconds": round(elapsed, 2)}
+
+
+def generate(out_dir: str, inventory_count: int, sales_count: int, seed: int = 1,
+             products: Optional[int] = None, branch_count: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Write the inventory and sales CSVs to out_dir
+
+    Returns:
+        dict: success, catalog size, branch count and per-file rows/bytes/seconds
+    """
+    # The real branches stock ~9.3 lines per product; extra branches (~87% stocked) take the rest
+    largest = max(lines for lines, _ in BRANCHES.values())
+    per_product = sum(lines for lines, _ in BRANCHES.values()) / largest
+    products = products or max(100, min(MAX_PRODUCTS, math.ceil(inventory_count / per_product)))
+    if not branch_count:
+        missing = inventory_count - products * per_product
+        branch_count = len(BRANCHES) + max(0, math.ceil(missing / (products * 0.875)))
+    os.makedirs(out_dir, exist_ok=True)
+
+    print(f"Generating {inventory_count:,} inventory and {sales_count:,} sales rows "
+          f"({products:,} products, {branch_count} branches, seed {seed})")
+    branches = build_branches(branch_count, random.Random(seed * 7919))
+    catalog = build_catalog(products, seed)
+    inventory = write_csv(os.path.join(out_dir, INVENTORY_FILENAME), INVENTORY_COLUMNS,
+                          inventory_rows(catalog, branches, inventory_count, seed), inventory_count, "inventory")
+    sales = write_csv(os.path.join(out_dir, SALES_FILENAME), SALES_COLUMNS,
+                      sales_rows(catalog, branches, sales_count, seed), sales_count, "sales")
+    return {
+        "success": True,
+        "products": products,
+        "branches": branch_count,
+        "seed": seed,
+        "inventory": inventory,
+        "sales": sales
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate synthetic retail inventory and sales CSVs")
+    parser.add_argument("--inventory-rows", type=parse_count, default=parse_count("100k"),
+                        help="Inventory rows, e.g. 10k, 1M, 50M (default: 100k)")
+    parser.add_argument("--sales-rows", type=parse_count, default=parse_count("200k"),
+                        help="Sales rows, e.g. 10k, 1M, 50M (default: 200k)")
+    parser.add_argument("--seed", type=int, default=1, help="Same seed and sizes give identical files")
+    parser.add_argument("--products", type=int, help=f"Catalog size (default: inventory rows / 9.3, at most {MAX_PRODUCTS:,})")
+    parser.add_argument("--branches", type=int, help="Branch count (default: 10, more when the catalog is capped)")
+    parser.add_argument("--out-dir", default=DEFAULT_OUT_DIR, help="Output directory (default: data/synthetic)")
+    args = parser.parse_args(argv)
+
+    result = generate(os.path.abspath(args.out_dir), args.inventory_rows, args.sales_rows, args.seed,
+                      args.products, args.branches)
+    print("\nPoint the services at the generated files with:")
+    print(f"  INVENTORY_FILE={result['inventory']['path']}")
+    print(f"  SALES_FILE={result['sales']['path']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
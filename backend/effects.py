@@ -0,0 +1,129 @@
+"""
+Effects - Write workflow logic once, run it on threads or on an asyncio event loop
+
+Logic that does I/O is written as a generator that yields effects (descriptions of the
+I/O it needs) and receives their results back at the yield. A driver performs them:
+
+    run(gen)          performs each effect in the calling thread (Flask orchestrator,
+                      batch runner, the agent functions)
+    await arun(gen)   performs each effect on the event loop (Quart orchestrator)
+
+An exception raised while performing an effect is thrown into the generator at its yield,
+so try/except around a yield behaves exactly as it would around a direct call. Generators
+compose with `yield from`, and return their result.
+
+    Call(fn, *args)         fn(*args), awaited when it returns an awaitable: for objects with
+                            the same method names in both flavours (AdmissionController and
+                            AsyncAdmissionController, SingleFlight and AsyncSingleFlight)
+    Either(fn, afn, *args)  fn(*args) on threads, await afn(*args) on the event loop: for
+                            I/O with separate sync and async clients (the model backends)
+    Blocking(fn, *args)     fn(*args); on the event loop it runs in a worker thread, so
+                            blocking work (SQLite, CSV parsing) never stalls the loop
+    Sleep(seconds)          time.sleep or asyncio.sleep
+
+By convention the generator behind a function `f` is named `f_effects`; `f` is then a
+one-line run() over it, and async callers use `await arun(f_effects(...))`.
+"""
+import asyncio
+import inspect
+import time
+from typing import Any, Awaitable, Callable, Generator
+
+# A generator yielding Effects and returning a result
+Effects = Generator["Effect", Any, Any]
+
+
+class Effect:
+    """One piece of I/O, performed by a driver"""
+
+    def run(self) -> Any:
+        raise NotImplementedError
+
+    async def arun(self) -> Any:
+        raise NotImplementedError
+
+
+class Call(Effect):
+    """fn(*args, **kwargs), awaiting the result when fn is a coroutine function"""
+
+    def __init__(self, fn: Callable[..., Any], *args, **kwargs):
+        self.fn, self.args, self.kwargs = fn, args, kwargs
+
+    def run(self) -> Any:
+        return self.fn(*self.args, **self.kwargs)
+
+    async def arun(self) -> Any:
+        result = self.fn(*self.args, **self.kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+
+class Either(Effect):
+    """fn(*args, **kwargs) when run on threads, afn(*args, **kwargs) on the event loop"""
+
+    def __init__(self, fn: Callable[..., Any], afn: Callable[..., Awaitable[Any]], *args, **kwargs):
+        self.fn, self.afn, self.args, self.kwargs = fn, afn, args, kwargs
+
+    def run(self) -> Any:
+        return self.fn(*self.args, **self.kwargs)
+
+    async def arun(self) -> Any:
+        return await self.afn(*self.args, **self.kwargs)
+
+
+class Blocking(Effect):
+    """Blocking fn(*args, **kwargs); moved to a worker thread on the event loop"""
+
+    def __init__(self, fn: Callable[..., Any], *args, **kwargs):
+        self.fn, self.args, self.kwargs = fn, args, kwargs
+
+    def run(self) -> Any:
+        return self.fn(*self.args, **self.kwargs)
+
+    async def arun(self) -> Any:
+        return await asyncio.to_thread(self.fn, *self.args, **self.kwargs)
+
+
+class Sleep(Effect):
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def run(self):
+        time.sleep(self.seconds)
+
+    async def arun(self):
+        await asyncio.sleep(self.seconds)
+
+
+def perform(effect: Effect) -> Effects:
+    """Effects of just this one: drive(perform(effect)) runs a single effect from a callback"""
+    return (yield effect)
+
+
+def run(gen: Effects) -> Any:
+    """Drive a generator of effects to completion in the calling thread; returns its result"""
+    send, value = gen.send, None
+    while True:
+        try:
+            effect = send(value)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            send, value = gen.send, effect.run()
+        except BaseException as e:
+            send, value = gen.throw, e
+
+
+async def arun(gen: Effects) -> Any:
+    """Drive a generator of effects to completion on the running event loop; returns its result"""
+    send, value = gen.send, None
+    while True:
+        try:
+            effect = send(value)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            send, value = gen.send, await effect.arun()
+        except BaseException as e:
+            send, value = gen.throw, e
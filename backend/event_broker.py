@@ -0,0 +1,199 @@
+"""
+Event Broker - Fan-out of server-sent events to every connected subscriber
+
+Each subscriber (an open event stream) gets its own bounded buffer, so every published
+event reaches every subscriber, and a slow one cannot hold up the others or the publisher.
+Publishing appends to each subscriber's buffer and wakes it: the cost grows with the
+number of subscribers, never with how many events were published before.
+
+Every event gets the next sequence number, sent as its SSE id behind this process's epoch
+(see workflow_events), and the most recent ones are kept in a bounded log. A client that
+reconnects with Last-Event-ID is sent just the events it missed; one whose ID is no longer
+in the log, or is from another epoch, has to resync from full state.
+
+A subscriber whose buffer is full when an event arrives is a slow consumer. What happens
+then depends on the policy:
+
+    disconnect   The subscriber gets what is already buffered, then its stream ends; the
+                 client reconnects with Last-Event-ID and catches up from the log
+    drop         The oldest buffered event is dropped to make room; the subscriber is told
+                 how many it missed with its next batch
+
+Configuration:
+    SSE_BUFFER          Events buffered per subscriber (default: 256)
+    SSE_SLOW_CONSUMER   disconnect | drop (default: disconnect)
+    SSE_HISTORY         Events kept for Last-Event-ID replay (default: 1000)
+"""
+import os
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+import metrics
+from workflow_events import WorkflowEvent, format_event_id
+
+POLICIES = ("disconnect", "drop")
+
+
+class Subscription:
+    """One subscriber's buffer; publishers offer() items, the stream take()s them"""
+
+    def __init__(self, broker: "EventBroker", capacity: int, policy: str):
+        self.broker = broker
+        self.capacity = capacity
+        self.policy = policy
+        self.buffer: deque = deque()
+        self.dropped = 0              # Dropped since the last take()
+        self.closed = False
+        self.close_reason: Optional[str] = None
+        self._cond = threading.Condition(threading.Lock())
+
+    def offer(self, item: Any) -> str:
+        """Buffer an item; returns buffered, dropped (the oldest made room), disconnected or closed"""
+        with self._cond:
+            if self.closed:
+                return "closed"
+            outcome = "buffered"
+            if len(self.buffer) >= self.capacity:
+                if self.policy == "disconnect":
+                    self.closed = True
+                    self.close_reason = "slow_consumer"
+                    self._cond.notify()
+                    return "disconnected"
+                self.buffer.popleft()
+                self.dropped += 1
+                outcome = "dropped"
+            self.buffer.append(item)
+            self._cond.notify()
+            return outcome
+
+    def take(self, timeout: Optional[float] = None) -> Tuple[List[Any], int]:
+        """
+        Wait up to timeout seconds for items and take everything buffered
+
+        Returns:
+            (items in publish order, events dropped before them); both empty on timeout
+            or when the subscription was closed (check closed)
+        """
+        with self._cond:
+            if not self.buffer and not self.closed:
+                self._cond.wait(timeout)
+            items = list(self.buffer)
+            self.buffer.clear()
+            dropped, self.dropped = self.dropped, 0
+            return items, dropped
+
+    def close(self, reason: str = "unsubscribed"):
+        """End the subscription and remove it from the broker"""
+        with self._cond:
+            if not self.closed:
+                self.closed = True
+                self.close_reason = reason
+            self._cond.notify()
+        self.broker._remove(self)
+
+
+class EventBroker:
+    """Thread-safe broadcast to every subscriber, with per-subscriber bounded buffers and replay"""
+
+    def __init__(
+        self,
+        service: str,
+        capacity: Optional[int] = None,
+        policy: Optional[str] = None,
+        history: Optional[int] = None
+    ):
+        self.service = service
+        self.capacity = max(1, capacity or int(os.getenv('SSE_BUFFER', '256')))
+        self.policy = (policy or os.getenv('SSE_SLOW_CONSUMER', 'disconnect')).lower()
+        if self.policy not in POLICIES:
+            print(f"⚠ Unknown SSE_SLOW_CONSUMER '{self.policy}', using disconnect")
+            self.policy = "disconnect"
+        # Replaced (not modified) on subscribe/unsubscribe, so publish reads it without copying
+        self._subscribers: Tuple[Subscription, ...] = ()
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._log: deque = deque(maxlen=max(1, history or int(os.getenv('SSE_HISTORY', '1000'))))
+        self._counts = {"published": 0, "dropped": 0, "disconnected": 0}
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Tuple[Subscription, Optional[List[WorkflowEvent]]]:
+        """
+        Register a subscriber and collect what it missed, atomically
+
+        Args:
+            last_event_id: Sequence number of the last event the client saw (see
+                workflow_events.parse_last_event_id)
+
+        Returns:
+            (subscription, missed events: empty for a new client, None when last_event_id
+             is older than the log or unknown and the client must resync)
+        """
+        subscription = Subscription(self, self.capacity, self.policy)
+        with self._lock:
+            self._subscribers = self._subscribers + (subscription,)
+            current_id = self._next_id - 1
+            oldest = self._log[0].id if self._log else self._next_id
+            if last_event_id is None:
+                missed = []
+            elif oldest - 1 <= last_event_id <= current_id:
+                # IDs are consecutive, so the missed events are the log's tail
+                missed = list(self._log)[len(self._log) - (current_id - last_event_id):]
+            else:
+                missed = None
+        return subscription, missed
+
+    def _remove(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers = tuple(s for s in self._subscribers if s is not subscription)
+
+    def publish(self, data: Dict[str, Any], event: Optional[str] = None) -> WorkflowEvent:
+        """Number an event, log it and hand it to every subscriber"""
+        dropped = 0
+        slow: List[Subscription] = []
+        # Numbering and fan-out under one lock: every buffer receives events in ID order
+        with self._lock:
+            item = WorkflowEvent(self._next_id, event, data)
+            self._next_id += 1
+            self._log.append(item)
+            for subscription in self._subscribers:
+                outcome = subscription.offer(item)
+                if outcome == "disconnected":
+                    slow.append(subscription)
+                dropped += outcome == "dropped"
+            self._counts["published"] += 1
+            self._counts["dropped"] += dropped
+            self._counts["disconnected"] += len(slow)
+        if dropped:
+            metrics.sse_slow_consumers.inc(dropped, service=self.service, action="dropped")
+        for subscription in slow:
+            metrics.sse_slow_consumers.inc(service=self.service, action="disconnected")
+            print(f"⚠ [BROKER] Disconnecting a slow {self.service} stream ({self.capacity} events behind)")
+            subscription.close("slow_consumer")
+        return item
+
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def clear_history(self):
+        """Forget logged events (IDs keep counting up, so older clients resync)"""
+        with self._lock:
+            self._log.clear()
+
+    def close_all(self, reason: str = "shutdown"):
+        """End every subscription (streams finish after what they have buffered)"""
+        for subscription in self._subscribers:
+            subscription.close(reason)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+            last_event_id, history = self._next_id - 1, len(self._log)
+        return {
+            "subscribers": self.subscriber_count(),
+            "buffer": self.capacity,
+            "slow_consumer_policy": self.policy,
+            "last_event_id": format_event_id(last_event_id),
+            "history": history,
+            **counts
+        }
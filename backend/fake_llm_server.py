@@ -0,0 +1,139 @@
+"""
+Fake LLM Server - Local stand-in for the Anthropic Messages API, for resilience testing
+
+Answers POST /v1/messages the way the real API does, but each response can be scripted:
+an immediate answer, a retryable error (529 overloaded, 500), a caller error (400) or a
+slow answer. Point the orchestrator at it with ANTHROPIC_BASE_URL (read by the anthropic
+SDK itself) to watch deadlines, retries, hedging and the circuit breaker work without
+an API key; tests/test_resilience.py drives it in-process.
+
+Behaviours:
+    ok            200 with a JSON plan as the message text
+    overloaded    529 (retryable)
+    error         500 (retryable)
+    bad_request   400 (not retryable)
+    slow:<s>      200 after <s> seconds
+
+Usage:
+    python backend/fake_llm_server.py --port 8765 --default overloaded
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765 ANTHROPIC_API_KEY=fake python backend/orchestrator.py
+"""
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+ERROR_STATUS = {"overloaded": 529, "error": 500, "bad_request": 400}
+ERROR_TYPES = {529: "overloaded_error", 500: "api_error", 400: "invalid_request_error"}
+
+DEFAULT_TEXT = json.dumps([
+    {"step_number": 1, "title": "Research Suppliers", "description": "Analyse inventory and sales data",
+     "agent": "researcher", "depends_on": [], "status": "pending"}
+])
+
+
+class FakeLLMServer:
+    """Scriptable fake Messages API on a local port (port=0 picks a free one)"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, default: str = "ok", text: str = DEFAULT_TEXT):
+        self.default = default
+        self.text = text
+        self.requests = 0
+        self._script = deque()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def script(self, *behaviours: str):
+        """Behaviours for the next requests, in order; after them, the default applies"""
+        with self._lock:
+            self._script.extend(behaviours)
+
+    def _next(self) -> str:
+        with self._lock:
+            self.requests += 1
+            return self._script.popleft() if self._script else self.default
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                behaviour = fake._next()
+                if behaviour.startswith("slow:"):
+                    time.sleep(float(behaviour.split(":", 1)[1]))
+                    behaviour = "ok"
+
+                if behaviour == "ok":
+                    self._send(200, {
+                        "id": "msg_fake", "type": "message", "role": "assistant",
+                        "model": body.get("model", "fake"),
+                        "content": [{"type": "text", "text": fake.text}],
+                        "stop_reason": "end_turn", "stop_sequence": None,
+                        "usage": {"input_tokens": 10, "output_tokens": 5}
+                    })
+                    return
+                status = ERROR_STATUS[behaviour]
+                self._send(status, {"type": "error", "error": {"type": ERROR_TYPES[status], "message": behaviour}})
+
+            def _send(self, status, payload):
+                data = json.dumps(payload).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up (deadline passed, or a hedge won)
+                    pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Anthropic Messages API for local resilience testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--default", default="ok", help="Behaviour for every request (see module docstring)")
+    args = parser.parse_args()
+
+    server = FakeLLMServer(args.host, args.port, default=args.default)
+    print(f"Fake LLM server on {server.url} (every request: {args.default})")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
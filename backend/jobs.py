@@ -0,0 +1,365 @@
+"""
+Job Manager - Background execution of long agent stages
+
+Long stages (research, drafting) are submitted to a bounded worker pool so the HTTP
+request returns immediately with a job ID. Jobs report status and progress, and can be
+cancelled: queued jobs never start, running jobs stop at their next checkpoint. Once a job
+commits (it is about to store its outputs) it can no longer be cancelled, so a workflow
+never keeps a stage's outputs with its status rolled back.
+
+JobManager runs jobs on a thread pool; AsyncJobManager runs coroutine jobs as asyncio
+tasks (for the async orchestrator) and cancels them immediately at their current await.
+"""
+import asyncio
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation was requested"""
+
+
+class Job:
+    """One background stage execution"""
+
+    def __init__(self, kind: str, workflow_id: Optional[str] = None):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.workflow_id = workflow_id
+        self.status = "queued"  # queued, running, succeeded, failed, cancelling, cancelled
+        self.progress = 0.0
+        self.message = "Queued"
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow().isoformat()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.future = None
+        self.on_cancel: Optional[Callable[["Job"], None]] = None
+        self.on_failure: Optional[Callable[["Job"], None]] = None
+        self._on_change: Optional[Callable[["Job"], None]] = None
+        self._cancel_requested = threading.Event()
+        self._committed = False
+        self._commit_lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed", "cancelled")
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel_requested.is_set()
+
+    def update_progress(self, progress: float, message: Optional[str] = None):
+        """Record progress (0..1) and act as a cancellation checkpoint"""
+        self.check_cancelled()
+        self.progress = max(self.progress, min(1.0, progress))
+        if message:
+            self.message = message
+        self.changed()
+
+    def changed(self):
+        """Tell the manager's listeners about a status or progress change"""
+        if self._on_change:
+            self._on_change(self)
+
+    @property
+    def committed(self) -> bool:
+        return self._committed
+
+    def check_cancelled(self):
+        if self._cancel_requested.is_set() and not self._committed:
+            raise JobCancelled(f"Job {self.id} was cancelled")
+
+    def commit(self):
+        """Last cancellation checkpoint: the job is about to store its outputs and will finish"""
+        with self._commit_lock:
+            self.check_cancelled()
+            self._committed = True
+
+    def _request_cancel(self) -> bool:
+        """Flag the job for cancellation; False when it has already committed"""
+        with self._commit_lock:
+            if self._committed:
+                return False
+            self._cancel_requested.set()
+            return True
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "workflow_id": self.workflow_id,
+            "status": self.status,
+            "progress": round(self.progress, 3),
+            "message": self.message,
+            "result": self.result if include_result else None,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "status_url": f"/api/jobs/{self.id}"
+        }
+
+
+def _run_hook(job: Job, hook: Optional[Callable[[Job], None]], name: str):
+    """Run an on_cancel/on_failure hook; a failing hook must not keep the job from finishing"""
+    if not hook:
+        return
+    try:
+        hook(job)
+    except Exception as e:
+        print(f"[JOB] {name} failed for {job.id}: {e}")
+
+
+class _JobHistory:
+    """Bounded, ordered job registry shared by the thread and asyncio managers"""
+
+    def __init__(self, max_workers: Optional[int] = None, max_history: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv('JOB_WORKERS', '8'))
+        self.max_history = max_history or int(os.getenv('JOB_HISTORY', '1000'))
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[Job], None]] = []
+
+    def add_listener(self, listener: Callable[[Job], None]):
+        """listener(job) is called on every status or progress change"""
+        self._listeners.append(listener)
+
+    def _notify(self, job: Job):
+        for listener in self._listeners:
+            try:
+                listener(job)
+            except Exception as e:
+                print(f"[JOB] Listener failed for {job.id}: {e}")
+
+    def _register(
+        self,
+        kind: str,
+        workflow_id: Optional[str],
+        on_cancel: Optional[Callable[[Job], None]],
+        on_failure: Optional[Callable[[Job], None]]
+    ) -> Job:
+        job = Job(kind, workflow_id)
+        job.on_cancel = on_cancel
+        job.on_failure = on_failure
+        job._on_change = self._notify
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        return job
+
+    @staticmethod
+    def _start(job: Job):
+        job.started_at = datetime.utcnow().isoformat()
+        job.check_cancelled()
+        if job.status == "queued":
+            job.status = "running"
+            job.message = "Running"
+            job.changed()
+
+    @staticmethod
+    def _complete(job: Job, result: Optional[Dict[str, Any]]):
+        # fn has returned: its outputs are stored, so a late cancellation request is moot
+        job.result = result
+        if result and "error" in result:
+            job.status = "failed"
+            job.error = result.get("details") or result["error"]
+            job.message = result["error"]
+        else:
+            job.status = "succeeded"
+            job.progress = 1.0
+            job.message = (result or {}).get("message", "Done")
+        job.finished_at = datetime.utcnow().isoformat()
+        job.changed()
+
+    @staticmethod
+    def _cancelled(job: Job, message: str = "Cancelled"):
+        job.status = "cancelled"
+        job.message = message
+        job.finished_at = datetime.utcnow().isoformat()
+        _run_hook(job, job.on_cancel, "on_cancel")
+        job.changed()
+
+    @staticmethod
+    def _failed(job: Job, error: Exception):
+        job.status = "failed"
+        job.error = str(error)
+        job.message = f"{job.kind} failed"
+        job.finished_at = datetime.utcnow().isoformat()
+        print(f"[JOB] {job.kind} {job.id} failed: {error}")
+        _run_hook(job, job.on_failure, "on_failure")
+        job.changed()
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond max_history (caller holds the lock)"""
+        excess = len(self._jobs) - self.max_history
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished][:excess]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, workflow_id: Optional[str] = None) -> List[Job]:
+        """Jobs newest first, optionally for one workflow"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job for job in reversed(jobs) if workflow_id is None or job.workflow_id == workflow_id]
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status == "queued")
+
+    def active_count(self) -> int:
+        """Jobs queued, running or cancelling"""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.finished)
+
+
+class JobManager(_JobHistory):
+    """Runs jobs on a bounded thread pool and keeps a bounded history"""
+
+    def __init__(self, max_workers: Optional[int] = None, max_history: Optional[int] = None):
+        super().__init__(max_workers, max_history)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+
+    def submit(
+        self,
+        kind: str,
+        fn: Callable[[Job], Dict[str, Any]],
+        workflow_id: Optional[str] = None,
+        on_cancel: Optional[Callable[[Job], None]] = None,
+        on_failure: Optional[Callable[[Job], None]] = None
+    ) -> Job:
+        """
+        Queue fn(job) for background execution
+        
+        Args:
+            kind: Job type, e.g. 'research' or 'drafting'
+            fn: Callable receiving the Job; returns a result dict. It should call
+                job.update_progress() between steps so cancellation can take effect.
+                A result containing "error" marks the job as failed.
+            workflow_id: Workflow the job belongs to
+            on_cancel: Called when the job stops because of cancellation,
+                e.g. to roll the workflow back to its previous status
+            on_failure: Called when fn raises (a returned error result is not a raise),
+                so the workflow is not left in the stage's in-progress status
+        """
+        job = self._register(kind, workflow_id, on_cancel, on_failure)
+        job.future = self._executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job: Job, fn: Callable[[Job], Dict[str, Any]]):
+        try:
+            self._start(job)
+            self._complete(job, fn(job))
+        except JobCancelled:
+            self._cancelled(job)
+        except Exception as e:
+            self._failed(job, e)
+        finally:
+            job.finished_at = job.finished_at or datetime.utcnow().isoformat()
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Request cancellation; returns the job, or None if unknown"""
+        job = self.get(job_id)
+        if not job or job.finished or not job._request_cancel():
+            return job
+        if job.future and job.future.cancel():
+            # Never started: finish it here since the worker won't run
+            self._cancelled(job, "Cancelled before start")
+        else:
+            job.status = "cancelling"
+            job.message = "Cancellation requested"
+            job.changed()
+        return job
+
+    def drain(self, timeout: float) -> bool:
+        """
+        Wait up to timeout seconds for queued and running jobs to finish (used on
+        graceful shutdown); returns True if none are left
+        """
+        deadline = time.monotonic() + timeout
+        while self.active_count():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(0.25, remaining))
+        return True
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+class AsyncJobManager(_JobHistory):
+    """Runs coroutine jobs as asyncio tasks, at most max_workers at a time"""
+
+    def __init__(self, max_workers: Optional[int] = None, max_history: Optional[int] = None):
+        super().__init__(max_workers, max_history)
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def submit(
+        self,
+        kind: str,
+        fn: Callable[[Job], Awaitable[Dict[str, Any]]],
+        workflow_id: Optional[str] = None,
+        on_cancel: Optional[Callable[[Job], None]] = None,
+        on_failure: Optional[Callable[[Job], None]] = None
+    ) -> Job:
+        """Schedule the coroutine fn(job) on the running event loop (see JobManager.submit)"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        job = self._register(kind, workflow_id, on_cancel, on_failure)
+        job.future = asyncio.get_running_loop().create_task(self._run(job, fn))
+        job.future.add_done_callback(lambda task: self._settle(job, task))
+        return job
+
+    async def _run(self, job: Job, fn: Callable[[Job], Awaitable[Dict[str, Any]]]):
+        try:
+            async with self._slots:
+                self._start(job)
+                self._complete(job, await fn(job))
+        except (JobCancelled, asyncio.CancelledError):
+            self._cancelled(job)
+        except Exception as e:
+            self._failed(job, e)
+        finally:
+            job.finished_at = job.finished_at or datetime.utcnow().isoformat()
+
+    def _settle(self, job: Job, task: asyncio.Task):
+        # A task cancelled before its first step never enters _run
+        if task.cancelled() and not job.finished:
+            self._cancelled(job, "Cancelled before start")
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a job; the task stops at its current await"""
+        job = self.get(job_id)
+        if not job or job.finished or not job._request_cancel():
+            return job
+        job.status = "cancelling"
+        job.message = "Cancellation requested"
+        job.changed()
+        job.future.cancel()
+        return job
+
+    async def drain(self, timeout: float) -> bool:
+        """Wait up to timeout seconds for running jobs; returns True if none are left"""
+        tasks = [job.future for job in self.list() if job.future and not job.future.done()]
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+        return self.active_count() == 0
+
+    async def shutdown(self):
+        tasks = [job.future for job in self.list() if job.future and not job.future.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,442 @@
+"""
+Model Backends - Pluggable LLM and text-to-speech backends used by every agent
+
+RemoteBackend talks to Anthropic (Claude) and ElevenLabs. StandInBackend is a
+deterministic local stand-in that returns schema-valid plans, findings, email
+drafts, status reports and MP3 audio with configurable latency, token rate and
+error injection, so load tests and benchmarks can run with no network or credits.
+
+Select the backend with LLM_BACKEND=remote (default) or LLM_BACKEND=standin.
+
+Stand-in configuration:
+    STANDIN_SEED              Seed for latency/error draws (default: 42)
+    STANDIN_LATENCY           Base latency distribution, e.g. 'fixed:200',
+                              'uniform:100,400', 'normal:300,50' or
+                              'lognormal:300,0.5' (milliseconds; default: fixed:50)
+    STANDIN_TOKENS_PER_SEC    Simulated output token rate (default: 0 = instant)
+    STANDIN_ERROR_RATE        Probability of a retryable 529 overloaded error (default: 0)
+    STANDIN_TIMEOUT_RATE      Probability of hanging until the caller's deadline (default: 0)
+
+Every STANDIN_* setting can be overridden per agent, e.g. STANDIN_RESEARCHER_LATENCY
+(agents: planner, researcher, communicator, reporter, tts).
+"""
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import metrics
+
+# Called with the total tokens of every completion (admission control charges its budget)
+_token_listeners: List[Callable[[int], None]] = []
+
+
+def add_token_listener(listener: Callable[[int], None]):
+    """listener(tokens) is called after every completion with input + output tokens"""
+    _token_listeners.append(listener)
+
+
+def record_tokens(agent: str, model: str, input_tokens: int, output_tokens: int):
+    """Token usage for the metrics endpoint and token listeners"""
+    metrics.llm_tokens.inc(input_tokens, agent=agent, model=model, direction="input")
+    metrics.llm_tokens.inc(output_tokens, agent=agent, model=model, direction="output")
+    for listener in _token_listeners:
+        listener(input_tokens + output_tokens)
+
+
+class LLMBackend:
+    """Interface shared by all model backends"""
+
+    name = "base"
+    requires_api_key = True
+
+    def complete(self, agent: str, model: str, prompt: str, max_tokens: int,
+                 api_key: Optional[str] = None, timeout: Optional[float] = None) -> str:
+        """Return the model's text response to a single-turn prompt"""
+        raise NotImplementedError
+
+    def synthesize(self, text: str, voice_id: str,
+                   api_key: Optional[str] = None, timeout: Optional[float] = None) -> bytes:
+        """Return MP3 audio for the given text"""
+        raise NotImplementedError
+
+    async def acomplete(self, agent: str, model: str, prompt: str, max_tokens: int,
+                        api_key: Optional[str] = None, timeout: Optional[float] = None) -> str:
+        """asyncio version of complete (default: run the blocking call in a thread)"""
+        return await asyncio.to_thread(self.complete, agent, model, prompt, max_tokens, api_key, timeout)
+
+    async def asynthesize(self, text: str, voice_id: str,
+                          api_key: Optional[str] = None, timeout: Optional[float] = None) -> bytes:
+        """asyncio version of synthesize (default: run the blocking call in a thread)"""
+        return await asyncio.to_thread(self.synthesize, text, voice_id, api_key, timeout)
+
+    def warm_up(self):
+        """Load anything the first call would otherwise pay for (called at startup)"""
+
+
+class RemoteBackend(LLMBackend):
+    """Anthropic Claude for text, ElevenLabs for speech"""
+
+    name = "remote"
+
+    def __init__(self):
+        self._clients: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _client(self, kind: str, api_key: Optional[str]):
+        """Reuse one SDK client (and its connection pool) per API key"""
+        key = (kind, api_key)
+        with self._lock:
+            if key not in self._clients:
+                if kind == "anthropic":
+                    import anthropic
+                    # Retries are handled by the resilience layer, not the SDK
+                    self._clients[key] = anthropic.Anthropic(api_key=api_key, max_retries=0)
+                elif kind == "anthropic_async":
+                    import anthropic
+                    self._clients[key] = anthropic.AsyncAnthropic(api_key=api_key, max_retries=0)
+                elif kind == "elevenlabs_async":
+                    from elevenlabs.client import AsyncElevenLabs
+                    self._clients[key] = AsyncElevenLabs(api_key=api_key, base_url=os.getenv('ELEVENLABS_BASE_URL'))
+                else:
+                    from elevenlabs.client import ElevenLabs
+                    # ELEVENLABS_BASE_URL allows pointing at a local fake server
+                    self._clients[key] = ElevenLabs(api_key=api_key, base_url=os.getenv('ELEVENLABS_BASE_URL'))
+            return self._clients[key]
+
+    def warm_up(self):
+        # The SDKs are imported lazily so the server starts listening first; importing
+        # them here, in the warm-up thread, keeps the ~1-2 s off the first request
+        import anthropic  # noqa: F401
+        try:
+            import elevenlabs.client  # noqa: F401
+        except ImportError:
+            print("⚠ elevenlabs is not installed; voice reports will fail")
+
+    def complete(self, agent, model, prompt, max_tokens, api_key=None, timeout=None):
+        message = self._client("anthropic", api_key).messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            timeout=timeout
+        )
+        record_tokens(agent, model, message.usage.input_tokens, message.usage.output_tokens)
+        return message.content[0].text
+
+    def synthesize(self, text, voice_id, api_key=None, timeout=None):
+        audio = self._client("elevenlabs", api_key).text_to_speech.convert(
+            text=text,
+            voice_id=voice_id,
+            model_id="eleven_multilingual_v2",
+            output_format="mp3_44100_128",
+            request_options={"timeout_in_seconds": int(math.ceil(timeout))} if timeout else None
+        )
+        # Collect audio data from generator
+        return b"".join(audio)
+
+    async def acomplete(self, agent, model, prompt, max_tokens, api_key=None, timeout=None):
+        message = await self._client("anthropic_async", api_key).messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            timeout=timeout
+        )
+        record_tokens(agent, model, message.usage.input_tokens, message.usage.output_tokens)
+        return message.content[0].text
+
+    async def asynthesize(self, text, voice_id, api_key=None, timeout=None):
+        audio = self._client("elevenlabs_async", api_key).text_to_speech.convert(
+            text=text,
+            voice_id=voice_id,
+            model_id="eleven_multilingual_v2",
+            output_format="mp3_44100_128",
+            request_options={"timeout_in_seconds": int(math.ceil(timeout))} if timeout else None
+        )
+        return b"".join([chunk async for chunk in audio])
+
+
+class StandInError(RuntimeError):
+    """Injected failure; looks like Anthropic's 529 overloaded response"""
+
+    status_code = 529
+
+
+# Vocabulary drawn from the retail datasets so stand-in output looks realistic
+STANDIN_SUPPLIERS = ["Uniphar", "Sifco", "Delisted Products", "United Drug", "Fragrance Direct", "Cosmetica"]
+STANDIN_DEPARTMENTS = ["OTC : Analgesics", "Vitamins", "OTC : First Aid", "Gifts : Gifts", "Toiletries : Skincare", "Dental"]
+STANDIN_PRODUCTS = [
+    "Panadol Extra 24s", "Nurofen Plus 12s", "Sinutab 15s", "Piriton 30s", "Daktarin Cream 30g",
+    "Jakemans Honey & Lemon 73g", "PrizMag Magnesium Bisglycinate 90 Capsules", "Colgate Toothbrush",
+    "Baby Poem Photo Plaque", "Calvin Klein Eternity 100ml"
+]
+
+# One silent MPEG-1 Layer III frame: 128 kbps, 44.1 kHz, 417 bytes, ~26 ms
+_SILENT_MP3_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+_MP3_FRAME_SECONDS = 1152 / 44100
+
+
+class StandInBackend(LLMBackend):
+    """Deterministic local stand-in for Claude and ElevenLabs"""
+
+    name = "standin"
+    requires_api_key = False
+
+    def __init__(self, seed: Optional[int] = None):
+        self.seed = seed if seed is not None else int(os.getenv('STANDIN_SEED', '42'))
+        self._rng = random.Random(self.seed)
+        self._lock = threading.Lock()
+
+    # ---- configuration ----
+
+    @staticmethod
+    def _setting(agent: str, name: str, default: str) -> str:
+        return os.getenv(f'STANDIN_{agent.upper()}_{name}', os.getenv(f'STANDIN_{name}', default))
+
+    def _draw(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def _latency(self, agent: str) -> float:
+        """Draw a base latency in seconds from the configured distribution"""
+        spec = self._setting(agent, 'LATENCY', 'fixed:50')
+        kind, _, params = spec.partition(':')
+        values = [float(v) for v in params.split(',') if v]
+        with self._lock:
+            if kind == 'uniform':
+                ms = self._rng.uniform(values[0], values[1])
+            elif kind == 'normal':
+                ms = max(0.0, self._rng.gauss(values[0], values[1]))
+            elif kind == 'lognormal':
+                # values: median in ms, sigma of the underlying normal
+                ms = values[0] * math.exp(self._rng.gauss(0, values[1]))
+            else:
+                ms = values[0] if values else 0.0
+        return ms / 1000
+
+    def _outcome(self, agent: str, output_tokens: int, timeout: Optional[float]):
+        """Decide one call's simulated latency and injected failure: (seconds, error or None)"""
+        if self._draw() < float(self._setting(agent, 'TIMEOUT_RATE', '0')):
+            return (timeout if timeout else 60), TimeoutError(f"stand-in {agent} call timed out")
+
+        tokens_per_sec = float(self._setting(agent, 'TOKENS_PER_SEC', '0'))
+        delay = self._latency(agent)
+        if tokens_per_sec > 0:
+            delay += output_tokens / tokens_per_sec
+        if timeout is not None and delay > timeout:
+            return timeout, TimeoutError(f"stand-in {agent} call exceeded {timeout:.1f}s")
+
+        if self._draw() < float(self._setting(agent, 'ERROR_RATE', '0')):
+            return delay, StandInError(f"stand-in {agent} overloaded (injected error)")
+        return delay, None
+
+    def _simulate(self, agent: str, output_tokens: int, timeout: Optional[float]):
+        """Sleep for the simulated latency and inject configured failures"""
+        delay, error = self._outcome(agent, output_tokens, timeout)
+        time.sleep(delay)
+        if error:
+            raise error
+
+    async def _simulate_async(self, agent: str, output_tokens: int, timeout: Optional[float]):
+        delay, error = self._outcome(agent, output_tokens, timeout)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+
+    # ---- responses ----
+
+    def _content_rng(self, *parts: str) -> random.Random:
+        """RNG seeded by the request itself so identical prompts give identical output"""
+        digest = hashlib.sha256("\x1f".join((str(self.seed),) + parts).encode("utf-8")).hexdigest()
+        return random.Random(int(digest[:16], 16))
+
+    @staticmethod
+    def _goal(prompt: str) -> str:
+        match = re.search(r'(?:submitted this goal: "|Goal: )(.+?)"?\n', prompt)
+        return match.group(1).strip() if match else "the submitted goal"
+
+    def _plan(self, rng: random.Random, goal: str) -> List[Dict]:
+        # One research step per part of a multi-part goal ("... and ..."), run in parallel
+        parts = [part.strip() for part in re.split(r"\band\b|;", goal) if part.strip()] or [goal]
+        steps = [
+            {"title": f"Research Suppliers ({part})" if len(parts) > 1 else "Research Suppliers",
+             "description": f"Gather inventory and sales data relevant to: {part}",
+             "agent": "researcher", "depends_on": []}
+            for part in parts[:4]
+        ]
+        research = list(range(1, len(steps) + 1))
+        steps.append({"title": "Analyze Data", "description": "Compare stock levels with sales velocity and margins",
+                      "agent": "none", "depends_on": research})
+        if rng.random() < 0.5:
+            steps.append({"title": "Shortlist Suppliers", "description": "Rank suppliers by availability, price and profit",
+                          "agent": "none", "depends_on": [len(steps)]})
+        steps.append({"title": "Review Findings", "description": "Manager reviews and approves the findings",
+                      "agent": "manager", "depends_on": [len(steps)]})
+        steps.append({"title": "Draft Communications", "description": "Prepare emails to the shortlisted suppliers",
+                      "agent": "communicator", "depends_on": [len(steps)]})
+        steps.append({"title": "Report to Manager", "description": "Summarise findings and next steps",
+                      "agent": "reporter", "depends_on": [len(steps)]})
+        return [dict(step, step_number=i + 1, status="pending") for i, step in enumerate(steps)]
+
+    def _findings(self, rng: random.Random, goal: str) -> Dict:
+        suppliers = []
+        for supplier in rng.sample(STANDIN_SUPPLIERS, 3):
+            trade_price = round(rng.uniform(1, 40), 2)
+            qty_sold = rng.randint(50, 4000)
+            suppliers.append({
+                "supplier": supplier,
+                "product": rng.choice(STANDIN_PRODUCTS),
+                "department": rng.choice(STANDIN_DEPARTMENTS),
+                "trade_price": trade_price,
+                "rrp": round(trade_price * rng.uniform(1.2, 2.0), 2),
+                "stock_level": rng.randint(0, 500),
+                "qty_sold": qty_sold,
+                "turnover": round(qty_sold * trade_price * 1.5, 2),
+                "profit": round(qty_sold * trade_price * 0.4, 2),
+                "reason": "High sales velocity relative to current stock"
+            })
+        top = sorted(suppliers, key=lambda s: s["qty_sold"], reverse=True)
+        return {
+            "summary": f"Stand-in analysis for: {goal}",
+            "key_findings": [
+                f"{top[0]['product']} from {top[0]['supplier']} is the best seller in the sample",
+                f"{sum(1 for s in suppliers if s['stock_level'] < 100)} shortlisted products are low on stock"
+            ],
+            "relevant_suppliers": suppliers,
+            "statistics": {
+                "total_products": rng.randint(200, 500),
+                "unique_suppliers": rng.randint(10, 40),
+                "total_departments": rng.randint(20, 96),
+                "total_sales_transactions": rng.randint(500, 1000),
+                "total_revenue": round(sum(s["turnover"] for s in suppliers), 2),
+                "total_profit": round(sum(s["profit"] for s in suppliers), 2),
+                "avg_trade_price": round(sum(s["trade_price"] for s in suppliers) / len(suppliers), 2),
+                "avg_rrp": round(sum(s["rrp"] for s in suppliers) / len(suppliers), 2),
+                "avg_profit_margin": round(rng.uniform(0.2, 0.45), 3),
+                "top_selling_products": [
+                    {"product": s["product"], "qty_sold": s["qty_sold"], "turnover": s["turnover"]} for s in top
+                ],
+                "top_profitable_products": [
+                    {"product": s["product"], "profit": s["profit"], "margin": round(s["profit"] / s["turnover"], 3)}
+                    for s in sorted(suppliers, key=lambda s: s["profit"], reverse=True)
+                ],
+                "top_suppliers": [
+                    {"supplier": s["supplier"], "product_count": rng.randint(5, 80), "total_sales": s["turnover"]}
+                    for s in top
+                ],
+                "departments": {s["department"]: rng.randint(5, 120) for s in suppliers}
+            },
+            "recommendations": [
+                f"Reorder {top[0]['product']} from {top[0]['supplier']} ahead of demand",
+                "Review pricing on low-margin lines"
+            ]
+        }
+
+    def _drafts(self, rng: random.Random, goal: str, prompt: str) -> Dict:
+        # Address the suppliers the researcher actually returned, when present
+        names = list(dict.fromkeys(re.findall(r'"supplier": "([^"]+)"', prompt))) or rng.sample(STANDIN_SUPPLIERS, 2)
+        emails = []
+        for index, name in enumerate(names[:5]):
+            slug = re.sub(r'[^a-z0-9]+', '', name.lower()) or "supplier"
+            emails.append({
+                "supplier_id": f"SUP-{index + 1:03d}",
+                "supplier_name": name,
+                "to": f"orders@{slug}.example.com",
+                "subject": f"Supply request: {goal[:60]}",
+                "body": f"Dear {name} team,\n\nRegarding our goal ({goal}), we would like to discuss availability and pricing.\n\nKind regards,\nSerica Procurement"
+            })
+        return {"emails": emails, "summary": f"Contact {len(emails)} suppliers about availability and pricing"}
+
+    def _report(self, rng: random.Random, prompt: str) -> str:
+        match = re.search(r'"goal": "([^"]*)"', prompt)
+        goal = match.group(1) if match else "the current goal"
+        status = re.search(r'"status": "([^"]*)"', prompt)
+        return (
+            f"Here is your status update on {goal}. "
+            f"The workflow is currently {(status.group(1) if status else 'idle').replace('_', ' ')}. "
+            "Research and supplier analysis are progressing as planned, and the next step will be "
+            "highlighted for your approval as soon as it is ready."
+        )
+
+    def _respond(self, agent: str, model: str, prompt: str, max_tokens: int):
+        """Build the schema-valid response text; returns (text, output_tokens)"""
+        rng = self._content_rng(agent, model, prompt)
+        goal = self._goal(prompt)
+
+        if agent == "planner":
+            text = json.dumps(self._plan(rng, goal))
+        elif agent == "researcher":
+            text = json.dumps(self._findings(rng, goal))
+        elif agent == "communicator":
+            text = json.dumps(self._drafts(rng, goal, prompt))
+        else:
+            text = self._report(rng, prompt)
+
+        # Roughly 4 characters per token, capped like the real API would be
+        return text, min(max_tokens, max(1, len(text) // 4))
+
+    @staticmethod
+    def _audio(text: str) -> bytes:
+        # ~15 characters of speech per second
+        frames = max(1, int(len(text) / 15 / _MP3_FRAME_SECONDS))
+        return _SILENT_MP3_FRAME * frames
+
+    def complete(self, agent, model, prompt, max_tokens, api_key=None, timeout=None):
+        text, output_tokens = self._respond(agent, model, prompt, max_tokens)
+        self._simulate(agent, output_tokens, timeout)
+        record_tokens(agent, model, len(prompt) // 4, output_tokens)
+        return text
+
+    def synthesize(self, text, voice_id, api_key=None, timeout=None):
+        audio = self._audio(text)
+        self._simulate("tts", len(text) // 4, timeout)
+        return audio
+
+    async def acomplete(self, agent, model, prompt, max_tokens, api_key=None, timeout=None):
+        text, output_tokens = self._respond(agent, model, prompt, max_tokens)
+        await self._simulate_async(agent, output_tokens, timeout)
+        record_tokens(agent, model, len(prompt) // 4, output_tokens)
+        return text
+
+    async def asynthesize(self, text, voice_id, api_key=None, timeout=None):
+        audio = self._audio(text)
+        await self._simulate_async("tts", len(text) // 4, timeout)
+        return audio
+
+
+BACKENDS = {
+    "remote": RemoteBackend,
+    "standin": StandInBackend
+}
+
+_backend: Optional[LLMBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> LLMBackend:
+    """Return the process-wide backend, created from LLM_BACKEND on first use"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            name = os.getenv('LLM_BACKEND', 'remote').lower()
+            if name not in BACKENDS:
+                raise ValueError(f"Unknown LLM_BACKEND '{name}' (expected one of: {', '.join(BACKENDS)})")
+            _backend = BACKENDS[name]()
+            print(f"✓ Model backend: {_backend.name}")
+        return _backend
+
+
+def set_backend(backend: LLMBackend):
+    """Swap the process-wide backend (used by load tests and benchmarks)"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
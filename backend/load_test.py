@@ -0,0 +1,421 @@
+"""
+Load Test - Concurrent simulated managers driving the orchestrator and notification service
+
+Each simulated manager runs one workflow end to end, the way the dashboard does:
+
+    submit goal → research (poll the job) → approval notification created and approved
+    → approve findings (poll the drafting job) → text report
+
+Workflows arrive either open-loop at --rate per second (Poisson or evenly spaced; a
+workflow's latency is measured from its scheduled arrival, so a backed-up server is not
+hidden by a backed-up load generator) or closed-loop (--rate 0: --managers managers each
+start their next workflow as soon as the previous one ends). At most --managers
+workflows are in flight at once.
+
+Reported per endpoint: requests, errors, error rate, p50/p95/p99/max latency; plus whole
+research/drafting stages (queued to finished), whole workflows and throughput. With
+--baseline the run fails (exit code 1) when a p95/p99 latency grows, the error rate rises
+or throughput drops beyond --tolerance relative to the saved run; --save-baseline writes
+one. Any failed request fails the run unless --max-error-rate allows it.
+
+--spawn starts both services itself on the local LLM stand-in (LLM_BACKEND=standin, and
+WORKFLOW_STORE=memory unless set), so a run needs no API keys and measures the service
+rather than the model provider.
+
+Usage:
+    python backend/load_test.py --spawn --managers 8 --workflows 40
+    python backend/load_test.py --spawn --rate 2 --duration 60 --save-baseline load_baseline.json
+    python backend/load_test.py --spawn --rate 2 --duration 60 --baseline load_baseline.json
+    python backend/load_test.py --orchestrator http://staging:5000 --no-notifications --managers 4
+"""
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+from urllib.parse import urlparse
+
+import requests
+
+DEFAULT_GOALS = [
+    "Identify top-rated electronics suppliers for potential partnership",
+    "Find fasteners and adhesives that sell fast but are low on stock",
+    "Review garden suppliers with the best margins",
+    "Shortlist paint suppliers for the spring promotion",
+    "Find slow-moving plumbing stock and its suppliers",
+]
+
+JOB_POLL_SECONDS = 0.2
+TERMINAL_JOB_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of values (0 for no values)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Recorder:
+    """Latencies and failures per endpoint, shared by every manager thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, List[float]] = {}
+        self._errors: Dict[str, int] = {}
+        self._error_samples: Dict[str, str] = {}
+
+    def record(self, name: str, seconds: float, ok: bool, detail: str = ""):
+        with self._lock:
+            self._latencies.setdefault(name, []).append(seconds * 1000)
+            if not ok:
+                self._errors[name] = self._errors.get(name, 0) + 1
+                self._error_samples.setdefault(name, detail[:200])
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            names = sorted(self._latencies)
+            return {
+                name: {
+                    "count": len(self._latencies[name]),
+                    "errors": self._errors.get(name, 0),
+                    "error_rate": round(self._errors.get(name, 0) / len(self._latencies[name]), 4),
+                    "p50_ms": round(percentile(self._latencies[name], 50), 1),
+                    "p95_ms": round(percentile(self._latencies[name], 95), 1),
+                    "p99_ms": round(percentile(self._latencies[name], 99), 1),
+                    "max_ms": round(max(self._latencies[name]), 1),
+                    **({"first_error": self._error_samples[name]} if name in self._error_samples else {})
+                }
+                for name in names
+            }
+
+
+class StepFailed(Exception):
+    pass
+
+
+class Manager:
+    """One simulated manager: an HTTP session and the workflow it is walking through"""
+
+    def __init__(self, options: Dict[str, Any], recorder: Recorder):
+        self.options = options
+        self.recorder = recorder
+        self.session = requests.Session()
+
+    def call(self, name: str, method: str, url: str, expect=(200,), **kwargs) -> requests.Response:
+        """One timed request; anything but an expected status is recorded and raised"""
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, url, timeout=self.options["timeout"], **kwargs)
+        except requests.RequestException as e:
+            self.recorder.record(name, time.perf_counter() - start, False, str(e))
+            raise StepFailed(f"{name}: {e}")
+        ok = response.status_code in expect
+        self.recorder.record(name, time.perf_counter() - start, ok, f"HTTP {response.status_code}: {response.text}")
+        if not ok:
+            raise StepFailed(f"{name}: HTTP {response.status_code}")
+        return response
+
+    def run_stage(self, stage: str, name: str, path: str, body: Dict[str, Any]):
+        """Start a background stage and poll its job until it finishes"""
+        api = self.options["orchestrator"]
+        start = time.perf_counter()
+        response = self.call(name, "POST", f"{api}{path}", expect=(200, 202), json=body)
+        if response.status_code == 202:
+            job_url = f"{api}{response.json()['job']['status_url']}"
+            deadline = time.monotonic() + self.options["timeout"]
+            while True:
+                job = self.call("GET /api/jobs/<job_id>", "GET", job_url).json()
+                if job["status"] in TERMINAL_JOB_STATUSES:
+                    break
+                if time.monotonic() > deadline:
+                    job = {"status": "timed out", "error": f"still {job['status']}"}
+                    break
+                time.sleep(JOB_POLL_SECONDS)
+            ok = job["status"] == "succeeded"
+            self.recorder.record(f"stage {stage}", time.perf_counter() - start, ok, str(job.get("error")))
+            if not ok:
+                raise StepFailed(f"{stage} job {job['status']}: {job.get('error')}")
+
+    def notify_and_approve(self, workflow_id: str):
+        """The manager is asked to approve the findings through the notification service"""
+        api = self.options["notifications"]
+        created = self.call("POST /api/notifications/create", "POST", f"{api}/api/notifications/create", json={
+            "type": "approval_request",
+            "title": "Findings ready for review",
+            "message": f"Research for workflow {workflow_id[:8]} is ready for approval",
+            "priority": "medium",
+            "requires_approval": True,
+            "generate_voice": False,
+            "agent_id": "load_test"
+        }).json()
+        notification_id = created["notification"]["id"]
+        self.call("POST /api/notifications/<id>/approve", "POST",
+                  f"{api}/api/notifications/{notification_id}/approve",
+                  json={"approved": True, "manager_id": "load_test"})
+
+    def run_workflow(self, goal: str):
+        api = self.options["orchestrator"]
+        submitted = self.call("POST /api/submit-goal", "POST", f"{api}/api/submit-goal", json={"goal": goal}).json()
+        workflow_id = submitted["workflow_id"]
+        self.run_stage("research", "POST /api/execute-research", "/api/execute-research", {"workflow_id": workflow_id})
+        if self.options["notifications"]:
+            self.notify_and_approve(workflow_id)
+        self.run_stage("drafting", "POST /api/approve-findings", "/api/approve-findings",
+                       {"workflow_id": workflow_id, "approved": True})
+        self.call("GET /api/get-text-report", "GET", f"{api}/api/get-text-report", params={"workflow_id": workflow_id})
+
+
+def arrival_offsets(options: Dict[str, Any]) -> List[float]:
+    """Seconds after the start at which each open-loop workflow arrives"""
+    rng = random.Random(options["seed"])
+    rate = options["rate"]
+    offsets, t = [], 0.0
+    while True:
+        t += rng.expovariate(rate) if options["arrival"] == "poisson" else 1 / rate
+        if (options["duration"] and t > options["duration"]) or \
+                (not options["duration"] and len(offsets) >= options["workflows"]):
+            return offsets
+        offsets.append(t)
+
+
+def run_load(options: Dict[str, Any]) -> Dict[str, Any]:
+    recorder = Recorder()
+    managers = threading.local()
+    goals = options["goals"]
+    completed = failed = 0
+    counter_lock = threading.Lock()
+
+    def workflow(index: int, scheduled: float):
+        nonlocal completed, failed
+        manager = getattr(managers, "manager", None)
+        if manager is None:
+            manager = managers.manager = Manager(options, recorder)
+        try:
+            manager.run_workflow(goals[index % len(goals)])
+            ok, detail = True, ""
+        except StepFailed as e:
+            ok, detail = False, str(e)
+        except Exception as e:
+            ok, detail = False, f"{type(e).__name__}: {e}"
+        recorder.record("workflow", time.perf_counter() - scheduled, ok, detail)
+        with counter_lock:
+            if ok:
+                completed += 1
+            else:
+                failed += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=options["managers"], thread_name_prefix="manager") as pool:
+        if options["rate"] > 0:
+            for index, offset in enumerate(arrival_offsets(options)):
+                delay = start + offset - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(workflow, index, start + offset)
+        else:
+            # Closed loop: each manager starts its next workflow when the previous one ends
+            next_index = iter(range(10 ** 9))
+            index_lock = threading.Lock()
+
+            def manager_loop():
+                while True:
+                    with index_lock:
+                        index = next(next_index)
+                    elapsed = time.perf_counter() - start
+                    if (options["duration"] and elapsed >= options["duration"]) or \
+                            (not options["duration"] and index >= options["workflows"]):
+                        return
+                    workflow(index, time.perf_counter())
+
+            for _ in range(options["managers"]):
+                pool.submit(manager_loop)
+    elapsed = time.perf_counter() - start
+
+    endpoints = recorder.summary()
+    requests_total = sum(stats["count"] for name, stats in endpoints.items() if " /" in name)
+    request_errors = sum(stats["errors"] for name, stats in endpoints.items() if " /" in name)
+    return {
+        "config": {key: options[key] for key in ("managers", "rate", "arrival", "workflows", "duration", "seed")},
+        "elapsed_s": round(elapsed, 2),
+        "workflows_completed": completed,
+        "workflows_failed": failed,
+        "throughput": {
+            "workflows_per_s": round(completed / elapsed, 3) if elapsed else 0,
+            "requests_per_s": round(requests_total / elapsed, 2) if elapsed else 0
+        },
+        "requests": requests_total,
+        "request_errors": request_errors,
+        "error_rate": round(request_errors / requests_total, 4) if requests_total else 0,
+        "endpoints": endpoints
+    }
+
+
+def compare_to_baseline(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float,
+                        slack_ms: float) -> List[str]:
+    """Regressions of this run against a saved one; empty when within tolerance"""
+    regressions = []
+    for name, stats in report["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before:
+            continue
+        for key in ("p95_ms", "p99_ms"):
+            # Relative tolerance plus a few ms so fast endpoints don't fail on jitter
+            limit = before[key] * (1 + tolerance) + slack_ms
+            if stats[key] > limit:
+                regressions.append(f"{name} {key[:3]} {stats[key]:.1f} ms > {limit:.1f} ms (baseline {before[key]:.1f})")
+        if stats["error_rate"] > before["error_rate"] + 0.01:
+            regressions.append(f"{name} error rate {stats['error_rate']:.1%} (baseline {before['error_rate']:.1%})")
+    if baseline.get("config") != report["config"]:
+        # Throughput depends on the arrival rate and concurrency, not only on the service
+        print("⚠ Baseline was recorded with different load settings; throughput not compared")
+        return regressions
+    before = baseline.get("throughput", {}).get("workflows_per_s", 0)
+    after = report["throughput"]["workflows_per_s"]
+    if before and after < before * (1 - tolerance):
+        regressions.append(f"throughput {after:.3f} workflows/s < {before * (1 - tolerance):.3f} (baseline {before:.3f})")
+    return regressions
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"\n{'endpoint':<42}{'count':>7}{'err %':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+    for name, stats in report["endpoints"].items():
+        print(f"{name:<42}{stats['count']:>7}{stats['error_rate'] * 100:>8.1f}"
+              f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}{stats['max_ms']:>9.1f}")
+    throughput = report["throughput"]
+    print(f"\n{report['workflows_completed']} workflows completed, {report['workflows_failed']} failed "
+          f"in {report['elapsed_s']} s: {throughput['workflows_per_s']} workflows/s, "
+          f"{throughput['requests_per_s']} requests/s, error rate {report['error_rate']:.2%}")
+    for name, stats in report["endpoints"].items():
+        if "first_error" in stats:
+            print(f"  ⚠ {name}: {stats['first_error']}")
+
+
+def spawn_services(options: Dict[str, Any], log) -> List[subprocess.Popen]:
+    """Start the services on the LLM stand-in and wait until they report ready"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, LLM_BACKEND="standin", FLASK_DEBUG="false", PYTHONUNBUFFERED="1")
+    env.setdefault("WORKFLOW_STORE", "memory")  # keep load-test workflows out of the dashboard's store
+    env["ORCHESTRATOR_PORT"] = str(urlparse(options["orchestrator"]).port or 5000)
+    services = [("orchestrator.py", f"{options['orchestrator']}/api/health/ready")]
+    if options["notifications"]:
+        env["NOTIFICATION_PORT"] = str(urlparse(options["notifications"]).port or 5001)
+        services.append(("notification_system.py", f"{options['notifications']}/api/notifications/health/ready"))
+
+    processes = []
+    for script, _ in services:
+        processes.append(subprocess.Popen([sys.executable, os.path.join(here, script)], cwd=here, env=env,
+                                          stdout=log, stderr=subprocess.STDOUT))
+    deadline = time.monotonic() + 60
+    for (script, ready_url), process in zip(services, processes):
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"{script} exited with code {process.returncode}")
+            try:
+                if requests.get(ready_url, timeout=2).status_code == 200:
+                    print(f"✓ {script} ready ({ready_url})")
+                    break
+            except requests.RequestException:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{script} not ready after 60 s")
+            time.sleep(0.5)
+    return processes
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the SourceBot orchestrator and notification service")
+    parser.add_argument("--orchestrator", default=os.getenv('ORCHESTRATOR_URL', "http://127.0.0.1:5000"))
+    parser.add_argument("--notifications", default=os.getenv('NOTIFICATION_URL', "http://127.0.0.1:5001"))
+    parser.add_argument("--no-notifications", action="store_true", help="Skip the notification service step")
+    parser.add_argument("--spawn", action="store_true", help="Start both services on the LLM stand-in for the run")
+    parser.add_argument("--service-log", default=os.devnull, help="Where spawned services write their output")
+    parser.add_argument("--managers", type=int, default=8, help="Concurrent simulated managers (max workflows in flight)")
+    parser.add_argument("--rate", type=float, default=0.0, help="Workflow arrivals per second (0: closed loop)")
+    parser.add_argument("--arrival", choices=("poisson", "uniform"), default="poisson")
+    parser.add_argument("--workflows", type=int, default=40, help="Workflows to run (ignored with --duration)")
+    parser.add_argument("--duration", type=float, default=0.0, help="Seconds to keep starting workflows")
+    parser.add_argument("--goals", help="File of goals, one per line (default: built-in goals)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request and per-stage timeout in seconds")
+    parser.add_argument("--json", help="Write the report to this file")
+    parser.add_argument("--baseline", help="Fail when this run regresses against a saved report")
+    parser.add_argument("--save-baseline", help="Save this run's report as a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression (default: 0.25)")
+    parser.add_argument("--slack-ms", type=float, default=5.0, help="Allowed absolute latency regression (default: 5)")
+    parser.add_argument("--max-error-rate", type=float, default=0.0, help="Highest request error rate that passes")
+    args = parser.parse_args(argv)
+
+    goals = DEFAULT_GOALS
+    if args.goals:
+        with open(args.goals, encoding="utf-8") as f:
+            goals = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    options = {
+        "orchestrator": args.orchestrator.rstrip("/"),
+        "notifications": None if args.no_notifications else args.notifications.rstrip("/"),
+        "managers": max(1, args.managers),
+        "rate": args.rate,
+        "arrival": args.arrival,
+        "workflows": args.workflows,
+        "duration": args.duration,
+        "goals": goals,
+        "seed": args.seed,
+        "timeout": args.timeout,
+    }
+
+    processes = []
+    with open(args.service_log, "a") as log:
+        try:
+            if args.spawn:
+                processes = spawn_services(options, log)
+            mode = f"{args.rate}/s {args.arrival} arrivals" if args.rate > 0 else "closed loop"
+            extent = f"{args.duration} s" if args.duration else f"{args.workflows} workflows"
+            print(f"Load test: {options['managers']} managers, {mode}, {extent}")
+            report = run_load(options)
+        except RuntimeError as e:
+            print(f"✗ {e}")
+            return 1
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    print_report(report)
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"✓ Report saved to {path}")
+
+    failed = False
+    if report["workflows_completed"] == 0:
+        print("✗ No workflow completed")
+        failed = True
+    if report["error_rate"] > args.max_error_rate:
+        print(f"✗ Error rate {report['error_rate']:.2%} exceeds {args.max_error_rate:.2%}")
+        failed = True
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_to_baseline(report, json.load(f), args.tolerance, args.slack_ms)
+        for regression in regressions:
+            print(f"✗ Regression: {regression}")
+        if not regressions:
+            print(f"✓ Within {args.tolerance:.0%} of baseline {args.baseline}")
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,330 @@
+"""
+Metrics - Prometheus counters, gauges and histograms for the backend services
+
+A small in-process registry rendered in the Prometheus text exposition format at
+/metrics on each service. Recording is a dict lookup, a bisect and an increment under
+a per-metric lock, so it stays on in production; values that already exist elsewhere
+(queue depths, stream listeners) are read only when /metrics is scraped.
+
+What is recorded:
+    sourcebot_http_request_duration_seconds   per service/method/endpoint/status
+    sourcebot_agent_call_duration_seconds     per agent/model/outcome (includes retries)
+    sourcebot_llm_tokens_total                input/output tokens per agent/model
+    sourcebot_tts_bytes_total, sourcebot_tts_duration_seconds
+    sourcebot_dataset_load_seconds, sourcebot_dataset_cache_total{result=hit|miss}
+    sourcebot_state_requests_total            /api/state answered 304, as a delta or in full
+    sourcebot_stage_duration_seconds          background stages by outcome
+    sourcebot_plan_step_duration_seconds      plan steps by agent and status
+    sourcebot_errors_total                    failures by stage
+    sourcebot_admission_total                 admitted/queued/rejected agent work by priority class
+    sourcebot_admission_wait_seconds          time admitted work spent queued
+    sourcebot_single_flight_total             coalescable calls run (leader) or shared (follower)
+    sourcebot_job_queue_depth, sourcebot_jobs_active, sourcebot_sse_listeners, ...
+
+Each process keeps its own registry: with several gunicorn workers, scrape each worker
+(or run one worker with more threads) to see every request.
+
+Configuration:
+    METRICS     'on' (default) or 'off' (recording becomes a no-op; /metrics stays empty)
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+ENABLED = os.getenv('METRICS', 'on').lower() != 'off'
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Request and agent-call latencies span milliseconds (cached state) to minutes (research)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_registry: List["_Metric"] = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[Any, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[Any, ...]:
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines += self._samples()
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[Any, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Current value, either set directly or read from a callback at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[Any, ...], float] = {}
+        self._callbacks: Dict[Tuple[Any, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, fn: Callable[[], float], **labels):
+        """Read the value from fn() whenever /metrics is scraped"""
+        with self._lock:
+            self._callbacks[self._key(labels)] = fn
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+            callbacks = list(self._callbacks.items())
+        for key, fn in callbacks:
+            try:
+                values[key] = float(fn())
+            except Exception:
+                continue  # a failing callback drops its sample rather than the scrape
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in values.items()]
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets, with sum and count"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket..., count above the last bucket], sum
+        self._values: Dict[Tuple[Any, ...], List[Any]] = {}
+
+    def observe(self, value: float, **labels):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def time(self, **labels) -> "_Timer":
+        """Context manager observing the elapsed seconds of its block"""
+        return _Timer(self, labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return sum(entry[0]) if entry else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, Any]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format"""
+    with _registry_lock:
+        metrics = list(_registry)
+    return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+# ---- Metrics shared by the services and agents ----
+
+http_request_duration = Histogram(
+    "sourcebot_http_request_duration_seconds", "HTTP request latency (streams: until the response starts)",
+    ("service", "method", "endpoint", "status"))
+agent_call_duration = Histogram(
+    "sourcebot_agent_call_duration_seconds", "Agent model call latency per model tried, including retries",
+    ("agent", "model", "outcome"))
+agent_fallbacks = Counter(
+    "sourcebot_agent_fallbacks_total", "Canned agent results served because every model failed", ("agent",))
+llm_tokens = Counter(
+    "sourcebot_llm_tokens_total", "LLM tokens by agent, model and direction (input/output)",
+    ("agent", "model", "direction"))
+tts_bytes = Counter("sourcebot_tts_bytes_total", "Text-to-speech audio bytes generated", ("backend",))
+tts_duration = Histogram("sourcebot_tts_duration_seconds", "Text-to-speech call latency", ("backend", "outcome"))
+dataset_load_duration = Histogram(
+    "sourcebot_dataset_load_seconds", "Time to parse the inventory and sales CSVs", (),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+dataset_cache = Counter("sourcebot_dataset_cache_total", "Dataset cache lookups by result (hit/miss)", ("result",))
+state_requests = Counter(
+    "sourcebot_state_requests_total", "/api/state responses by kind (not_modified/delta/full)", ("service", "result"))
+stage_duration = Histogram(
+    "sourcebot_stage_duration_seconds", "Background stage (job) run time by outcome", ("service", "stage", "outcome"))
+plan_step_duration = Histogram(
+    "sourcebot_plan_step_duration_seconds", "Plan step run time by agent and final status", ("agent", "status"))
+errors = Counter("sourcebot_errors_total", "Failures by stage", ("service", "stage"))
+job_queue_depth = Gauge("sourcebot_job_queue_depth", "Stage jobs waiting for a worker", ("service",))
+jobs_active = Gauge("sourcebot_jobs_active", "Stage jobs queued, running or cancelling", ("service",))
+sse_listeners = Gauge("sourcebot_sse_listeners", "Connected server-sent event streams", ("service",))
+sse_slow_consumers = Counter(
+    "sourcebot_sse_slow_consumer_total", "Events dropped for, or streams disconnected as, slow consumers",
+    ("service", "action"))
+workflows = Gauge("sourcebot_workflows", "Workflows in the store", ("service",))
+admission = Counter(
+    "sourcebot_admission_total", "Admission decisions by priority class and result", ("service", "priority", "result"))
+admission_wait = Histogram(
+    "sourcebot_admission_wait_seconds", "Queue wait of admitted agent work by priority class", ("service", "priority"))
+admission_in_flight = Gauge("sourcebot_admission_in_flight", "Agent work holding an admission slot", ("service",))
+admission_queued = Gauge("sourcebot_admission_queued", "Agent work waiting for admission", ("service",))
+single_flight = Counter(
+    "sourcebot_single_flight_total", "Coalescable calls by kind and role (leader ran it, follower shared it)",
+    ("service", "kind", "role"))
+admission_tokens = Gauge("sourcebot_admission_tokens", "Tokens left in the admission token budget", ("service",))
+
+
+def observe_job(service: str) -> Callable[[Any], None]:
+    """Job manager listener recording stage durations and failures when a job finishes"""
+
+    def listener(job):
+        if not job.finished or not job.finished_at:
+            return
+        if job.started_at:
+            started = datetime.fromisoformat(job.started_at)
+            seconds = (datetime.fromisoformat(job.finished_at) - started).total_seconds()
+            stage_duration.observe(max(0.0, seconds), service=service, stage=job.kind, outcome=job.status)
+        if job.status == "failed":
+            errors.inc(service=service, stage=job.kind)
+
+    return listener
+
+
+def watch_jobs(service: str, job_manager):
+    """Record stage metrics from a JobManager/AsyncJobManager and expose its queue gauges"""
+    job_manager.add_listener(observe_job(service))
+    job_queue_depth.set_function(job_manager.queue_depth, service=service)
+    jobs_active.set_function(job_manager.active_count, service=service)
+
+
+def _endpoint(request) -> str:
+    # The route pattern, not the path, keeps label cardinality bounded
+    rule = getattr(request, "url_rule", None)
+    return rule.rule if rule is not None else "unmatched"
+
+
+def install_flask(app, service: str):
+    """Time every request and serve /metrics on a Flask app"""
+    from flask import Response, g, request
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop("metrics_start", None)
+        if start is not None:
+            http_request_duration.observe(time.perf_counter() - start, service=service, method=request.method,
+                                          endpoint=_endpoint(request), status=response.status_code)
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics_endpoint():
+        return Response(render(), content_type=CONTENT_TYPE)
+
+
+def install_quart(app, service: str):
+    """Time every request and serve /metrics on a Quart app"""
+    from quart import Response, g, request
+
+    @app.before_request
+    async def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    async def record_request(response):
+        start = g.pop("metrics_start", None)
+        if start is not None:
+            http_request_duration.observe(time.perf_counter() - start, service=service, method=request.method,
+                                          endpoint=_endpoint(request), status=response.status_code)
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    async def metrics_endpoint():
+        return Response(render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,234 @@
+"""
+Model Router - Per-agent Claude model selection with latency-aware fallback
+
+Each agent has a route: a primary model and an optional faster fallback model.
+Short, structured outputs (planner, reporter) default to the fast model; research
+and drafting default to the strong model and fall back to the fast one when the
+strong model is overloaded, timing out or its circuit is open.
+
+Configuration:
+    CLAUDE_MODEL            Strong model (default: claude-sonnet-4-5-20250929)
+    CLAUDE_FAST_MODEL       Fast model (default: claude-haiku-4-5-20251001)
+    <AGENT>_MODEL           Primary model for one agent, e.g. RESEARCHER_MODEL
+    <AGENT>_FALLBACK_MODEL  Fallback model for one agent ('none' disables fallback)
+    ROUTER_MAX_IN_FLIGHT    In-flight calls on a primary model before new calls
+                            are sent to the fallback first (default: 8)
+    ROUTER_PRIMARY_RETRIES  Retries on a model that has a fallback behind it (default: 0)
+    ROUTER_PRIMARY_DEADLINE Total budget in milliseconds for a model that has a fallback
+                            behind it, before the fallback is tried (default: 20000)
+
+The last model tried gets the agent's full resilience policy (see resilience.py); the
+ones before it are cut down to the ROUTER_PRIMARY_* budget, so falling back under
+timeouts takes seconds rather than the primary's whole retry budget.
+"""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import effects
+import metrics
+from resilience import (
+    CircuitOpenError,
+    LatencyTracker,
+    ResiliencePolicy,
+    call_with_resilience_effects,
+    get_breaker,
+    get_policy,
+    is_retryable,
+)
+
+
+DEFAULT_STRONG_MODEL = 'claude-sonnet-4-5-20250929'
+DEFAULT_FAST_MODEL = 'claude-haiku-4-5-20251001'
+
+# Which tier each agent uses by default
+AGENT_TIERS = {
+    "planner": "fast",
+    "reporter": "fast",
+    "researcher": "strong",
+    "communicator": "strong"
+}
+
+
+class RouteStats:
+    """Latency and outcome counters for one (agent, model) route"""
+
+    def __init__(self):
+        self.latency = LatencyTracker()
+        self.calls = 0
+        self.errors = 0
+        self.fallback_calls = 0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def begin(self):
+        with self._lock:
+            self.in_flight += 1
+            self.calls += 1
+
+    def end(self, seconds: Optional[float] = None, error: bool = False, fallback: bool = False):
+        with self._lock:
+            self.in_flight -= 1
+            if error:
+                self.errors += 1
+            if fallback:
+                self.fallback_calls += 1
+        if seconds is not None:
+            self.latency.record(seconds)
+
+    def to_dict(self) -> Dict[str, Any]:
+        p50 = self.latency.percentile(0.5)
+        p95 = self.latency.percentile(0.95)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "fallback_calls": self.fallback_calls,
+            "in_flight": self.in_flight,
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None
+        }
+
+
+class Route:
+    """Primary/fallback model pair for one agent"""
+
+    def __init__(self, agent: str, primary: str, fallback: Optional[str] = None):
+        self.agent = agent
+        self.primary = primary
+        self.fallback = fallback if fallback != primary else None
+
+    @classmethod
+    def from_env(cls, agent: str) -> "Route":
+        strong = os.getenv('CLAUDE_MODEL', DEFAULT_STRONG_MODEL)
+        fast = os.getenv('CLAUDE_FAST_MODEL', DEFAULT_FAST_MODEL)
+        tier_model = fast if AGENT_TIERS.get(agent) == "fast" else strong
+
+        primary = os.getenv(f'{agent.upper()}_MODEL', tier_model)
+        fallback = os.getenv(f'{agent.upper()}_FALLBACK_MODEL', fast)
+        if fallback.lower() == 'none':
+            fallback = None
+        return cls(agent, primary, fallback)
+
+    def candidates(self, model: Optional[str] = None) -> List[str]:
+        """Models to try, in order, for the next call"""
+        primary = model or self.primary
+        if not self.fallback or self.fallback == primary:
+            return [primary]
+
+        max_in_flight = int(os.getenv('ROUTER_MAX_IN_FLIGHT', '8'))
+        overloaded = get_route_stats_entry(self.agent, primary).in_flight >= max_in_flight
+        circuit_open = get_breaker(f"{self.agent}:{primary}").state == "open"
+        if overloaded or circuit_open:
+            return [self.fallback, primary]
+        return [primary, self.fallback]
+
+
+_lock = threading.Lock()
+_routes: Dict[str, Route] = {}
+_stats: Dict[tuple, RouteStats] = {}
+
+
+def get_route(agent: str) -> Route:
+    """Return the (cached) route for an agent"""
+    with _lock:
+        if agent not in _routes:
+            _routes[agent] = Route.from_env(agent)
+        return _routes[agent]
+
+
+def get_route_stats_entry(agent: str, model: str) -> RouteStats:
+    with _lock:
+        key = (agent, model)
+        if key not in _stats:
+            _stats[key] = RouteStats()
+        return _stats[key]
+
+
+def select_model(agent: str) -> str:
+    """Model the next call for this agent would try first"""
+    return get_route(agent).candidates()[0]
+
+
+def primary_policy(policy: ResiliencePolicy) -> ResiliencePolicy:
+    """The agent's policy cut down for a model that has a fallback behind it"""
+    return policy.limited(
+        int(os.getenv('ROUTER_PRIMARY_RETRIES', '0')),
+        float(os.getenv('ROUTER_PRIMARY_DEADLINE', '20000')) / 1000
+    )
+
+
+def routed_call_effects(
+    agent: str,
+    request: Callable[[str], effects.Effect],
+    model: Optional[str] = None,
+    fallback: Optional[Callable[[], Any]] = None
+) -> effects.Effects:
+    """
+    Call Claude through the agent's route, falling back to a faster model on failure
+
+    A generator of effects (see effects.py): agents drive it on threads or on asyncio.
+
+    Args:
+        agent: Agent name ('planner', 'researcher', 'communicator', 'reporter')
+        request: Takes a model name and returns the effect performing the request
+        model: Explicit primary model, overriding the configured one
+        fallback: Optional zero-argument callable used when every model failed; counted
+                  in sourcebot_agent_fallbacks_total, and callers should mark the result degraded
+
+    Returns:
+        The request's (or fallback's) result
+    """
+    route = get_route(agent)
+    policy = get_policy(agent)
+    candidates = route.candidates(model)
+    last_error: Optional[BaseException] = None
+
+    for position, candidate in enumerate(candidates):
+        stats = get_route_stats_entry(agent, candidate)
+        stats.begin()
+        start = time.monotonic()
+        try:
+            attempt_policy = primary_policy(policy) if position + 1 < len(candidates) else policy
+            result = yield from call_with_resilience_effects(f"{agent}:{candidate}", request(candidate), policy=attempt_policy)
+        except Exception as e:
+            stats.end(error=True)
+            metrics.agent_call_duration.observe(time.monotonic() - start, agent=agent, model=candidate, outcome="error")
+            last_error = e
+            if not (is_retryable(e) or isinstance(e, CircuitOpenError)):
+                raise
+            if position + 1 < len(candidates):
+                print(f"[ROUTER] {agent}: {candidate} unavailable ({type(e).__name__}), trying {candidates[position + 1]}")
+            continue
+
+        elapsed = time.monotonic() - start
+        stats.end(elapsed, fallback=candidate != (model or route.primary))
+        metrics.agent_call_duration.observe(elapsed, agent=agent, model=candidate, outcome="ok")
+        return result
+
+    if fallback:
+        print(f"[ROUTER] {agent}: every model failed, using the canned fallback")
+        metrics.agent_fallbacks.inc(agent=agent)
+        return fallback()
+    raise last_error
+
+
+def get_route_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-agent route configuration and per-model latency stats"""
+    with _lock:
+        agents = sorted(set(AGENT_TIERS) | set(_routes))
+        entries = dict(_stats)
+
+    stats = {}
+    for agent in agents:
+        route = get_route(agent)
+        stats[agent] = {
+            "primary": route.primary,
+            "fallback": route.fallback,
+            "models": {
+                model: entry.to_dict()
+                for (route_agent, model), entry in entries.items()
+                if route_agent == agent
+            }
+        }
+    return stats
@@ -0,0 +1,122 @@
+"""
+Notification Store - In-memory notifications with indexes for lookups, approvals and history
+
+Notifications are kept in creation order and each gets a sequence number (its position).
+Lookups never scan the whole list:
+
+    by ID               hash index: get(), approvals, voice updates
+    pending             insertion-ordered set of notifications awaiting approval
+    by type, priority   per-value lists of sequence numbers, in creation order, used by the
+    and agent           filtered history (the shortest matching list is walked)
+
+History is read newest first in pages: each page walks back from a cursor (the sequence
+number to continue before) instead of sorting, so a page costs about its size however
+many notifications are stored.
+"""
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+# Notification fields history can be filtered by, each with its own index
+INDEXED_FIELDS = ("type", "priority", "agent_id")
+
+
+class NotificationStore:
+    """Thread-safe notification history with ID, pending and per-field indexes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._order: List[Dict[str, Any]] = []       # Sequence number -> notification
+        self._by_id: Dict[str, int] = {}              # ID -> sequence number
+        self._pending: Dict[str, None] = {}           # Insertion-ordered set of IDs
+        self._indexes: Dict[str, Dict[Any, List[int]]] = {field: {} for field in INDEXED_FIELDS}
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def add(self, notification: Dict[str, Any]):
+        """Store a new notification (pending when it requires approval)"""
+        with self._lock:
+            seq = len(self._order)
+            self._order.append(notification)
+            self._by_id[notification["id"]] = seq
+            for field in INDEXED_FIELDS:
+                self._indexes[field].setdefault(notification.get(field), []).append(seq)
+            if notification.get("requires_approval") and notification.get("status") == "pending":
+                self._pending[notification["id"]] = None
+
+    def get(self, notification_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            seq = self._by_id.get(notification_id)
+            return self._order[seq] if seq is not None else None
+
+    def resolve(self, notification_id: str):
+        """Remove a notification from the pending set (approved or rejected)"""
+        with self._lock:
+            self._pending.pop(notification_id, None)
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Notifications awaiting approval, oldest first"""
+        with self._lock:
+            return [self._order[self._by_id[notification_id]] for notification_id in self._pending]
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def history(
+        self,
+        limit: int = 50,
+        before: Optional[int] = None,
+        **filters: Optional[str]
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        A page of notifications, most recent first
+
+        Args:
+            limit: Page size
+            before: Cursor from the previous page (only older notifications are returned)
+            **filters: type, priority and/or agent_id values to match
+
+        Returns:
+            (notifications, cursor for the next page or None when there are no more)
+        """
+        filters = {field: value for field, value in filters.items() if value is not None}
+        unknown = set(filters) - set(INDEXED_FIELDS)
+        if unknown:
+            raise ValueError(f"Cannot filter notifications by {', '.join(sorted(unknown))}")
+
+        if limit <= 0:
+            return [], None
+
+        with self._lock:
+            end = len(self._order) if before is None else max(0, min(before, len(self._order)))
+            if filters:
+                # Walk the shortest matching index; check the other filters per notification
+                candidates = min((self._indexes[field].get(value, []) for field, value in filters.items()), key=len)
+                stop = bisect_left(candidates, end)
+                sequence = (candidates[i] for i in range(stop - 1, -1, -1))
+            else:
+                sequence = iter(range(end - 1, -1, -1))
+
+            page: List[Dict[str, Any]] = []
+            last = cursor = None
+            for seq in sequence:
+                notification = self._order[seq]
+                if any(notification.get(field) != value for field, value in filters.items()):
+                    continue
+                if len(page) == limit:
+                    cursor = last  # Something older matches: the next page starts before the last one sent
+                    break
+                page.append(notification)
+                last = seq
+            return page, cursor
+
+    def clear(self) -> int:
+        """Forget every notification; returns how many there were"""
+        with self._lock:
+            count = len(self._order)
+            self._order = []
+            self._by_id = {}
+            self._pending = {}
+            self._indexes = {field: {} for field in INDEXED_FIELDS}
+            return count
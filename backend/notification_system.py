@@ -7,14 +7,18 @@ from flask import Flask, request, jsonify, send_file, Response
 from flask_cors import CORS
 import os
 from dotenv import load_dotenv
-import json
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 import threading
-import queue
+import time
 import uuid
 import io
-from voice_utils import generate_voice, format_notification_text
+from service_health import ServiceHealth, install_health_routes
+from event_broker import EventBroker
+from notification_store import NotificationStore
+from workflow_events import encode_sse, heartbeat_seconds, parse_last_event_id
+import metrics
+import profiling
 
 # Load environment variables from root directory
 import pathlib
@@ -23,6 +27,8 @@ load_dotenv(root_dir / 'api.env')
 
 app = Flask(__name__)
 CORS(app)
+metrics.install_flask(app, 'notifications')  # Prometheus metrics at /metrics
+profiling.install_flask(app, 'notifications')  # Opt-in request profiles (PROFILING=on)
 
 # Voice settings
 ELEVENLABS_API_KEY = os.getenv('ELEVENLABS_API_KEY')
@@ -33,22 +39,59 @@ if ELEVENLABS_API_KEY:
 else:
     print("⚠ Warning: ELEVENLABS_API_KEY not found")
 
+# History of all notifications, indexed by ID, type, priority and agent, and the pending set
+notification_store = NotificationStore()
+
 # Global notification state
 notification_state = {
-    "notifications": [],  # History of all notifications
-    "pending": [],        # Notifications awaiting manager response
-    "active_listeners": 0,  # Number of connected listeners
     "last_update": None,
     "voice_cache": {}     # Cache generated audio by notification ID
 }
 
-# Thread-safe queue for real-time notifications
-notification_queue = queue.Queue()
+# Fan-out to every connected stream; each listener has its own bounded buffer, and recent
+# events are kept (numbered) so reconnecting listeners get what they missed
+notification_broker = EventBroker("notifications")
+
+
+def broadcast(event: Dict[str, Any]):
+    """Send an event to every connected manager (numbered and encoded once for all of them)"""
+    notification_broker.publish(event)
 
 # Configuration
 AGENT_PLATFORM_URL = os.getenv('AGENT_PLATFORM_URL', 'http://localhost:8000')
 ENABLE_AUTO_APPROVAL = os.getenv('ENABLE_AUTO_APPROVAL', 'false').lower() == 'true'
 ENABLE_VOICE_NOTIFICATIONS = os.getenv('ENABLE_VOICE_NOTIFICATIONS', 'true').lower() == 'true'
+PORT = int(os.getenv('NOTIFICATION_PORT', '5001'))
+
+# Voice generations still running, waited for on graceful shutdown
+voice_threads = set()
+voice_threads_lock = threading.Lock()
+
+
+def drain_voice_generation(timeout: float) -> bool:
+    """Wait up to timeout seconds for in-flight voice generation; True if all finished"""
+    deadline = time.monotonic() + timeout
+    with voice_threads_lock:
+        threads = list(voice_threads)
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+    return not any(thread.is_alive() for thread in threads)
+
+
+# Liveness/readiness at /api/notifications/health/live and .../ready
+health = ServiceHealth("notifications")
+health.on_drain(drain_voice_generation)
+install_health_routes(app, health, prefix='/api/notifications/health')
+
+# Notification metrics (request latencies come from metrics.install_flask)
+notifications_created = metrics.Counter(
+    "sourcebot_notifications_total", "Notifications created by type and priority", ("type", "priority"))
+approvals = metrics.Counter("sourcebot_notification_approvals_total", "Manager responses by outcome", ("outcome",))
+voice_generation = metrics.Histogram(
+    "sourcebot_notification_voice_seconds", "Voice notification generation time by outcome", ("outcome",))
+metrics.sse_listeners.set_function(notification_broker.subscriber_count, service='notifications')
+pending_approvals = metrics.Gauge("sourcebot_notifications_pending", "Notifications awaiting manager approval")
+pending_approvals.set_function(notification_store.pending_count)
 
 
 # Voice generation now handled by voice_utils.py module
@@ -107,18 +150,16 @@ class NotificationManager:
             "voice_url": None
         }
         
-        # Add to history
-        notification_state["notifications"].append(notification)
+        notifications_created.inc(type=notification_type, priority=priority)
         
-        # Add to pending if requires approval
-        if requires_approval:
-            notification_state["pending"].append(notification_id)
+        # Add to history (and to pending if it requires approval)
+        notification_store.add(notification)
         
         # Update timestamp
         notification_state["last_update"] = datetime.utcnow().isoformat()
         
-        # Queue for real-time listeners
-        notification_queue.put(notification)
+        # Push to real-time listeners
+        broadcast(notification)
         
         # Log notification
         print(f"[NOTIFICATION] {notification_type.upper()}: {title}")
@@ -127,19 +168,24 @@ class NotificationManager:
         
         # Generate voice notification asynchronously if enabled
         if generate_voice and ELEVENLABS_API_KEY:
-            threading.Thread(
+            thread = threading.Thread(
                 target=NotificationManager._generate_voice_async,
                 args=(notification_id, notification),
                 daemon=True
-            ).start()
+            )
+            with voice_threads_lock:
+                voice_threads.add(thread)
+            thread.start()
         
         return notification
     
     @staticmethod
     def _generate_voice_async(notification_id: str, notification: Dict[str, Any]):
         """Generate voice notification in background thread"""
+        start = time.perf_counter()
         try:
             # Use shared voice_utils module
+            from voice_utils import generate_voice, format_notification_text
             text = format_notification_text(notification)
             audio_bytes = generate_voice(
                 text=text,
@@ -152,23 +198,31 @@ class NotificationManager:
                 notification_state["voice_cache"][notification_id] = audio_bytes
                 
                 # Update notification with voice info
-                for notif in notification_state["notifications"]:
-                    if notif["id"] == notification_id:
-                        notif["has_voice"] = True
-                        notif["voice_url"] = f"/api/notifications/{notification_id}/voice"
-                        break
+                notif = notification_store.get(notification_id)
+                if notif:
+                    notif["has_voice"] = True
+                    notif["voice_url"] = f"/api/notifications/{notification_id}/voice"
                 
                 # Notify listeners that voice is ready
-                notification_queue.put({
+                broadcast({
                     "type": "voice_ready",
                     "notification_id": notification_id,
                     "voice_url": f"/api/notifications/{notification_id}/voice"
                 })
                 
                 print(f"✓ Voice notification ready: {notification_id[:8]}")
+                voice_generation.observe(time.perf_counter() - start, outcome="ok")
+                metrics.tts_bytes.inc(len(audio_bytes), backend="elevenlabs")
+            else:
+                voice_generation.observe(time.perf_counter() - start, outcome="empty")
         
         except Exception as e:
+            voice_generation.observe(time.perf_counter() - start, outcome="error")
+            metrics.errors.inc(service='notifications', stage="voice")
             print(f"✗ Voice generation failed for {notification_id}: {e}")
+        finally:
+            with voice_threads_lock:
+                voice_threads.discard(threading.current_thread())
     
     @staticmethod
     def approve_notification(notification_id: str, approved: bool, manager_id: str = "manager") -> Dict[str, Any]:
@@ -183,12 +237,7 @@ class NotificationManager:
         Returns:
             Updated notification object
         """
-        # Find notification
-        notification = None
-        for notif in notification_state["notifications"]:
-            if notif["id"] == notification_id:
-                notification = notif
-                break
+        notification = notification_store.get(notification_id)
         
         if not notification:
             return {"error": f"Notification {notification_id} not found"}
@@ -206,20 +255,20 @@ class NotificationManager:
         notification["manager_response_at"] = datetime.utcnow().isoformat()
         
         # Remove from pending
-        if notification_id in notification_state["pending"]:
-            notification_state["pending"].remove(notification_id)
+        notification_store.resolve(notification_id)
         
         # Update state
         notification_state["last_update"] = datetime.utcnow().isoformat()
         
         # Notify listeners
-        notification_queue.put({
+        broadcast({
             "type": "approval_response",
             "notification_id": notification_id,
             "approved": approved,
             "manager_id": manager_id
         })
         
+        approvals.inc(outcome="approved" if approved else "rejected")
         action = "✓ Approved" if approved else "✗ Rejected"
         print(f"[APPROVAL] {action} - {notification_id}")
         
@@ -228,20 +277,12 @@ class NotificationManager:
     @staticmethod
     def get_notification(notification_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific notification by ID"""
-        for notif in notification_state["notifications"]:
-            if notif["id"] == notification_id:
-                return notif
-        return None
+        return notification_store.get(notification_id)
     
     @staticmethod
     def get_pending_approvals() -> List[Dict[str, Any]]:
         """Get all notifications awaiting approval"""
-        pending = []
-        for notif_id in notification_state["pending"]:
-            notif = NotificationManager.get_notification(notif_id)
-            if notif:
-                pending.append(notif)
-        return pending
+        return notification_store.pending()
     
     @staticmethod
     def auto_approve_if_enabled(notification_id: str) -> bool:
@@ -260,10 +301,11 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "message": "Notification service is running",
-        "active_listeners": notification_state["active_listeners"],
-        "pending_count": len(notification_state["pending"]),
+        "active_listeners": notification_broker.subscriber_count(),
+        "pending_count": notification_store.pending_count(),
         "voice_enabled": ENABLE_VOICE_NOTIFICATIONS and ELEVENLABS_API_KEY is not None,
-        "cached_voices": len(notification_state["voice_cache"])
+        "cached_voices": len(notification_state["voice_cache"]),
+        "stream": notification_broker.stats()
     })
 
 
@@ -382,22 +424,30 @@ def get_notification_endpoint(notification_id):
 
 @app.route('/api/notifications/history', methods=['GET'])
 def get_notification_history():
-    """Get notification history with optional filtering"""
-    limit = request.args.get('limit', 50, type=int)
-    notification_type = request.args.get('type')
-    
-    history = notification_state["notifications"]
-    
-    # Filter by type if provided
-    if notification_type:
-        history = [n for n in history if n['type'] == notification_type]
+    """
+    Get notification history, most recent first, with optional filtering and paging
     
-    # Return most recent first, limited
-    history = sorted(history, key=lambda x: x['created_at'], reverse=True)[:limit]
+    Query parameters:
+        limit      Page size (default: 50)
+        type, priority, agent_id
+                   Only notifications with these values
+        before     Cursor: pass the previous page's next_before to get the next page
+    """
+    limit = request.args.get('limit', 50, type=int)
+    before = request.args.get('before', type=int)
+    
+    history, next_before = notification_store.history(
+        limit=limit,
+        before=before,
+        type=request.args.get('type') or None,
+        priority=request.args.get('priority') or None,
+        agent_id=request.args.get('agent_id') or None
+    )
     
     return jsonify({
         "count": len(history),
-        "history": history
+        "history": history,
+        "next_before": next_before
     })
 
 
@@ -405,9 +455,9 @@ def get_notification_history():
 def get_notification_state():
     """Get current notification service state"""
     return jsonify({
-        "total_notifications": len(notification_state["notifications"]),
-        "pending_count": len(notification_state["pending"]),
-        "active_listeners": notification_state["active_listeners"],
+        "total_notifications": len(notification_store),
+        "pending_count": notification_store.pending_count(),
+        "active_listeners": notification_broker.subscriber_count(),
         "auto_approval_enabled": ENABLE_AUTO_APPROVAL,
         "voice_enabled": ENABLE_VOICE_NOTIFICATIONS,
         "cached_voices": len(notification_state["voice_cache"]),
@@ -420,21 +470,13 @@ def clear_notifications():
     """Clear notification history (for testing/reset)"""
     global notification_state
     
-    count = len(notification_state["notifications"])
+    count = notification_store.clear()
     notification_state = {
-        "notifications": [],
-        "pending": [],
-        "active_listeners": 0,
         "last_update": None,
         "voice_cache": {}
     }
-    
-    # Clear the queue
-    try:
-        while True:
-            notification_queue.get_nowait()
-    except queue.Empty:
-        pass
+    # Reconnecting streams must not replay cleared notifications
+    notification_broker.clear_history()
     
     return jsonify({
         "message": f"Cleared {count} notifications",
@@ -448,28 +490,46 @@ def clear_notifications():
 def notification_stream():
     """
     Server-sent events stream for real-time notifications
-    Clients connect here to receive live updates
+    Clients connect here to receive live updates; every connected client gets every event.
+    
+    Notifications, approval responses and voice_ready events carry sequence IDs. A client
+    reconnecting with Last-Event-ID (or ?last_event_id=) receives just the events it
+    missed; if they are no longer kept it receives {"type": "resync"} and should reload
+    /api/notifications/history.
+    
+    A client that falls SSE_BUFFER events behind is a slow consumer: its stream ends
+    (SSE_SLOW_CONSUMER=disconnect) or it skips the oldest events and receives
+    {"type": "dropped", "count": n} in their place (SSE_SLOW_CONSUMER=drop).
     """
+    last_event_id = parse_last_event_id(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
+    subscription, missed = notification_broker.subscribe(last_event_id)
+    heartbeat = heartbeat_seconds()
+    
     def event_generator():
         """Generate notification events as they arrive"""
-        # Increment listener count
-        notification_state["active_listeners"] += 1
-        
         try:
-            yield f"data: {json.dumps({'type': 'connected', 'message': 'Connected to notification stream'})}\n\n"
+            yield "retry: 3000\n\n"
+            yield encode_sse(None, {'type': 'connected', 'message': 'Connected to notification stream'})
+            if missed is None:
+                yield encode_sse(None, {'type': 'resync'})
+            elif missed:
+                yield "".join(event.to_sse() for event in missed)
             
-            # Stream notifications from queue
             while True:
-                try:
-                    # Wait for notification (timeout after 30 seconds)
-                    notification = notification_queue.get(timeout=30)
-                    yield f"data: {json.dumps(notification)}\n\n"
-                except queue.Empty:
+                events, dropped = subscription.take(timeout=heartbeat)
+                if dropped:
+                    yield encode_sse(None, {'type': 'dropped', 'count': dropped})
+                if events:
+                    yield "".join(event.to_sse() for event in events)
+                elif subscription.closed:
+                    break  # Slow consumer; the client reconnects
+                elif health.draining:
+                    break  # Shutting down; the client reconnects to another instance
+                else:
                     # Send keepalive
-                    yield f"data: {json.dumps({'type': 'keepalive'})}\n\n"
+                    yield encode_sse(None, {'type': 'keepalive'})
         finally:
-            # Decrement listener count
-            notification_state["active_listeners"] -= 1
+            subscription.close()
     
     return Response(
         event_generator(),
@@ -628,7 +688,7 @@ __all__ = [
 
 
 if __name__ == '__main__':
-    print(f"Starting Notification Service on port 5001...")
+    print(f"Starting Notification Service on port {PORT}...")
     print(f"Auto-approval enabled: {ENABLE_AUTO_APPROVAL}")
     print(f"Voice notifications enabled: {ENABLE_VOICE_NOTIFICATIONS}")
     print(f"Agent Platform URL: {AGENT_PLATFORM_URL}")
@@ -640,5 +700,8 @@ if __name__ == '__main__':
     print("Managers can connect to /api/notifications/stream for real-time updates")
     print("Voice notifications available at /api/notifications/<id>/voice")
     
+    print("Development server; use `python backend/serve.py notifications` in production")
+    
+    health.start()
     # Use threaded mode for better SSE support, disable debug reloader
-    app.run(debug=False, host='0.0.0.0', port=5001, threaded=True)
+    app.run(debug=False, host='0.0.0.0', port=PORT, threaded=True)
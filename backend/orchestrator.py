@@ -1,44 +1,117 @@
 """
 Main Orchestration Engine - Manages the multi-agent workflow
 """
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response
 from flask_cors import CORS
 import os
 from dotenv import load_dotenv
 import json
 from io import BytesIO
 import pathlib
+import queue
+import threading
 
 # Import agent modules
-from planner import create_plan
-from researcher import analyze_suppliers, load_suppliers_from_file
-from communicator import draft_emails
-from reporter import generate_status_report, generate_voice_report
+from researcher import datasets_loaded, load_suppliers_cached, preload_datasets
+from resilience import get_resilience_stats
+from model_router import get_route, get_route_stats
+from llm_backend import add_token_listener, get_backend
+from batch_runner import parse_batch_request, run_batch
+from workflow_store import new_workflow_state, open_workflow_store, recover_interrupted
+from workflow_stages import WorkflowStages, public_state
+from jobs import JobManager
+from plan_executor import execute_steps
+import effects
+import response_codec
+import metrics
+import profiling
+from workflow_events import WorkflowEventBus, encode_sse, format_event_id, heartbeat_seconds, parse_last_event_id
+from service_health import ServiceHealth, install_health_routes
+from admission import AdmissionController, AdmissionRejected
+from single_flight import SingleFlight
 
 # Load environment variables from root directory
 root_dir = pathlib.Path(__file__).parent.parent
 load_dotenv(root_dir / './env_files/api.env')
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for frontend communication
-
-# Global state variable to track workflow
-workflow_state = {
-    "goal": None,
-    "status": "idle",  # idle, planning, researching, reviewing, drafting, completed
-    "current_step": 0,
-    "plan": [],
-    "findings": None,
-    "drafts": None,
-    "suppliers_data": None
-}
+CORS(app, expose_headers=['ETag', 'Location'])  # Enable CORS for frontend communication
+response_codec.install_flask(app)  # orjson + gzip/brotli for large responses
+metrics.install_flask(app, 'orchestrator')  # Prometheus metrics at /metrics
+profiling.install_flask(app, 'orchestrator')  # Opt-in request profiles (PROFILING=on)
+
+# Workflows keyed by ID, one per submitted goal (persisted unless WORKFLOW_STORE=memory)
+workflow_store = open_workflow_store()
+
+# Background workers for long agent stages (research, drafting)
+job_manager = JobManager()
+
+# Stage transitions and job progress, pushed to dashboards over server-sent events
+workflow_events = WorkflowEventBus()
+
+# Concurrency cap, token budget and priority queue in front of every agent call
+admission = AdmissionController('orchestrator')
+add_token_listener(admission.consume)
+
+# Identical goals and reports requested at the same time share one set of agent calls
+single_flight = SingleFlight('orchestrator')
+
+
+def publish_state_change(workflow_id, version, changes):
+    """Store listener: every workflow change becomes a 'state' event (or 'deleted')"""
+    if version is None:
+        workflow_events.publish(workflow_id, "deleted", {"workflow_id": workflow_id})
+        workflow_events.discard(workflow_id)
+        return
+    workflow_events.publish(workflow_id, "state", {
+        "workflow_id": workflow_id,
+        "version": version,
+        "changes": public_state(dict(changes))
+    })
+
+
+workflow_store.add_listener(publish_state_change)
+job_manager.add_listener(
+    lambda job: workflow_events.publish(job.workflow_id, "job", job.to_dict(include_result=False))
+)
+metrics.watch_jobs('orchestrator', job_manager)
+metrics.sse_listeners.set_function(workflow_events.subscriber_count, service='orchestrator')
+metrics.workflows.set_function(workflow_store.count, service='orchestrator')
 
 # Configuration
 ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY')
 ELEVENLABS_API_KEY = os.getenv('ELEVENLABS_API_KEY')
 CLAUDE_MODEL = os.getenv('CLAUDE_MODEL', 'claude-sonnet-4-5-20250929')
-INVENTORY_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'Retail', 'retail_inventory_snapshot_30_10_25_cleaned.csv')
-SALES_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'Retail', 'retail_sales_data_01_09_2023_to_31_10_2025_cleaned.csv')
+INVENTORY_FILE = os.getenv('INVENTORY_FILE', os.path.join(os.path.dirname(__file__), '..', 'data', 'Retail', 'retail_inventory_snapshot_30_10_25_cleaned.csv'))
+SALES_FILE = os.getenv('SALES_FILE', os.path.join(os.path.dirname(__file__), '..', 'data', 'Retail', 'retail_sales_data_01_09_2023_to_31_10_2025_cleaned.csv'))
+BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', '8'))
+BATCH_MAX_GOALS = int(os.getenv('BATCH_MAX_GOALS', '500'))
+
+# Planning, research, approval and drafting (shared with the async orchestrator), run on threads
+stages = WorkflowStages(
+    'orchestrator', workflow_store, admission, single_flight, execute_steps, effects.run,
+    INVENTORY_FILE, SALES_FILE, ANTHROPIC_API_KEY, ELEVENLABS_API_KEY
+)
+
+# Liveness/readiness at /api/health/live and /api/health/ready; serve.py drains on shutdown
+health = ServiceHealth("orchestrator")
+health.add_check("datasets", lambda: datasets_loaded(INVENTORY_FILE, SALES_FILE))
+health.add_check("workflow_store", lambda: workflow_store.count() >= 0)
+# Once per start, before any request. Several worker processes sharing the sqlite store must
+# be started by serve.py, which runs this before forking: a worker recovering on its own would
+# roll back the stages running in the others.
+health.add_startup("recover_interrupted", lambda: recover_interrupted(workflow_store))
+# Run once the server is listening (serve.py runs them before forking workers instead)
+health.add_warmup("datasets", lambda: preload_datasets(INVENTORY_FILE, SALES_FILE))
+health.add_warmup("model_backend", lambda: get_backend().warm_up())
+health.on_drain(job_manager.drain)
+install_health_routes(app, health)
+
+
+@app.before_request
+def start_service():
+    # Already done under serve.py and `python orchestrator.py`; covers e.g. `gunicorn orchestrator:app`
+    health.start()
 
 # Verify API keys are loaded
 if ANTHROPIC_API_KEY:
@@ -52,6 +125,15 @@ else:
     print("⚠ WARNING: ELEVENLABS_API_KEY not found")
 
 
+@app.errorhandler(AdmissionRejected)
+def admission_rejected(error):
+    """Overload: answer at once with 429 and when to retry"""
+    response = jsonify(error.to_dict())
+    response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
 @app.route('/', methods=['GET'])
 def home():
     """Root endpoint"""
@@ -60,12 +142,21 @@ def home():
         "version": "1.0",
         "endpoints": {
             "health": "/api/health",
+            "ready": "/api/health/ready",
+            "metrics": "/metrics",
+            "profiles": "/api/profiles",
             "submit_goal": "/api/submit-goal",
             "execute_research": "/api/execute-research",
             "approve_findings": "/api/approve-findings",
             "get_voice_report": "/api/get-voice-report",
             "get_text_report": "/api/get-text-report",
             "get_state": "/api/state",
+            "resume": "/api/resume",
+            "workflows": "/api/workflows",
+            "workflow_events": "/api/workflows/<workflow_id>/events",
+            "jobs": "/api/jobs",
+            "routes": "/api/routes",
+            "batch": "/api/batch",
             "reset": "/api/reset"
         }
     })
@@ -74,155 +165,170 @@ def home():
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({"status": "healthy", "message": "Orchestrator is running"})
+    return jsonify({
+        "status": "healthy",
+        "message": "Orchestrator is running",
+        "resilience": get_resilience_stats(),
+        "admission": admission.stats(),
+        "single_flight": single_flight.stats()
+    })
+
+
+def get_workflow_id():
+    """
+    Workflow ID from the query string or JSON body, or None
+
+    There is no default: with several managers, "the latest workflow" may be someone else's.
+    """
+    data = request.get_json(silent=True) or {}
+    return request.args.get('workflow_id') or data.get('workflow_id') or None
+
+
+def workflow_id_required():
+    return jsonify({"error": "workflow_id is required"}), 400
+
+
+def workflow_not_found(workflow_id):
+    return jsonify({"error": f"Workflow {workflow_id} not found"}), 404
 
 
 @app.route('/api/submit-goal', methods=['POST'])
 def submit_goal():
     """
     Step 1: Receive goal from frontend and initiate planning
-    """
-    global workflow_state
     
+    Creates a new workflow; the returned workflow_id must be passed to later steps.
+    """
     data = request.json
     goal = data.get('goal')
     
     if not goal:
         return jsonify({"error": "Goal is required"}), 400
     
-    # Reset state for new goal
-    workflow_state = {
-        "goal": goal,
-        "status": "planning",
-        "current_step": 0,
-        "plan": [],
-        "findings": None,
-        "drafts": None,
-        "suppliers_data": None
-    }
-    
-    # Call Planner Agent
-    print(f"[DEBUG] Calling planner with goal: {goal}")
-    plan_result = create_plan(goal, ANTHROPIC_API_KEY, CLAUDE_MODEL)
-    print(f"[DEBUG] Planner result: {plan_result}")
-    
-    if not plan_result.get('success'):
-        workflow_state["status"] = "error"
-        error_details = plan_result.get('error', 'Unknown error')
-        print(f"[ERROR] Planner failed: {error_details}")
-        return jsonify({
-            "error": "Failed to create plan",
-            "details": error_details
-        }), 500
+    payload, status_code = effects.run(stages.submit_goal(goal))
+    return jsonify(payload), status_code
+
+
+def wants_sync():
+    """Clients can opt back into blocking behaviour with ?wait=true"""
+    return request.args.get('wait', '').lower() == 'true'
+
+
+def dispatch_stage(workflow_id, stage):
+    """
+    Run a claimed stage in the background and answer 202 with a job ID (or inline with ?wait=true)
     
-    workflow_state["plan"] = plan_result["plan"]
-    workflow_state["status"] = "planned"
+    The stage is admitted first (see admission.py); when the service is overloaded the
+    workflow is rolled back and the client gets 429 with Retry-After. The workflow is
+    rolled back too if the stage is cancelled or raises (a stage that handles its own
+    errors sets status "error" itself).
     
-    return jsonify({
-        "message": "Goal submitted and plan created",
-        "state": workflow_state
+    Args:
+        workflow_id: Workflow the stage belongs to
+        stage: StageRun from one of the stages' claims
+    """
+    try:
+        permit = admission.acquire(stage.priority)
+    except AdmissionRejected:
+        workflow_store.update(workflow_id, **stage.rollback)
+        raise
+    
+    if wants_sync():
+        try:
+            with permit:
+                payload, status_code = effects.run(stage.runner(None))
+        except Exception:
+            workflow_store.update(workflow_id, **stage.rollback)
+            raise
+        if status_code >= 400:
+            metrics.errors.inc(service='orchestrator', stage=stage.kind)
+        return jsonify(payload), status_code
+    
+    def run(job):
+        with permit:
+            return effects.run(stage.runner(job))[0]
+    
+    def cancelled(job):
+        permit.release()
+        workflow_store.update(workflow_id, **stage.rollback)
+    
+    def failed(job):
+        workflow_store.update(workflow_id, **stage.rollback)
+    
+    job = job_manager.submit(stage.kind, run, workflow_id=workflow_id, on_cancel=cancelled, on_failure=failed)
+    workflow_store.update(workflow_id, job_id=job.id)
+    
+    response = jsonify({
+        "message": f"{stage.kind.capitalize()} started",
+        "workflow_id": workflow_id,
+        "job": job.to_dict()
     })
+    response.status_code = 202
+    response.headers['Location'] = f"/api/jobs/{job.id}"
+    return response
 
 
 @app.route('/api/execute-research', methods=['POST'])
 def execute_research():
     """
     Step 2: Execute research phase (automatically after planning)
-    """
-    global workflow_state
-    
-    if workflow_state["status"] != "planned":
-        return jsonify({"error": "Must complete planning first"}), 400
-    
-    workflow_state["status"] = "researching"
-    workflow_state["current_step"] = 1
-    
-    # Load inventory and sales data
-    data_result = load_suppliers_from_file(INVENTORY_FILE, SALES_FILE)
     
-    if not data_result.get('success'):
-        workflow_state["status"] = "error"
-        return jsonify({
-            "error": "Failed to load data",
-            "details": data_result.get('error')
-        }), 500
-    
-    workflow_state["suppliers_data"] = data_result["combined_data"]
-    
-    # Call Researcher Agent
-    research_result = analyze_suppliers(
-        workflow_state["goal"],
-        workflow_state["suppliers_data"],
-        ANTHROPIC_API_KEY,
-        CLAUDE_MODEL
-    )
-    
-    if not research_result.get('success'):
-        workflow_state["status"] = "error"
-        return jsonify({
-            "error": "Failed to analyze suppliers",
-            "details": research_result.get('error')
-        }), 500
+    Returns 202 Accepted with a job; poll /api/jobs/<job_id> for progress and result.
+    """
+    workflow_id = get_workflow_id()
     
-    workflow_state["findings"] = research_result["findings"]
-    workflow_state["status"] = "awaiting_approval"
-    workflow_state["current_step"] = 2
+    if not workflow_id:
+        return workflow_id_required()
+    if not workflow_store.exists(workflow_id):
+        return workflow_not_found(workflow_id)
     
-    return jsonify({
-        "message": "Research completed",
-        "state": workflow_state
-    })
+    stage, answer = stages.claim_research(workflow_id)
+    if answer:
+        return jsonify(answer[0]), answer[1]
+    return dispatch_stage(workflow_id, stage)
 
 
 @app.route('/api/approve-findings', methods=['POST'])
 def approve_findings():
     """
     Step 3: Human-in-the-loop approval of findings
+    
+    Approval returns 202 Accepted with a drafting job; rejection answers immediately.
     """
-    global workflow_state
+    workflow_id = get_workflow_id()
     
-    if workflow_state["status"] != "awaiting_approval":
-        return jsonify({"error": "No findings awaiting approval"}), 400
+    if not workflow_id:
+        return workflow_id_required()
+    if not workflow_store.exists(workflow_id):
+        return workflow_not_found(workflow_id)
     
     data = request.json
-    approved = data.get('approved', False)
-    
-    if not approved:
-        workflow_state["status"] = "rejected"
-        return jsonify({
-            "message": "Findings rejected",
-            "state": workflow_state
-        })
-    
-    workflow_state["status"] = "drafting"
-    workflow_state["current_step"] = 3
-    
-    # Call Communicator Agent
-    relevant_suppliers = workflow_state["findings"].get("relevant_suppliers", [])
-    
-    draft_result = draft_emails(
-        workflow_state["goal"],
-        workflow_state["findings"],
-        relevant_suppliers,
-        ANTHROPIC_API_KEY,
-        CLAUDE_MODEL
-    )
+    stage, answer = stages.claim_approval(workflow_id, data.get('approved', False))
+    if answer:
+        return jsonify(answer[0]), answer[1]
+    return dispatch_stage(workflow_id, stage)
+
+
+@app.route('/api/resume', methods=['POST'])
+def resume_workflow():
+    """
+    Resume a failed or interrupted workflow from its first stage without a current checkpoint
     
-    if not draft_result.get('success'):
-        workflow_state["status"] = "error"
-        return jsonify({
-            "error": "Failed to draft emails",
-            "details": draft_result.get('error')
-        }), 500
+    Stages whose inputs haven't changed since they last succeeded (see checkpoints.py) are
+    skipped, so planning and research aren't paid for again when drafting failed. Returns
+    202 Accepted with a job (or runs inline with ?wait=true).
+    """
+    workflow_id = get_workflow_id()
     
-    workflow_state["drafts"] = draft_result["drafts"]
-    workflow_state["status"] = "completed"
-    workflow_state["current_step"] = 4
+    if not workflow_id:
+        return workflow_id_required()
+    if not workflow_store.exists(workflow_id):
+        return workflow_not_found(workflow_id)
     
-    return jsonify({
-        "message": "Emails drafted successfully",
-        "state": workflow_state
-    })
+    stage, answer = stages.claim_resume(workflow_id)
+    if answer:
+        return jsonify(answer[0]), answer[1]
+    return dispatch_stage(workflow_id, stage)
 
 
 @app.route('/api/get-voice-report', methods=['GET'])
@@ -230,15 +336,18 @@ def get_voice_report():
     """
     Step 4: Generate voice report at any time
     """
-    if workflow_state["status"] == "idle":
-        return jsonify({"error": "No active workflow"}), 400
+    workflow_id = get_workflow_id()
+    if not workflow_id:
+        return workflow_id_required()
+    if not workflow_store.exists(workflow_id):
+        return workflow_not_found(workflow_id)
     
-    # Generate text report
-    report_result = generate_status_report(
-        workflow_state,
-        ANTHROPIC_API_KEY,
-        CLAUDE_MODEL
-    )
+    state, answer = stages.report_state(workflow_id)
+    if answer:
+        return jsonify(answer[0]), answer[1]
+    
+    # Generate text report, then voice
+    report_result, voice_result = effects.run(stages.voice_report(workflow_id, state))
     
     if not report_result.get('success'):
         return jsonify({
@@ -248,9 +357,6 @@ def get_voice_report():
     
     report_text = report_result["report"]
     
-    # Generate voice
-    voice_result = generate_voice_report(report_text, ELEVENLABS_API_KEY)
-    
     if not voice_result.get('success'):
         return jsonify({
             "error": "Failed to generate voice",
@@ -273,14 +379,17 @@ def get_text_report():
     """
     Alternative: Get text-only status report
     """
-    if workflow_state["status"] == "idle":
-        return jsonify({"error": "No active workflow"}), 400
+    workflow_id = get_workflow_id()
+    if not workflow_id:
+        return workflow_id_required()
+    if not workflow_store.exists(workflow_id):
+        return workflow_not_found(workflow_id)
     
-    report_result = generate_status_report(
-        workflow_state,
-        ANTHROPIC_API_KEY,
-        CLAUDE_MODEL
-    )
+    state, answer = stages.report_state(workflow_id)
+    if answer:
+        return jsonify(answer[0]), answer[1]
+    
+    report_result = effects.run(stages.status_report(workflow_id, state))
     
     if not report_result.get('success'):
         return jsonify({
@@ -289,40 +398,236 @@ def get_text_report():
         }), 500
     
     return jsonify({
-        "report": report_result["report"]
+        "workflow_id": workflow_id,
+        "report": report_result["report"],
+        "degraded": report_result.get("degraded", False)
     })
 
 
 @app.route('/api/state', methods=['GET'])
 def get_state():
     """
-    Get current workflow state
+    Get current workflow state (without ?workflow_id=, the state of a new, idle workflow)
+        
+    Responses carry a weak ETag, the same whichever Content-Encoding the body is sent with;
+    sending it back in If-None-Match (weak or strong form) answers 304 Not Modified while
+    the workflow is unchanged. With ?since=<version> only the fields updated after
+    that version are returned: {"workflow_id", "version", "since", "changes": {...}}.
+    """
+    workflow_id = get_workflow_id()
+    if workflow_id and not workflow_store.exists(workflow_id):
+        return workflow_not_found(workflow_id)
+        
+    if not workflow_id:
+        return jsonify(public_state(new_workflow_state()))
+        
+    # Revalidation only reads the version, never the state itself
+    etag = f"{workflow_id}:{workflow_store.version(workflow_id)}"
+    if request.if_none_match.contains_weak(etag):
+        metrics.state_requests.inc(service='orchestrator', result="not_modified")
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+        
+    payload, kind = stages.state_payload(workflow_id, request.args.get('since', type=int))
+    metrics.state_requests.inc(service='orchestrator', result=kind)
+        
+    response = jsonify(payload)
+    response.set_etag(f"{workflow_id}:{payload['version']}", weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@app.route('/api/workflows', methods=['GET'])
+def list_workflows():
+    """
+    List all workflows on this instance, newest first
+    """
+    workflows = workflow_store.list()
+    return jsonify({
+        "count": len(workflows),
+        "workflows": workflows
+    })
+
+
+@app.route('/api/workflows/<workflow_id>/events', methods=['GET'])
+def workflow_event_stream(workflow_id):
+    """
+    Server-sent events for one workflow, pushed as they happen:
+        snapshot  Full state (first event for new or too-far-behind clients)
+        state     Changed fields: {"workflow_id", "version", "changes"} as in /api/state?since=
+        job       Stage job status and progress (without the result)
+        deleted   The workflow was reset; the stream ends
+    
+    Reconnecting clients send Last-Event-ID (EventSource does this automatically) and
+    receive only the events they missed; an ID numbered by another process (a restart, or
+    another worker) gets a fresh snapshot.
+    """
+    if not workflow_store.exists(workflow_id):
+        return workflow_not_found(workflow_id)
+    
+    last_event_id = parse_last_event_id(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
+    pending = queue.Queue()
+    missed, current_id, unsubscribe = workflow_events.subscribe(workflow_id, pending.put, last_event_id)
+    
+    # Subscribed before reading, so nothing between the snapshot and live events is lost
+    snapshot = workflow_store.snapshot(workflow_id) if missed is None else None
+    heartbeat = heartbeat_seconds()
+    
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            if missed is None:
+                if snapshot is None:
+                    yield encode_sse("deleted", {"workflow_id": workflow_id})
+                    return
+                yield encode_sse("snapshot", public_state(snapshot), format_event_id(current_id))
+                sent = current_id
+            else:
+                sent = last_event_id
+                for item in missed:
+                    yield item.to_sse()
+                    sent = item.id
+            
+            while True:
+                try:
+                    item = pending.get(timeout=heartbeat)
+                except queue.Empty:
+                    if health.draining:
+                        return  # Shutting down; the client reconnects to another worker
+                    yield ": keep-alive\n\n"
+                    continue
+                if item.id <= sent:
+                    continue
+                yield item.to_sse()
+                sent = item.id
+                if item.event == "deleted":
+                    return
+        finally:
+            unsubscribe()
+    
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Don't let proxies buffer the stream
+    return response
+
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """
+    List background jobs, optionally filtered by ?workflow_id=
     """
-    # Return state without full suppliers data (too large)
-    state_copy = workflow_state.copy()
-    if state_copy.get("suppliers_data"):
-        state_copy["suppliers_count"] = len(state_copy["suppliers_data"])
-        state_copy.pop("suppliers_data")
+    jobs = job_manager.list(request.args.get('workflow_id'))
+    return jsonify({
+        "count": len(jobs),
+        "queue_depth": job_manager.queue_depth(),
+        "jobs": [job.to_dict() for job in jobs]
+    })
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Status, progress and (once finished) result of a background job
+    """
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({"error": f"Job {job_id} not found"}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """
+    Cancel a background job; the workflow returns to the status it had before the stage
+    """
+    job = job_manager.cancel(job_id)
+    if not job:
+        return jsonify({"error": f"Job {job_id} not found"}), 404
+    return jsonify({"message": "Cancellation requested", "job": job.to_dict()})
+
+
+@app.route('/api/batch', methods=['POST'])
+def run_batch_endpoint():
+    """
+    Run many goals through planner → researcher → communicator concurrently
+    
+    Expected JSON body:
+    {
+        "goals": ["goal 1", "goal 2", ...],   // at most BATCH_MAX_GOALS
+        "workers": 4,       // optional, capped by BATCH_MAX_WORKERS
+        "draft": true       // optional, false stops after research
+    }
     
-    return jsonify(state_copy)
+    Streams NDJSON: one result line per goal as it finishes, then a summary line.
+    Datasets are loaded once and shared by every goal in the batch.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        goals, workers, draft = parse_batch_request(data, BATCH_MAX_WORKERS, BATCH_MAX_GOALS)
+    except ValueError as e:
+        return jsonify({"error": "Invalid batch request", "details": str(e)}), 400
+    
+    data_result = load_suppliers_cached(INVENTORY_FILE, SALES_FILE)
+    if not data_result.get('success'):
+        return jsonify({
+            "error": "Failed to load data",
+            "details": data_result.get('error')
+        }), 500
+    
+    # One slot for the whole batch, budgeted for every goal in it
+    permit = admission.acquire("batch", admission.cost("batch", len(goals)))
+    lines = queue.Queue()
+    
+    def run():
+        try:
+            summary = run_batch(
+                goals,
+                data_result["combined_data"],
+                ANTHROPIC_API_KEY,
+                workers=workers,
+                draft=draft,
+                on_result=lines.put
+            )
+            lines.put(summary)
+        except Exception as e:
+            lines.put({"type": "error", "error": str(e)})
+        finally:
+            permit.release()
+            lines.put(None)
+    
+    threading.Thread(target=run, daemon=True).start()
+    
+    def generate():
+        while True:
+            line = lines.get()
+            if line is None:
+                break
+            yield response_codec.dumps_text(line) + "\n"
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+
+@app.route('/api/routes', methods=['GET'])
+def get_routes():
+    """
+    Per-agent model routing and per-route latency stats
+    """
+    return jsonify(get_route_stats())
 
 
 @app.route('/api/reset', methods=['POST'])
 def reset_workflow():
     """
-    Reset the workflow to start fresh
-    """
-    global workflow_state
-    workflow_state = {
-        "goal": None,
-        "status": "idle",
-        "current_step": 0,
-        "plan": [],
-        "findings": None,
-        "drafts": None,
-        "suppliers_data": None
-    }
-    return jsonify({"message": "Workflow reset", "state": workflow_state})
+    Reset a workflow to start fresh (cancels its jobs and removes it from the store)
+    """
+    workflow_id = get_workflow_id()
+    if not workflow_id:
+        return workflow_id_required()
+    for job in job_manager.list(workflow_id):
+        job_manager.cancel(job.id)
+    workflow_store.delete(workflow_id)
+    return jsonify({"message": "Workflow reset", "workflow_id": workflow_id, "state": new_workflow_state()})
 
 
 if __name__ == '__main__':
@@ -332,9 +637,19 @@ if __name__ == '__main__':
     if not ELEVENLABS_API_KEY:
         print("WARNING: ELEVENLABS_API_KEY not found in environment")
     
-    print(f"Starting orchestrator on port 5000...")
+    port = int(os.getenv('ORCHESTRATOR_PORT', '5000'))
+    print(f"Starting orchestrator on port {port}...")
+    print(f"Model backend: {os.getenv('LLM_BACKEND', 'remote')}")
     print(f"Using Claude model: {CLAUDE_MODEL}")
+    for agent in ("planner", "researcher", "communicator", "reporter"):
+        route = get_route(agent)
+        print(f"  {agent}: {route.primary} (fallback: {route.fallback or 'none'})")
     print(f"Inventory file: {INVENTORY_FILE}")
     print(f"Sales file: {SALES_FILE}")
+    print("Development server; use `python backend/serve.py orchestrator` in production")
+    debug = os.getenv('FLASK_DEBUG', 'true').lower() == 'true'
+    # With the reloader this process only watches files; the child it spawns serves
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        health.start()
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    app.run(debug=debug, host='0.0.0.0', port=port)
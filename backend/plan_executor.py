@@ -0,0 +1,422 @@
+"""
+Plan Executor - Runs the planner's steps as a dependency graph
+
+The planner gives every step an agent and the step numbers it depends_on. Steps whose
+dependencies have completed run concurrently on a worker pool, so a goal with
+independent parts (e.g. two product ranges to research) finishes in the time of its
+longest dependency chain rather than the sum of its steps. Each step's status and
+timings are written back into the workflow's plan as they change.
+
+Step agents:
+    researcher    Analyse the inventory and sales data (findings of several steps are merged)
+    manager       Approval gate: the run pauses here until the manager approves the findings
+    communicator  Draft supplier emails from the approved findings
+    reporter      Summarise progress with the Reporter Agent
+    none          Bookkeeping covered by the steps it depends on; completes immediately
+
+A plan runs in two phases split by its manager steps: the research phase (every step that
+does not depend on a manager step) and, once approved, the drafting phase (the rest).
+Emails are never drafted before approval: normalize_plan() adds a review gate in front of
+any communicator step the planner left ungated.
+
+Step status: pending, running, completed, failed, skipped (a dependency failed or the
+findings were rejected), awaiting_approval, rejected.
+
+Configuration:
+    PLAN_WORKERS    Steps of one workflow running at once (default: 4)
+"""
+import asyncio
+import inspect
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import metrics
+
+STEP_AGENTS = ("researcher", "manager", "communicator", "reporter", "none")
+
+# Title/description keywords used to pick an agent when the planner didn't name one
+_AGENT_KEYWORDS = (
+    ("manager", ("review", "approv", "sign off", "sign-off")),
+    ("communicator", ("draft", "email", "contact", "communicat", "negotiat", "outreach")),
+    ("reporter", ("report", "summar", "brief")),
+    ("researcher", ("research", "gather", "collect", "identify", "find", "investigat", "source")),
+)
+
+# Callbacks: on_step(step_number, fields) persists a step change; run_step(step, inputs)
+# returns a result dict with "success"; on_progress(done, total, step) runs between steps
+StepUpdate = Callable[[int, Dict[str, Any]], None]
+Progress = Callable[[int, int, Dict[str, Any]], None]
+
+
+def plan_workers() -> int:
+    return max(1, int(os.getenv('PLAN_WORKERS', '4')))
+
+
+def infer_agent(step: Dict[str, Any]) -> str:
+    text = f"{step.get('title', '')} {step.get('description', '')}".lower()
+    for agent, keywords in _AGENT_KEYWORDS:
+        if any(keyword in text for keyword in keywords):
+            return agent
+    return "none"
+
+
+def _has_cycle(steps: List[Dict[str, Any]]) -> bool:
+    deps = {step["step_number"]: step["depends_on"] for step in steps}
+    visiting, done = set(), set()
+
+    def visit(number) -> bool:
+        if number in done:
+            return False
+        if number in visiting:
+            return True
+        visiting.add(number)
+        cyclic = any(visit(dep) for dep in deps[number])
+        visiting.discard(number)
+        done.add(number)
+        return cyclic
+
+    return any(visit(number) for number in deps)
+
+
+def _ancestors(steps: List[Dict[str, Any]], number: int) -> set:
+    deps = {step["step_number"]: step["depends_on"] for step in steps}
+    seen, stack = set(), list(deps.get(number, []))
+    while stack:
+        dep = stack.pop()
+        if dep not in seen:
+            seen.add(dep)
+            stack.extend(deps.get(dep, []))
+    return seen
+
+
+def _renumber(steps: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Order steps so dependencies come first (otherwise keeping the planner's order),
+    then number them 1..n, remapping depends_on"""
+    ordered, placed = [], set()
+    while len(ordered) < len(steps):
+        step = next(step for step in steps
+                    if step["step_number"] not in placed and set(step["depends_on"]) <= placed)
+        ordered.append(step)
+        placed.add(step["step_number"])
+    steps = ordered
+    mapping = {step["step_number"]: index + 1 for index, step in enumerate(steps)}
+    for step in steps:
+        step["step_number"] = mapping[step["step_number"]]
+        step["depends_on"] = sorted(mapping[dep] for dep in step["depends_on"])
+    return steps
+
+
+def normalize_plan(plan: Iterable[Any]) -> List[Dict[str, Any]]:
+    """
+    Validate a planner result into an executable plan
+
+    Steps get unique step numbers, an agent (inferred from the title when missing) and
+    depends_on limited to existing steps. Plans without dependencies run in order, as
+    before; a cyclic plan falls back to that order too. A researcher step and a review
+    gate are added when needed so drafting always works from approved findings.
+    """
+    steps: List[Dict[str, Any]] = []
+    for index, raw in enumerate(plan or []):
+        step = dict(raw) if isinstance(raw, dict) else {"title": str(raw), "description": str(raw)}
+        step.setdefault("title", step.get("description") or f"Step {index + 1}")
+        step.setdefault("description", step["title"])
+        step["status"] = "pending"
+        steps.append(step)
+
+    numbers = [step.get("step_number") for step in steps]
+    if any(not isinstance(n, int) for n in numbers) or len(set(numbers)) != len(numbers):
+        for index, step in enumerate(steps):
+            step["step_number"] = index + 1
+    known = {step["step_number"] for step in steps}
+
+    for index, step in enumerate(steps):
+        deps = step.get("depends_on")
+        if deps is None:
+            # No dependency information: keep the planner's sequential order
+            deps = [steps[index - 1]["step_number"]] if index else []
+        step["depends_on"] = sorted({dep for dep in deps if dep in known and dep != step["step_number"]})
+        if step.get("agent") not in STEP_AGENTS:
+            step["agent"] = infer_agent(step)
+
+    if _has_cycle(steps):
+        print("[PLAN] Dependency cycle in plan; running steps in order")
+        for index, step in enumerate(steps):
+            step["depends_on"] = [steps[index - 1]["step_number"]] if index else []
+
+    if steps and not any(step["agent"] == "researcher" for step in steps):
+        roots = [step for step in steps if not step["depends_on"]]
+        research_number = min(known) - 1
+        steps.insert(0, {"step_number": research_number, "title": "Research Suppliers", "status": "pending",
+                         "description": "Load inventory and sales data and analyse it against the goal",
+                         "agent": "researcher", "depends_on": []})
+        for step in roots:
+            step["depends_on"] = [research_number]
+
+    gates = {step["step_number"] for step in steps if step["agent"] == "manager"}
+    ungated = [step for step in steps
+               if step["agent"] == "communicator" and not (_ancestors(steps, step["step_number"]) & gates)]
+    if ungated:
+        before = [step["step_number"] for step in steps if step["agent"] != "communicator"
+                  and not (_ancestors(steps, step["step_number"]) & {s["step_number"] for s in ungated})]
+        gate_number = max(step["step_number"] for step in steps) + 1
+        steps.insert(steps.index(ungated[0]), {
+            "step_number": gate_number, "title": "Review Findings", "status": "pending",
+            "description": "Manager reviews and approves the research findings",
+            "agent": "manager", "depends_on": [n for n in before if n not in gates]
+        })
+        for step in ungated:
+            step["depends_on"] = sorted(set(step["depends_on"]) | {gate_number})
+
+    return _renumber(steps)
+
+
+def phase_steps(plan: List[Dict[str, Any]], phase: str) -> List[int]:
+    """Step numbers of the 'research' phase (before any gate) or the 'drafting' phase"""
+    gates = {step["step_number"] for step in plan if step.get("agent") == "manager"}
+    before = [step["step_number"] for step in plan if step.get("agent") != "manager"
+              and not (_ancestors(plan, step["step_number"]) & gates)]
+    if phase == "research":
+        return before
+    return [step["step_number"] for step in plan
+            if step.get("agent") != "manager" and step["step_number"] not in before]
+
+
+def gate_steps(plan: List[Dict[str, Any]]) -> List[int]:
+    return [step["step_number"] for step in plan if step.get("agent") == "manager"]
+
+
+def rejected_plan(plan: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copy of the plan after the manager rejected the findings: gates rejected, the rest skipped"""
+    plan = [dict(step) for step in plan]
+    for step in plan:
+        if step.get("agent") == "manager":
+            step["status"] = "rejected"
+        elif step.get("status") == "pending":
+            step["status"] = "skipped"
+    return plan
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+class _Schedule:
+    """Dependency bookkeeping for one phase; dependencies outside the phase count as met"""
+
+    def __init__(self, plan: List[Dict[str, Any]], numbers: Iterable[int]):
+        numbers = set(numbers)
+        self.steps = {step["step_number"]: step for step in plan if step["step_number"] in numbers}
+        self.order = [step["step_number"] for step in plan if step["step_number"] in numbers]
+        self.deps = {n: [d for d in self.steps[n].get("depends_on", []) if d in numbers] for n in self.order}
+        self.status = {n: "pending" for n in self.order}
+        self.durations: Dict[int, float] = {}
+        self.started: Dict[int, float] = {}
+        self.outputs: Dict[int, Dict[str, Any]] = {}
+        self.errors: Dict[int, str] = {}
+
+    def ready(self) -> List[int]:
+        return [n for n in self.order if self.status[n] == "pending"
+                and all(self.status[d] == "completed" for d in self.deps[n])]
+
+    def start(self, number: int) -> Dict[str, Any]:
+        self.status[number] = "running"
+        self.started[number] = time.perf_counter()
+        return {"status": "running", "started_at": _now(), "finished_at": None, "duration_ms": None, "error": None}
+
+    def finish(self, number: int, result: Optional[Dict[str, Any]], error: Optional[str]) -> Dict[str, Any]:
+        duration = (time.perf_counter() - self.started[number]) * 1000
+        self.durations[number] = duration
+        metrics.plan_step_duration.observe(duration / 1000, agent=self.steps[number].get("agent"),
+                                           status="completed" if error is None else "failed")
+        fields = {"finished_at": _now(), "duration_ms": round(duration, 1)}
+        if error is None:
+            self.status[number] = "completed"
+            self.outputs[number] = result or {}
+            fields["status"] = "completed"
+        else:
+            self.status[number] = "failed"
+            self.errors[number] = error
+            fields.update(status="failed", error=error)
+        return fields
+
+    def skip_blocked(self) -> List[int]:
+        """Mark pending steps behind a failed step as skipped; returns them"""
+        skipped, changed = [], True
+        while changed:
+            changed = False
+            for n in self.order:
+                if self.status[n] == "pending" and any(self.status[d] in ("failed", "skipped") for d in self.deps[n]):
+                    self.status[n] = "skipped"
+                    skipped.append(n)
+                    changed = True
+        return skipped
+
+    @property
+    def done(self) -> int:
+        return sum(1 for status in self.status.values() if status not in ("pending", "running"))
+
+    def critical_path_ms(self) -> float:
+        longest: Dict[int, float] = {}
+        for n in self.order:  # normalize_plan puts dependencies first
+            longest[n] = self.durations.get(n, 0.0) + max((longest[d] for d in self.deps[n]), default=0.0)
+        return max(longest.values(), default=0.0)
+
+    def summary(self, started: float) -> Dict[str, Any]:
+        failed = [n for n in self.order if self.status[n] == "failed"]
+        return {
+            "success": not failed,
+            "outputs": self.outputs,
+            "failed": failed,
+            "error": "; ".join(f"step {n}: {self.errors[n]}" for n in failed) or None,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            "critical_path_ms": round(self.critical_path_ms(), 1),
+            "serial_ms": round(sum(self.durations.values()), 1)
+        }
+
+    def resets(self) -> List[Tuple[int, Dict[str, Any]]]:
+        """After cancellation the phase's results are discarded: (step, fields) putting its steps back to pending"""
+        return [
+            (n, {"status": "pending", "started_at": None, "finished_at": None, "duration_ms": None, "error": None})
+            for n in self.order
+        ]
+
+
+def _result_error(result: Any) -> Optional[str]:
+    if isinstance(result, dict) and result.get("success") is False:
+        return str(result.get("error") or "Step failed")
+    return None
+
+
+async def _settle(result: Any):
+    """Await a callback's result when it is awaitable"""
+    if inspect.isawaitable(result):
+        await result
+
+
+def _log_summary(phase: str, summary: Dict[str, Any], steps: int):
+    print(f"[PLAN] {phase}: {steps} step(s) in {summary['elapsed_ms']:.0f} ms "
+          f"(critical path {summary['critical_path_ms']:.0f} ms, serial {summary['serial_ms']:.0f} ms)")
+
+
+def execute_steps(
+    plan: List[Dict[str, Any]],
+    numbers: Iterable[int],
+    run_step: Callable[[Dict[str, Any], Dict[int, Dict[str, Any]]], Dict[str, Any]],
+    on_step: StepUpdate,
+    on_progress: Optional[Progress] = None,
+    max_workers: Optional[int] = None,
+    phase: str = "plan"
+) -> Dict[str, Any]:
+    """
+    Run the given steps on a thread pool as their dependencies complete
+
+    Args:
+        plan: Normalized plan (see normalize_plan)
+        numbers: Step numbers to run in this phase
+        run_step: run_step(step, outputs) -> result dict; outputs maps finished step
+            numbers to their results. A result with "success": False fails the step.
+        on_step: Persists status/timing fields for a step
+        on_progress: Called between steps from the calling thread; may raise to cancel
+            (e.g. JobCancelled), in which case running steps finish and the phase's
+            steps are reset to pending before the exception propagates
+        max_workers: Steps running at once (default: PLAN_WORKERS)
+        phase: Name used in the log line
+
+    Returns:
+        {"success", "outputs", "failed", "error", "elapsed_ms", "critical_path_ms", "serial_ms"}
+    """
+    schedule = _Schedule(plan, numbers)
+    limit = max_workers or plan_workers()
+    started = time.perf_counter()
+    running = {}
+
+    def call(number):
+        return run_step(schedule.steps[number], dict(schedule.outputs))
+
+    with ThreadPoolExecutor(max_workers=limit, thread_name_prefix="plan") as pool:
+        try:
+            while True:
+                for number in schedule.ready()[:limit - len(running)]:
+                    on_step(number, schedule.start(number))
+                    running[pool.submit(call, number)] = number
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    number = running.pop(future)
+                    try:
+                        result, error = future.result(), None
+                        error = _result_error(result)
+                    except Exception as e:
+                        result, error = None, str(e)
+                    on_step(number, schedule.finish(number, result, error))
+                    for skipped in schedule.skip_blocked():
+                        on_step(skipped, {"status": "skipped"})
+                    if on_progress:
+                        on_progress(schedule.done, len(schedule.order), schedule.steps[number])
+        except BaseException:
+            wait(running)
+            for number, fields in schedule.resets():
+                on_step(number, fields)
+            raise
+
+    summary = schedule.summary(started)
+    _log_summary(phase, summary, len(schedule.order))
+    return summary
+
+
+async def execute_steps_async(
+    plan: List[Dict[str, Any]],
+    numbers: Iterable[int],
+    run_step: Callable[[Dict[str, Any], Dict[int, Dict[str, Any]]], Awaitable[Dict[str, Any]]],
+    on_step: StepUpdate,
+    on_progress: Optional[Progress] = None,
+    max_workers: Optional[int] = None,
+    phase: str = "plan"
+) -> Dict[str, Any]:
+    """
+    asyncio version of execute_steps: run_step is a coroutine function; steps are tasks
+
+    on_step and on_progress may also be coroutine functions (e.g. to write the step to a
+    blocking store from a worker thread); they are awaited in order.
+    """
+    schedule = _Schedule(plan, numbers)
+    limit = max_workers or plan_workers()
+    started = time.perf_counter()
+    running: Dict[asyncio.Task, int] = {}
+
+    try:
+        while True:
+            for number in schedule.ready()[:limit - len(running)]:
+                await _settle(on_step(number, schedule.start(number)))
+                task = asyncio.ensure_future(run_step(schedule.steps[number], dict(schedule.outputs)))
+                running[task] = number
+            if not running:
+                break
+            finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                number = running.pop(task)
+                try:
+                    result, error = task.result(), None
+                    error = _result_error(result)
+                except Exception as e:
+                    result, error = None, str(e)
+                await _settle(on_step(number, schedule.finish(number, result, error)))
+                for skipped in schedule.skip_blocked():
+                    await _settle(on_step(skipped, {"status": "skipped"}))
+                if on_progress:
+                    await _settle(on_progress(schedule.done, len(schedule.order), schedule.steps[number]))
+    except BaseException:
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        for number, fields in schedule.resets():
+            await _settle(on_step(number, fields))
+        raise
+
+    summary = schedule.summary(started)
+    _log_summary(phase, summary, len(schedule.order))
+    return summary
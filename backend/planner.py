@@ -1,31 +1,26 @@
 """
 Planner Agent - Creates a step-by-step plan from the manager's goal
 """
-import anthropic
+from llm_backend import get_backend
+from model_router import routed_call_effects
+from resilience import sdk_timeout
+import effects
+from plan_executor import normalize_plan
 import os
 import json
 
-def create_plan(goal, api_key, model="claude-sonnet-4-5-20250929"):
-    """
-    Takes a goal and returns a structured plan with steps
-    
-    Args:
-        goal (str): The goal submitted by the manager
-        api_key (str): Anthropic API key
-        model (str): Claude model to use
-    
-    Returns:
-        list: Array of plan steps
-    """
-    if not api_key:
-        return {
-            "success": False,
-            "error": "ANTHROPIC_API_KEY is missing. Add it to api.env to use real planning.",
-        }
+# Used when the planner's circuit is open or every attempt failed; mirrors the
+# research → approve → draft sequence the orchestrator runs. A plan built from it is
+# marked "degraded" so callers can tell an outage from a real plan.
+FALLBACK_PLAN = [
+    {"step_number": 1, "title": "Research Suppliers", "description": "Load inventory and sales data and analyse it against the goal", "agent": "researcher", "depends_on": [], "status": "pending"},
+    {"step_number": 2, "title": "Review Findings", "description": "Manager reviews and approves the research findings", "agent": "manager", "depends_on": [1], "status": "pending"},
+    {"step_number": 3, "title": "Draft Communications", "description": "Draft emails to the relevant suppliers", "agent": "communicator", "depends_on": [2], "status": "pending"}
+]
 
-    client = anthropic.Anthropic(api_key=api_key)
-    
-    prompt = f"""You are a strategic planning assistant for supplier relationship management.
+def build_plan_prompt(goal):
+    """Prompt asking Claude for a JSON plan for the goal"""
+    return f"""You are a strategic planning assistant for supplier relationship management.
 
 The manager has submitted this goal: "{goal}"
 
@@ -40,54 +35,112 @@ Return your response as a JSON array of steps. Each step should have:
 - "step_number": integer
 - "title": brief title
 - "description": detailed description of what needs to be done
+- "agent": who carries the step out, one of:
+    "researcher" (analyses inventory and sales data), "manager" (reviews and approves findings),
+    "communicator" (drafts supplier emails), "reporter" (summarises progress), "none" (no action needed)
+- "depends_on": array of step_numbers that must finish before this step can start.
+  Steps that don't depend on each other run in parallel, so if the goal has independent
+  parts, give each part its own research step with no dependency between them.
+  Emails must depend on a "manager" review step.
 - "status": "pending" (all steps start as pending)
 
 Example format:
 [
-  {{"step_number": 1, "title": "Research Suppliers", "description": "Gather supplier data from CRM", "status": "pending"}},
-  {{"step_number": 2, "title": "Analyze Data", "description": "Review ratings and categories", "status": "pending"}}
+  {{"step_number": 1, "title": "Research Snack Suppliers", "description": "Gather snack sales and stock data", "agent": "researcher", "depends_on": [], "status": "pending"}},
+  {{"step_number": 2, "title": "Research Drinks Suppliers", "description": "Gather drinks sales and stock data", "agent": "researcher", "depends_on": [], "status": "pending"}},
+  {{"step_number": 3, "title": "Review Findings", "description": "Manager approves the combined findings", "agent": "manager", "depends_on": [1, 2], "status": "pending"}},
+  {{"step_number": 4, "title": "Draft Communications", "description": "Email the shortlisted suppliers", "agent": "communicator", "depends_on": [3], "status": "pending"}}
 ]
 
 Only return the JSON array, no other text."""
 
+
+def parse_plan_response(response_text):
+    """Turn Claude's response text into the planner result dict"""
+    response_text = response_text.strip()
+
+    # Remove markdown code blocks if present
+    if response_text.startswith("```json"):
+        response_text = response_text[7:]  # Remove ```json
+    elif response_text.startswith("```"):
+        response_text = response_text[3:]  # Remove ```
+    
+    if response_text.endswith("```"):
+        response_text = response_text[:-3]  # Remove trailing ```
+    
+    response_text = response_text.strip()
+    
     try:
-        message = client.messages.create(
-            model=model,
-            max_tokens=2000,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
-        
-        # Extract the text content
-        response_text = message.content[0].text.strip()
-        
-        # Remove markdown code blocks if present
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]  # Remove ```json
-        elif response_text.startswith("```"):
-            response_text = response_text[3:]  # Remove ```
-        
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]  # Remove trailing ```
-        
-        response_text = response_text.strip()
-        
         # Parse JSON from response
         plan = json.loads(response_text)
-        
-        return {
-            "success": True,
-            "plan": plan
-        }
-        
     except json.JSONDecodeError as e:
         return {
             "success": False,
             "error": f"JSON parsing error: {str(e)}. Response was: {response_text[:200]}"
         }
+
+    return {
+        "success": True,
+        "plan": normalize_plan(plan)
+    }
+
+
+def _missing_key_error():
+    return {
+        "success": False,
+        "error": "ANTHROPIC_API_KEY is missing. Add it to api.env to use real planning.",
+    }
+
+
+def create_plan(goal, api_key, model=None):
+    """Takes a goal and returns a structured plan with steps (see create_plan_effects)"""
+    return effects.run(create_plan_effects(goal, api_key, model))
+
+
+def create_plan_effects(goal, api_key, model=None):
+    """
+    Takes a goal and returns a structured plan with steps, as a generator of effects
+    
+    Args:
+        goal (str): The goal submitted by the manager
+        api_key (str): Anthropic API key
+        model (str): Claude model to use (default: the agent's configured route)
+    
+    Returns:
+        dict: "success" and the plan steps; "degraded" is True when the planner was
+        unavailable and the plan is FALLBACK_PLAN
+    """
+    backend = get_backend()
+
+    if not api_key and backend.requires_api_key:
+        return _missing_key_error()
+    
+    prompt = build_plan_prompt(goal)
+    degraded = False
+
+    def fallback_plan():
+        nonlocal degraded
+        degraded = True
+        return json.dumps(FALLBACK_PLAN)
+
+    try:
+        # Extract the text content (falls back to the default plan if Claude is unavailable)
+        response_text = yield from routed_call_effects(
+            "planner",
+            lambda routed_model: effects.Either(
+                backend.complete, backend.acomplete, "planner", routed_model, prompt,
+                max_tokens=2000, api_key=api_key, timeout=sdk_timeout("planner")
+            ),
+            model=model,
+            fallback=fallback_plan
+        )
     except Exception as e:
         return {
             "success": False,
             "error": f"Planner call failed: {e}",
         }
+
+    result = parse_plan_response(response_text)
+    if degraded:
+        result["degraded"] = True
+    return result
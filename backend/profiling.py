@@ -0,0 +1,299 @@
+"""
+Request Profiling - Opt-in per-request profiles in flamegraph-ready collapsed-stack format
+
+When a request is slow, profile it to see whether time goes to CSV parsing, prompt and
+JSON building, the network or serialization. A request is profiled when it carries an
+X-Profile header, or at random at PROFILE_SAMPLE_RATE. Two profilers are available:
+
+    sample    A background thread samples every thread's stack every PROFILE_INTERVAL_MS
+              while the request runs, so background stage jobs it starts are captured
+              too (as are other requests running at the same time). Low overhead.
+    cprofile  cProfile on the request thread only: exact call counts and timings, but
+              slower, and only one request at a time (others fall back to sampling).
+
+Each profile is saved as collapsed stacks ("frame;frame;frame weight" per line), the
+input of flamegraph.pl, speedscope and inferno; cProfile runs also keep the raw .pstats.
+Profiled responses carry X-Profile-Id.
+
+Endpoints added by install_flask(app, service):
+    GET /api/profiles                   Captured profiles, newest first
+    GET /api/profiles/<id>              Collapsed stacks (text/plain)
+    GET /api/profiles/<id>?format=pstats  Raw cProfile stats (cprofile mode only)
+
+Configuration:
+    PROFILING             'off' (default) or 'on'; nothing is profiled or exposed when off
+    PROFILE_SAMPLE_RATE   Fraction of requests profiled without the header (default: 0)
+    PROFILE_MODE          Profiler for sampled requests and 'X-Profile: 1' (default: sample)
+    PROFILE_INTERVAL_MS   Sampling interval (default: 5)
+    PROFILE_TOKEN         If set, X-Profile-Token must match for the header to count
+    PROFILE_DIR           Where profiles are written (default: data/profiles)
+    PROFILE_KEEP          Profiles kept on disk; older ones are deleted (default: 50)
+
+Usage:
+    curl -H 'X-Profile: sample' -X POST 'localhost:5000/api/execute-research?wait=true' ...
+    curl localhost:5000/api/profiles/<id> > research.collapsed && flamegraph.pl research.collapsed > research.svg
+"""
+import cProfile
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'profiles')
+MODES = ("sample", "cprofile")
+
+# cProfile can only be active once per process (per thread before 3.12, globally after)
+_cprofile_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return os.getenv('PROFILING', 'off').lower() == 'on'
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples the stacks of every thread (except its own) at a fixed interval"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def pstats_to_collapsed(stats: pstats.Stats, unit: float = 1e-6) -> str:
+    """
+    Approximate collapsed stacks from cProfile's caller/callee graph
+
+    Each function's time is split between its callers in proportion to the time spent
+    under each one (as flameprof does); weights are in microseconds.
+    """
+    raw = stats.stats  # func -> (cc, nc, tt, ct, callers{caller: (cc, nc, tt, ct)})
+    callees: Dict[Any, List[Any]] = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+
+    def name(func) -> str:
+        filename, line, function = func
+        return f"{function} ({os.path.basename(filename)}:{line})" if line else function
+
+    lines: Counter = Counter()
+
+    def walk(func, share: float, path: List[str], seen: set):
+        _, _, tt, ct, _ = raw[func]
+        if ct <= 0 or share <= 0:
+            return
+        scale = share / ct
+        path = path + [name(func)]
+        self_weight = int(tt * scale / unit)
+        if self_weight:
+            lines[";".join(path)] += self_weight
+        for callee, edge_ct in callees.get(func, []):
+            if callee not in seen and callee in raw:
+                walk(callee, edge_ct * scale, path, seen | {callee})
+
+    roots = [func for func, value in raw.items() if not value[4]]
+    for root in roots:
+        walk(root, raw[root][3], [], {root})
+    return "".join(f"{stack} {weight}\n" for stack, weight in lines.most_common())
+
+
+class RequestProfile:
+    """One request's profiler, started before the view and saved after it"""
+
+    def __init__(self, mode: str, method: str, path: str, service: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.mode = mode
+        self.method = method
+        self.path = path
+        self.service = service
+        self.created_at = datetime.utcnow().isoformat()
+        self._start = time.perf_counter()
+        self._profiler = None
+        self._sampler = None
+        self._holds_cprofile = False
+
+        if mode == "cprofile" and _cprofile_lock.acquire(blocking=False):
+            self._holds_cprofile = True
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+            except ValueError:  # another profiler is active in this process
+                self._release()
+        if self._profiler is None:
+            self.mode = "sample"
+            self._sampler = SamplingProfiler(float(os.getenv('PROFILE_INTERVAL_MS', '5')) / 1000)
+            self._sampler.start()
+
+    def _release(self):
+        self._profiler = None
+        if self._holds_cprofile:
+            self._holds_cprofile = False
+            _cprofile_lock.release()
+
+    def stop(self, status: Optional[int] = None) -> Dict[str, Any]:
+        """Stop profiling and write the profile; returns its listing entry"""
+        duration_ms = (time.perf_counter() - self._start) * 1000
+        os.makedirs(profile_dir(), exist_ok=True)
+        base = os.path.join(profile_dir(), self.id)
+        entry = {
+            "id": self.id,
+            "service": self.service,
+            "method": self.method,
+            "path": self.path,
+            "status": status,
+            "mode": self.mode,
+            "duration_ms": round(duration_ms, 1),
+            "created_at": self.created_at,
+            "url": f"/api/profiles/{self.id}"
+        }
+
+        if self._profiler is not None:
+            self._profiler.disable()
+            stats = pstats.Stats(self._profiler)
+            stats.dump_stats(base + ".pstats")
+            collapsed = pstats_to_collapsed(stats)
+            entry["calls"] = stats.total_calls
+            self._release()
+        else:
+            self._sampler.stop()
+            collapsed = self._sampler.collapsed()
+            entry["samples"] = self._sampler.samples
+
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            f.write(collapsed)
+        _index.add(entry)
+        return entry
+
+
+class _ProfileIndex:
+    """Newest-first listing of saved profiles, bounded by PROFILE_KEEP"""
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, entry: Dict[str, Any]):
+        keep = int(os.getenv('PROFILE_KEEP', '50'))
+        with self._lock:
+            self._entries[entry["id"]] = entry
+            while len(self._entries) > keep:
+                old_id, _ = self._entries.popitem(last=False)
+                for suffix in (".collapsed", ".pstats"):
+                    try:
+                        os.remove(os.path.join(profile_dir(), old_id + suffix))
+                    except OSError:
+                        pass
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._entries.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(reversed(self._entries.values()))
+
+
+_index = _ProfileIndex()
+
+
+def profile_dir() -> str:
+    return os.path.abspath(os.getenv('PROFILE_DIR', DEFAULT_PROFILE_DIR))
+
+
+def requested_mode(headers) -> Optional[str]:
+    """Profiler to use for a request with these headers, or None to not profile it"""
+    if not enabled():
+        return None
+    default_mode = os.getenv('PROFILE_MODE', 'sample').lower()
+    header = (headers.get('X-Profile') or "").strip().lower()
+    token = os.getenv('PROFILE_TOKEN')
+    if header and (not token or headers.get('X-Profile-Token') == token):
+        return header if header in MODES else default_mode
+    rate = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+    if rate > 0 and random.random() < rate:
+        return default_mode
+    return None
+
+
+def install_flask(app, service: str):
+    """Profile requests that ask for it (or are sampled) and add the /api/profiles endpoints"""
+    from flask import Response, g, jsonify, request, send_file
+
+    @app.before_request
+    def start_profile():
+        mode = requested_mode(request.headers)
+        if mode and not request.path.startswith('/api/profiles'):
+            g.request_profile = RequestProfile(mode, request.method, request.full_path.rstrip('?'), service)
+
+    @app.after_request
+    def save_profile(response):
+        profile = g.pop("request_profile", None)
+        if profile is not None:
+            entry = profile.stop(response.status_code)
+            response.headers['X-Profile-Id'] = entry["id"]
+            print(f"[PROFILE] {entry['method']} {entry['path']} {entry['duration_ms']:.0f} ms ({entry['mode']}) → {entry['url']}")
+        return response
+
+    @app.teardown_request
+    def discard_profile(error=None):
+        # A request that failed before after_request still stops its profiler
+        profile = g.pop("request_profile", None)
+        if profile is not None:
+            profile.stop(500)
+
+    @app.route('/api/profiles', methods=['GET'])
+    def list_profiles():
+        if not enabled():
+            return jsonify({"error": "Profiling is disabled (set PROFILING=on)"}), 404
+        profiles = _index.list()
+        return jsonify({"count": len(profiles), "profiles": profiles})
+
+    @app.route('/api/profiles/<profile_id>', methods=['GET'])
+    def get_profile(profile_id):
+        entry = _index.get(profile_id) if enabled() else None
+        if not entry:
+            return jsonify({"error": f"Profile {profile_id} not found"}), 404
+        if request.args.get('format') == 'pstats':
+            if entry["mode"] != "cprofile":
+                return jsonify({"error": "Only cprofile profiles have pstats output"}), 400
+            return send_file(os.path.join(profile_dir(), profile_id + ".pstats"),
+                             mimetype='application/octet-stream', download_name=f"{profile_id}.pstats")
+        with open(os.path.join(profile_dir(), profile_id + ".collapsed"), encoding="utf-8") as f:
+            return Response(f.read(), mimetype='text/plain')
@@ -1,24 +1,16 @@
 """
-Reporter Agent - Creates voice reports using Claude + ElevenLabs
+Reporter Agent - Creates voice reports using Claude + ElevenLabs (or the local stand-in)
 """
-import anthropic
+from llm_backend import get_backend
+from model_router import routed_call_effects
+from resilience import call_with_resilience_effects, sdk_timeout
+import effects
+import metrics
 import json
-from elevenlabs.client import ElevenLabs
+import time
 
-def generate_status_report(state, api_key, model="claude-sonnet-4-5-20250929"):
-    """
-    Generates a text status report from the current state
-    
-    Args:
-        state (dict): Current workflow state
-        api_key (str): Anthropic API key
-        model (str): Claude model to use
-    
-    Returns:
-        dict: Status report text
-    """
-    client = anthropic.Anthropic(api_key=api_key)
-    
+def build_status_prompt(state):
+    """Prompt asking Claude for a spoken status report of the workflow"""
     state_summary = json.dumps({
         "goal": state.get("goal"),
         "status": state.get("status"),
@@ -28,7 +20,7 @@ def generate_status_report(state, api_key, model="claude-sonnet-4-5-20250929"):
         "has_drafts": "drafts" in state
     }, indent=2)
     
-    prompt = f"""You are a business assistant providing a status update to a manager.
+    return f"""You are a business assistant providing a status update to a manager.
 
 Current Workflow State:
 {state_summary}
@@ -44,21 +36,52 @@ Limit to 2-3 paragraphs (about 200-300 words).
 
 Return only the status report text, no JSON or formatting."""
 
+
+def generate_status_report(state, api_key, model=None):
+    """Generates a text status report from the current state (see generate_status_report_effects)"""
+    return effects.run(generate_status_report_effects(state, api_key, model))
+
+
+def generate_status_report_effects(state, api_key, model=None):
+    """
+    Generates a text status report from the current state, as a generator of effects
+    
+    Args:
+        state (dict): Current workflow state
+        api_key (str): Anthropic API key
+        model (str): Claude model to use (default: the agent's configured route)
+    
+    Returns:
+        dict: Status report text; "degraded" is True when it is the template report
+        (Claude was unavailable)
+    """
+    backend = get_backend()
+    prompt = build_status_prompt(state)
+    degraded = False
+
+    def fallback_report():
+        nonlocal degraded
+        degraded = True
+        return _fallback_status_report(state)
+
     try:
-        message = client.messages.create(
+        report_text = yield from routed_call_effects(
+            "reporter",
+            lambda routed_model: effects.Either(
+                backend.complete, backend.acomplete, "reporter", routed_model, prompt,
+                max_tokens=1000, api_key=api_key, timeout=sdk_timeout("reporter")
+            ),
             model=model,
-            max_tokens=1000,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
+            fallback=fallback_report
         )
         
-        report_text = message.content[0].text
-        
-        return {
+        result = {
             "success": True,
             "report": report_text
         }
+        if degraded:
+            result["degraded"] = True
+        return result
         
     except Exception as e:
         return {
@@ -67,9 +90,35 @@ Return only the status report text, no JSON or formatting."""
         }
 
 
+def _fallback_status_report(state):
+    """Template status report used when Claude is unavailable"""
+    plan = state.get("plan") or []
+    parts = [f"Here is a quick status update. The current goal is: {state.get('goal')}."]
+    parts.append(f"The workflow is currently {str(state.get('status', 'idle')).replace('_', ' ')}, at step {state.get('current_step', 0)} of {len(plan)}.")
+    if state.get("findings"):
+        parts.append("Research findings are available for review.")
+    if state.get("drafts"):
+        parts.append("Supplier emails have been drafted.")
+    return " ".join(parts)
+
+
+def record_tts(backend, start, audio_data):
+    """TTS latency (and audio size on success) for the metrics endpoint"""
+    name = backend.name if backend else "unknown"
+    metrics.tts_duration.observe(time.perf_counter() - start, backend=name,
+                                 outcome="ok" if audio_data is not None else "error")
+    if audio_data is not None:
+        metrics.tts_bytes.inc(len(audio_data), backend=name)
+
+
 def generate_voice_report(report_text, elevenlabs_api_key, voice_id="JBFqnCBsd6RMkjVDRZzb"):
+    """Converts text report to speech using ElevenLabs API (see generate_voice_report_effects)"""
+    return effects.run(generate_voice_report_effects(report_text, elevenlabs_api_key, voice_id))
+
+
+def generate_voice_report_effects(report_text, elevenlabs_api_key, voice_id="JBFqnCBsd6RMkjVDRZzb"):
     """
-    Converts text report to speech using ElevenLabs API
+    Converts text report to speech using ElevenLabs API, as a generator of effects
     
     Args:
         report_text (str): Text to convert to speech
@@ -79,21 +128,22 @@ def generate_voice_report(report_text, elevenlabs_api_key, voice_id="JBFqnCBsd6R
     Returns:
         dict: Audio data
     """
+    start = time.perf_counter()
+    backend = None
     try:
-        # Initialize ElevenLabs client
-        client = ElevenLabs(api_key=elevenlabs_api_key)
+        backend = get_backend()
         
         # Convert text to speech
-        audio = client.text_to_speech.convert(
-            text=report_text,
-            voice_id=voice_id,
-            model_id="eleven_multilingual_v2",
-            output_format="mp3_44100_128"
-        )
-        
-        # Collect audio data from generator
-        audio_data = b"".join(audio)
+        audio_data = yield from call_with_resilience_effects("tts", effects.Either(
+            backend.synthesize,
+            backend.asynthesize,
+            report_text,
+            voice_id,
+            api_key=elevenlabs_api_key,
+            timeout=sdk_timeout("tts")
+        ))
         
+        record_tts(backend, start, audio_data)
         return {
             "success": True,
             "audio_data": audio_data,
@@ -101,6 +151,7 @@ def generate_voice_report(report_text, elevenlabs_api_key, voice_id="JBFqnCBsd6R
         }
             
     except Exception as e:
+        record_tts(backend, start, None)
         return {
             "success": False,
             "error": f"ElevenLabs error: {str(e)}"
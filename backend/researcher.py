@@ -1,25 +1,23 @@
 """
 Researcher Agent - Analyzes supplier data from the CRM
 """
-import anthropic
+from llm_backend import get_backend
+from model_router import routed_call_effects
+from resilience import sdk_timeout
+import effects
+import metrics
+import hashlib
 import json
 import os
+import threading
+import time
 
-def analyze_suppliers(goal, combined_data, api_key, model="claude-sonnet-4-5-20250929"):
-    """
-    Analyzes retail inventory and sales data based on the goal
-    
-    Args:
-        goal (str): The original goal
-        combined_data (dict): Combined inventory and sales data from CSV files
-        api_key (str): Anthropic API key
-        model (str): Claude model to use
-    
-    Returns:
-        dict: Analysis results and findings
-    """
-    client = anthropic.Anthropic(api_key=api_key)
-    
+# Parsed datasets keyed by (inventory_path, sales_path), with the file mtimes they were read at
+_dataset_cache = {}
+_dataset_lock = threading.Lock()
+
+def build_research_prompt(goal, combined_data):
+    """Prompt asking Claude to analyse a sample of the inventory and sales data"""
     # Extract inventory and sales data
     inventory_data = combined_data.get("inventory", [])
     sales_data = combined_data.get("sales", [])
@@ -36,7 +34,7 @@ def analyze_suppliers(goal, combined_data, api_key, model="claude-sonnet-4-5-202
         "total_sales_records": len(sales_data)
     }, indent=2)
     
-    prompt = f"""You are a retail analyst specializing in inventory and sales analysis.
+    return f"""You are a retail analyst specializing in inventory and sales analysis.
 
 Goal: {goal}
 
@@ -113,46 +111,102 @@ Return your response as a JSON object with these fields:
 
 Only return the JSON object, no other text."""
 
+
+def parse_findings_response(response_text):
+    """Turn Claude's response text into the researcher result dict"""
+    response_text = response_text.strip()
+
+    # Remove markdown code blocks if present
+    if response_text.startswith("```json"):
+        response_text = response_text[7:]
+    elif response_text.startswith("```"):
+        response_text = response_text[3:]
+    
+    if response_text.endswith("```"):
+        response_text = response_text[:-3]
+    
+    response_text = response_text.strip()
+    
     try:
-        message = client.messages.create(
-            model=model,
-            max_tokens=4000,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
-        
-        response_text = message.content[0].text.strip()
-        
-        # Remove markdown code blocks if present
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        elif response_text.startswith("```"):
-            response_text = response_text[3:]
-        
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        
-        response_text = response_text.strip()
-        
         findings = json.loads(response_text)
-        
-        return {
-            "success": True,
-            "findings": findings
-        }
-        
     except json.JSONDecodeError as e:
         return {
             "success": False,
             "error": f"JSON parsing error: {str(e)}"
         }
+
+    return {
+        "success": True,
+        "findings": findings
+    }
+
+
+def analyze_suppliers(goal, combined_data, api_key, model=None):
+    """Analyzes retail inventory and sales data based on the goal (see analyze_suppliers_effects)"""
+    return effects.run(analyze_suppliers_effects(goal, combined_data, api_key, model))
+
+
+def analyze_suppliers_effects(goal, combined_data, api_key, model=None):
+    """
+    Analyzes retail inventory and sales data based on the goal, as a generator of effects
+    
+    Args:
+        goal (str): The original goal
+        combined_data (dict): Combined inventory and sales data from CSV files
+        api_key (str): Anthropic API key
+        model (str): Claude model to use (default: the agent's configured route)
+    
+    Returns:
+        dict: Analysis results and findings
+    """
+    backend = get_backend()
+    prompt = build_research_prompt(goal, combined_data)
+
+    try:
+        response_text = yield from routed_call_effects(
+            "researcher",
+            lambda routed_model: effects.Either(
+                backend.complete, backend.acomplete, "researcher", routed_model, prompt,
+                max_tokens=4000, api_key=api_key, timeout=sdk_timeout("researcher")
+            ),
+            model=model
+        )
     except Exception as e:
         return {
             "success": False,
             "error": str(e)
         }
 
+    return parse_findings_response(response_text)
+
+
+def merge_findings(findings_list):
+    """
+    Combine the findings of several research steps (one per part of a multi-part goal)
+    into a single findings object; the first step's statistics are kept
+    """
+    findings_list = [findings for findings in findings_list if findings]
+    if len(findings_list) == 1:
+        return findings_list[0]
+    
+    merged = {
+        "summary": " ".join(findings.get("summary", "") for findings in findings_list).strip(),
+        "key_findings": [],
+        "relevant_suppliers": [],
+        "statistics": next((findings["statistics"] for findings in findings_list if findings.get("statistics")), {}),
+        "recommendations": []
+    }
+    seen = set()
+    for findings in findings_list:
+        merged["key_findings"].extend(findings.get("key_findings", []))
+        merged["recommendations"].extend(findings.get("recommendations", []))
+        for supplier in findings.get("relevant_suppliers", []):
+            key = (supplier.get("supplier"), supplier.get("product"))
+            if key not in seen:
+                seen.add(key)
+                merged["relevant_suppliers"].append(supplier)
+    return merged
+
 
 def load_suppliers_from_file(inventory_path, sales_path):
     """
@@ -203,3 +257,69 @@ def load_suppliers_from_file(inventory_path, sales_path):
             "success": False,
             "error": str(e)
         }
+
+
+def _dataset_key(inventory_path, sales_path):
+    paths = (os.path.abspath(inventory_path), os.path.abspath(sales_path))
+    return paths, tuple(os.path.getmtime(path) for path in paths)
+
+
+def dataset_version(inventory_path, sales_path):
+    """Short fingerprint of the dataset files (paths and modification times), None if missing"""
+    try:
+        return hashlib.sha1(repr(_dataset_key(inventory_path, sales_path)).encode()).hexdigest()[:12]
+    except OSError:
+        return None
+
+
+def load_suppliers_cached(inventory_path, sales_path):
+    """
+    load_suppliers_from_file(), parsed once per process and re-read only when a file changes
+    
+    The combined data is shared by every caller and must be treated as read-only.
+    Failures are not cached, so a missing file is retried on the next call.
+    """
+    try:
+        paths, mtimes = _dataset_key(inventory_path, sales_path)
+    except OSError as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+    
+    with _dataset_lock:
+        cached = _dataset_cache.get(paths)
+        if cached and cached[0] == mtimes:
+            metrics.dataset_cache.inc(result="hit")
+            return cached[1]
+        metrics.dataset_cache.inc(result="miss")
+        start = time.perf_counter()
+        result = load_suppliers_from_file(inventory_path, sales_path)
+        metrics.dataset_load_duration.observe(time.perf_counter() - start)
+        if result.get("success"):
+            _dataset_cache[paths] = (mtimes, result)
+        return result
+
+
+def preload_datasets(inventory_path, sales_path):
+    """
+    Parse the datasets ahead of the first request (e.g. in a server's master process
+    before it forks workers, so every worker shares the same pages copy-on-write)
+    """
+    result = load_suppliers_cached(inventory_path, sales_path)
+    if result.get("success"):
+        data = result["combined_data"]
+        print(f"✓ Datasets preloaded: {data['inventory_count']} inventory rows, {data['sales_count']} sales rows")
+    else:
+        print(f"⚠ Dataset preload failed: {result.get('error')}")
+    return result
+
+
+def datasets_loaded(inventory_path, sales_path):
+    """True when the datasets are cached and the files haven't changed since"""
+    try:
+        paths, mtimes = _dataset_key(inventory_path, sales_path)
+    except OSError:
+        return False
+    cached = _dataset_cache.get(paths)
+    return bool(cached) and cached[0] == mtimes
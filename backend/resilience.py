@@ -0,0 +1,436 @@
+"""
+Resilience Layer - Deadlines, retries, hedging and circuit breaking for agent calls
+Shared by the Planner, Researcher, Communicator and Reporter agents (Claude + ElevenLabs)
+
+Configuration (read from the environment on first use, so api.env is already loaded):
+    API_TIMEOUT                 Per-attempt deadline in milliseconds (default: 60000)
+    API_DEADLINE                Total budget per call in milliseconds, retries included
+                                (default: API_TIMEOUT * (MAX_RETRIES + 1))
+    MAX_RETRIES                 Retries on retryable errors (default: 2)
+    RETRY_BACKOFF_BASE          First backoff step in seconds (default: 0.5)
+    RETRY_BACKOFF_MAX           Backoff cap in seconds (default: 8)
+    ENABLE_HEDGING              Send a duplicate request once p95 latency is exceeded (default: false)
+    HEDGE_MIN_SAMPLES           Latency samples needed before hedging kicks in (default: 20)
+    CIRCUIT_FAILURE_THRESHOLD   Consecutive failures that open the circuit (default: 5)
+    CIRCUIT_RESET_SECONDS       Time an open circuit waits before a trial call (default: 30)
+
+Any of the per-call values can be overridden for a single call name, e.g.
+PLANNER_API_TIMEOUT=15000 or TTS_MAX_RETRIES=1.
+
+For local testing, point the SDKs at a fake server with ANTHROPIC_BASE_URL
+(read by the anthropic SDK itself) and ELEVENLABS_BASE_URL (read by llm_backend.py);
+fake_llm_server.py is one for the Messages API, and tests/test_resilience.py runs this
+layer against it.
+"""
+import asyncio
+import copy
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import effects
+
+
+# HTTP status codes worth retrying (529 is Anthropic's "overloaded")
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+# SDK exception class names that indicate a transient network problem
+RETRYABLE_ERROR_NAMES = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "RateLimitError",
+    "InternalServerError",
+    "OverloadedError",
+    "ConnectError",
+    "ConnectTimeout",
+    "ReadTimeout",
+    "WriteTimeout",
+    "PoolTimeout",
+    "RemoteProtocolError",
+}
+
+
+class CallTimeoutError(TimeoutError):
+    """Raised when a call misses its per-attempt deadline"""
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a call is rejected because its circuit is open"""
+
+
+def _env_float(name: str, default: float, call_name: Optional[str] = None) -> float:
+    """Read a float setting, preferring the per-call override if present"""
+    if call_name:
+        override = os.getenv(f"{call_name.upper()}_{name}")
+        if override:
+            return float(override)
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+class ResiliencePolicy:
+    """Timeouts, retry, hedging and breaker settings for one call name"""
+
+    def __init__(
+        self,
+        timeout: float = 60.0,
+        deadline: Optional[float] = None,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        hedge: bool = False,
+        hedge_min_samples: int = 20,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0
+    ):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.deadline = deadline if deadline is not None else timeout * (max_retries + 1)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+    @classmethod
+    def from_env(cls, call_name: Optional[str] = None) -> "ResiliencePolicy":
+        """Build a policy from environment variables (timeouts are in milliseconds)"""
+        timeout = _env_float("API_TIMEOUT", 60000, call_name) / 1000
+        max_retries = int(_env_float("MAX_RETRIES", 2, call_name))
+        deadline_ms = _env_float("API_DEADLINE", 0, call_name)
+        hedge_flag = os.getenv(f"{call_name.upper()}_ENABLE_HEDGING") if call_name else None
+        hedge_flag = hedge_flag or os.getenv("ENABLE_HEDGING", "false")
+
+        return cls(
+            timeout=timeout,
+            deadline=deadline_ms / 1000 if deadline_ms else None,
+            max_retries=max_retries,
+            backoff_base=_env_float("RETRY_BACKOFF_BASE", 0.5, call_name),
+            backoff_max=_env_float("RETRY_BACKOFF_MAX", 8.0, call_name),
+            hedge=hedge_flag.lower() == "true",
+            hedge_min_samples=int(_env_float("HEDGE_MIN_SAMPLES", 20, call_name)),
+            failure_threshold=int(_env_float("CIRCUIT_FAILURE_THRESHOLD", 5, call_name)),
+            reset_timeout=_env_float("CIRCUIT_RESET_SECONDS", 30.0, call_name)
+        )
+
+    def limited(self, max_retries: int, deadline: float) -> "ResiliencePolicy":
+        """Copy with at most max_retries retries and a total budget of at most deadline seconds"""
+        policy = copy.copy(self)
+        policy.max_retries = min(self.max_retries, max_retries)
+        policy.deadline = min(self.deadline, deadline)
+        policy.timeout = min(self.timeout, policy.deadline)
+        return policy
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry attempt (0-based)"""
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    @property
+    def count(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Return the q-th quantile (0..1) of the window, or None if empty"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(q * (len(samples) - 1))))
+        return samples[index]
+
+
+class CircuitBreaker:
+    """Classic closed → open → half-open breaker counting consecutive failures"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go through right now"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+                self._trial_in_flight = False
+            # Half-open: let a single trial call through
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"⚠ Circuit opened after {self.failures} failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+# Shared pool so deadlines can be enforced without blocking on the SDK call itself
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("RESILIENCE_WORKERS", "32")),
+    thread_name_prefix="resilience"
+)
+
+_registry_lock = threading.Lock()
+_policies: Dict[str, ResiliencePolicy] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+_trackers: Dict[str, LatencyTracker] = {}
+
+
+def get_policy(call_name: str) -> ResiliencePolicy:
+    """Return the (cached) policy for a call name"""
+    with _registry_lock:
+        if call_name not in _policies:
+            _policies[call_name] = ResiliencePolicy.from_env(call_name)
+        return _policies[call_name]
+
+
+def get_breaker(call_name: str) -> CircuitBreaker:
+    policy = get_policy(call_name)
+    with _registry_lock:
+        if call_name not in _breakers:
+            _breakers[call_name] = CircuitBreaker(policy.failure_threshold, policy.reset_timeout)
+        return _breakers[call_name]
+
+
+def get_tracker(call_name: str) -> LatencyTracker:
+    with _registry_lock:
+        if call_name not in _trackers:
+            _trackers[call_name] = LatencyTracker()
+        return _trackers[call_name]
+
+
+def sdk_timeout(call_name: str) -> float:
+    """Per-attempt timeout in seconds, to pass to the SDK client as well"""
+    return get_policy(call_name).timeout
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Decide whether an exception is transient and worth retrying"""
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS_CODES
+
+    return type(exc).__name__ in RETRYABLE_ERROR_NAMES
+
+
+def _single_attempt(call_name: str, fn: Callable[[], Any], policy: ResiliencePolicy, timeout: float) -> Any:
+    """Run one attempt with a deadline, hedging with a duplicate request if enabled"""
+    tracker = get_tracker(call_name)
+    start = time.monotonic()
+    futures: List = [_executor.submit(fn)]
+
+    hedge_after = None
+    if policy.hedge and tracker.count >= policy.hedge_min_samples:
+        hedge_after = tracker.percentile(0.95)
+
+    if hedge_after is not None and hedge_after < timeout:
+        done, _ = wait(futures, timeout=hedge_after)
+        if not done:
+            print(f"[RESILIENCE] {call_name}: p95 ({hedge_after:.2f}s) exceeded, sending hedged request")
+            futures.append(_executor.submit(fn))
+
+    pending = set(futures)
+    last_error: Optional[BaseException] = None
+    while pending:
+        remaining = timeout - (time.monotonic() - start)
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            error = future.exception()
+            if error is None:
+                for other in pending:
+                    other.cancel()
+                tracker.record(time.monotonic() - start)
+                return future.result()
+            last_error = error
+
+    if pending:
+        for future in pending:
+            future.cancel()
+        raise CallTimeoutError(f"{call_name} exceeded its {timeout:.1f}s deadline")
+    raise last_error
+
+
+async def _single_attempt_async(call_name: str, coro_fn: Callable[[], Awaitable[Any]], policy: ResiliencePolicy, timeout: float) -> Any:
+    """asyncio version of _single_attempt: deadline and hedging without extra threads"""
+    tracker = get_tracker(call_name)
+    start = time.monotonic()
+    tasks: List[asyncio.Future] = [asyncio.ensure_future(coro_fn())]
+
+    hedge_after = None
+    if policy.hedge and tracker.count >= policy.hedge_min_samples:
+        hedge_after = tracker.percentile(0.95)
+
+    if hedge_after is not None and hedge_after < timeout:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if not done:
+            print(f"[RESILIENCE] {call_name}: p95 ({hedge_after:.2f}s) exceeded, sending hedged request")
+            tasks.append(asyncio.ensure_future(coro_fn()))
+
+    pending = set(tasks)
+    last_error: Optional[BaseException] = None
+    try:
+        while pending:
+            remaining = timeout - (time.monotonic() - start)
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                error = task.exception()
+                if error is None:
+                    tracker.record(time.monotonic() - start)
+                    return task.result()
+                last_error = error
+    finally:
+        # Losing hedge or timed-out attempts are cancelled, freeing their connections
+        for task in pending:
+            task.cancel()
+
+    if pending:
+        raise CallTimeoutError(f"{call_name} exceeded its {timeout:.1f}s deadline")
+    raise last_error
+
+
+class _Attempt(effects.Effect):
+    """One attempt at a request effect, under a deadline and with hedging (threads or tasks)"""
+
+    def __init__(self, call_name: str, request: effects.Effect, policy: ResiliencePolicy, timeout: float):
+        self.call_name, self.request, self.policy, self.timeout = call_name, request, policy, timeout
+
+    def run(self) -> Any:
+        return _single_attempt(self.call_name, self.request.run, self.policy, self.timeout)
+
+    async def arun(self) -> Any:
+        return await _single_attempt_async(self.call_name, self.request.arun, self.policy, self.timeout)
+
+
+def call_with_resilience_effects(
+    call_name: str,
+    request: effects.Effect,
+    fallback: Optional[Callable[[], Any]] = None,
+    policy: Optional[ResiliencePolicy] = None
+) -> effects.Effects:
+    """
+    Run an outbound call with deadline, jittered retry, optional hedging and a circuit breaker
+
+    A generator of effects (see effects.py); attempts run on threads or as asyncio tasks
+    depending on the driver, and share breakers and latency stats either way.
+
+    Args:
+        call_name: Logical name of the call (e.g. 'planner', 'tts'); keys breaker and stats
+        request: Effect performing the request; performed once per attempt (and hedge)
+        fallback: Optional zero-argument callable used when the circuit is open or all attempts fail
+        policy: Override the environment-derived policy
+
+    Returns:
+        The request's (or fallback's) result
+
+    Raises:
+        CircuitOpenError, CallTimeoutError or the request's last error when no fallback is given
+    """
+    policy = policy or get_policy(call_name)
+    breaker = get_breaker(call_name)
+
+    if not breaker.allow():
+        if fallback:
+            print(f"[RESILIENCE] {call_name}: circuit open, using fallback")
+            return fallback()
+        raise CircuitOpenError(f"{call_name} circuit is open; skipping call")
+
+    start = time.monotonic()
+    last_error: Optional[BaseException] = None
+
+    for attempt in range(policy.max_retries + 1):
+        remaining = policy.deadline - (time.monotonic() - start)
+        if remaining <= 0:
+            break
+        try:
+            result = yield _Attempt(call_name, request, policy, min(policy.timeout, remaining))
+            breaker.record_success()
+            return result
+        except Exception as e:
+            last_error = e
+            if not is_retryable(e):
+                # Caller errors (bad request, auth) say nothing about service health
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            print(f"[RESILIENCE] {call_name}: attempt {attempt + 1} failed ({type(e).__name__}: {e})")
+
+        if attempt == policy.max_retries:
+            break
+        delay = policy.backoff(attempt)
+        if time.monotonic() - start + delay >= policy.deadline or not breaker.allow():
+            break
+        yield effects.Sleep(delay)
+
+    if fallback:
+        print(f"[RESILIENCE] {call_name}: giving up, using fallback")
+        return fallback()
+    if last_error is None:
+        raise CallTimeoutError(f"{call_name} exceeded its {policy.deadline:.1f}s total deadline")
+    raise last_error
+
+
+def get_resilience_stats() -> Dict[str, Dict[str, Any]]:
+    """Snapshot of breaker state and latency percentiles per call name"""
+    with _registry_lock:
+        names = set(_breakers) | set(_trackers)
+    stats = {}
+    for name in sorted(names):
+        tracker = get_tracker(name)
+        breaker = get_breaker(name)
+        p50 = tracker.percentile(0.5)
+        p95 = tracker.percentile(0.95)
+        stats[name] = {
+            "circuit": breaker.state,
+            "consecutive_failures": breaker.failures,
+            "samples": tracker.count,
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None
+        }
+    return stats
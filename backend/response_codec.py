@@ -0,0 +1,195 @@
+"""
+Response Codec - Fast JSON serialization and negotiated response compression
+
+JSON goes through orjson when it is installed (several times faster than the stdlib
+encoder on large findings/drafts payloads) and falls back to the stdlib json module.
+Responses above a size threshold are compressed with brotli or gzip, whichever the
+client accepts and is available; small bodies, streams and audio are sent as they are.
+A strong ETag on a compressed response is made weak: the compressed bytes are not the
+identity bytes, so they can't share a strong validator.
+
+Configuration:
+    JSON_ENCODER          'orjson' (default when installed) or 'json'
+    COMPRESSION           'on' (default) or 'off'
+    COMPRESS_MIN_BYTES    Smallest body worth compressing (default: 1024)
+    GZIP_LEVEL            gzip level 1-9 (default: 6)
+    BROTLI_QUALITY        brotli quality 0-11 (default: 4; higher is much slower)
+
+Install orjson (and optionally brotli) from -guides/requirements.txt.
+"""
+import gzip
+import json
+import os
+from typing import Any, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+# Bodies of these types are worth compressing (audio/images are already compressed)
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def _stdlib_default(value: Any) -> Any:
+    """Fallback for values orjson can't encode natively (e.g. Decimal, sets)"""
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return str(value)
+
+
+def encoder_name() -> str:
+    requested = os.getenv('JSON_ENCODER', 'orjson').lower()
+    return "orjson" if requested == "orjson" and orjson is not None else "json"
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes"""
+    if encoder_name() == "orjson":
+        try:
+            return orjson.dumps(obj, default=_stdlib_default, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits; the stdlib handles them
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=_stdlib_default).encode("utf-8")
+
+
+def dumps_text(obj: Any) -> str:
+    """Serialize to a compact JSON string"""
+    return dumps(obj).decode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    if encoder_name() == "orjson":
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def make_json_provider(base_class):
+    """
+    Subclass a Flask/Quart DefaultJSONProvider so jsonify() and request.get_json() use
+    this codec (compact output even in debug mode; keys keep their insertion order)
+    """
+
+    class FastJSONProvider(base_class):
+        def dumps(self, obj: Any, **kwargs: Any) -> str:
+            if kwargs.keys() - {"separators"}:
+                return super().dumps(obj, **kwargs)
+            return dumps_text(obj)
+
+        def loads(self, s: Any, **kwargs: Any) -> Any:
+            return loads(s)
+
+        def response(self, *args: Any, **kwargs: Any):
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(dumps(obj) + b"\n", mimetype=self.mimetype)
+
+    return FastJSONProvider
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best content coding the client accepts and we support: 'br', 'gzip' or None"""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+def should_compress(body_size: int, mimetype: Optional[str], status_code: int) -> bool:
+    """Size-threshold policy: only sizeable, compressible, successful bodies"""
+    if os.getenv('COMPRESSION', 'on').lower() == 'off':
+        return False
+    if status_code < 200 or status_code in (204, 206, 304):
+        return False
+    if body_size < int(os.getenv('COMPRESS_MIN_BYTES', '1024')):
+        return False
+    return bool(mimetype) and mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=int(os.getenv('BROTLI_QUALITY', '4')))
+    return gzip.compress(body, compresslevel=int(os.getenv('GZIP_LEVEL', '6')))
+
+
+def encode_body(body: bytes, accept_encoding: Optional[str], mimetype: Optional[str],
+                status_code: int = 200) -> Tuple[bytes, Optional[str]]:
+    """Compress a response body if the policy and the client allow; returns (body, coding)"""
+    if not should_compress(len(body), mimetype, status_code):
+        return body, None
+    coding = negotiate_encoding(accept_encoding)
+    if coding is None:
+        return body, None
+    return compress(body, coding), coding
+
+
+def _apply(response, body: bytes, coding: Optional[str]):
+    response.headers.add('Vary', 'Accept-Encoding')
+    if coding:
+        response.set_data(body)
+        response.headers['Content-Encoding'] = coding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+
+
+def install_flask(app):
+    """Use the fast codec for JSON and compress eligible responses on a Flask app"""
+    from flask import request
+    from flask.json.provider import DefaultJSONProvider
+
+    app.json = make_json_provider(DefaultJSONProvider)(app)
+
+    @app.after_request
+    def compress_response(response):
+        if response.is_streamed or response.direct_passthrough or 'Content-Encoding' in response.headers:
+            return response
+        body, coding = encode_body(
+            response.get_data(), request.headers.get('Accept-Encoding'), response.mimetype, response.status_code
+        )
+        _apply(response, body, coding)
+        return response
+
+    print(f"✓ JSON encoder: {encoder_name()}, compression: {'brotli+gzip' if brotli else 'gzip'}")
+
+
+def install_quart(app):
+    """Use the fast codec for JSON and compress eligible responses on a Quart app"""
+    from quart import request
+    from quart.json.provider import DefaultJSONProvider
+    from quart.wrappers.response import DataBody
+
+    app.json = make_json_provider(DefaultJSONProvider)(app)
+
+    @app.after_request
+    async def compress_response(response):
+        # Streaming bodies (SSE, NDJSON) and files are passed through untouched
+        if not isinstance(response.response, DataBody) or 'Content-Encoding' in response.headers:
+            return response
+        body, coding = encode_body(
+            await response.get_data(), request.headers.get('Accept-Encoding'), response.mimetype, response.status_code
+        )
+        _apply(response, body, coding)
+        return response
+
+    print(f"✓ JSON encoder: {encoder_name()}, compression: {'brotli+gzip' if brotli else 'gzip'}")
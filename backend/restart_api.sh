@@ -125,12 +125,12 @@ start_orchestrator() {
     exit 1
 }
 
-# Function to test API
-test_api() {
+# Function to run one workflow through load_test.py
+run_load_test() {
     echo "🧪 Testing API..."
     
-    if [ -f "backend/test_api.py" ]; then
-        python backend/test_api.py
+    if [ -f "backend/load_test.py" ]; then
+        python backend/load_test.py --no-notifications --managers 1 --workflows 1
         if [ $? -eq 0 ]; then
             echo "✅ API tests passed"
         else
@@ -178,8 +178,8 @@ main() {
     # Step 5: Start orchestrator
     start_orchestrator
     
-    # Step 6: Test API
-    test_api
+    # Step 6: Run one workflow through load_test.py
+    run_load_test
     
     echo "=================================="
     echo "🎉 API restart completed successfully!"
@@ -213,7 +213,7 @@ case "${1:-}" in
         ;;
     "test")
         echo "🧪 Running tests only..."
-        test_api
+        run_load_test
         exit 0
         ;;
     *)
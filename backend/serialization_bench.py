@@ -0,0 +1,153 @@
+"""
+Serialization Benchmark - Stdlib JSON vs the fast codec, with and without compression
+
+Builds a workflow state shaped like what /api/execute-research and /api/approve-findings
+return (findings with one row per supplier/product, plus drafted emails), then measures:
+    encode      time to serialize (today's jsonify in debug mode: sorted keys, indent=2;
+                compact stdlib json; orjson)
+    compress    time and size for identity, gzip and brotli (when installed)
+    transfer    encode + compress + time on the wire at --mbps
+
+Usage:
+    python backend/serialization_bench.py --suppliers 400 --mbps 20
+    python backend/serialization_bench.py --json bench_serialization.json
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+import response_codec
+from llm_backend import STANDIN_DEPARTMENTS, STANDIN_PRODUCTS, STANDIN_SUPPLIERS
+
+
+def build_state(suppliers: int) -> Dict[str, Any]:
+    """A completed workflow state with `suppliers` supplier rows and one email each"""
+    rng = random.Random(7)
+    relevant = []
+    for i in range(suppliers):
+        product = rng.choice(STANDIN_PRODUCTS)
+        trade_price = round(rng.uniform(0.5, 40), 2)
+        qty_sold = rng.randint(1, 400)
+        relevant.append({
+            "supplier": rng.choice(STANDIN_SUPPLIERS),
+            "product": product,
+            "department": rng.choice(STANDIN_DEPARTMENTS),
+            "trade_price": trade_price,
+            "rrp": round(trade_price * rng.uniform(1.2, 2.2), 2),
+            "stock_level": rng.randint(0, 120),
+            "qty_sold": qty_sold,
+            "turnover": round(qty_sold * trade_price * 1.6, 2),
+            "profit": round(qty_sold * trade_price * 0.45, 2),
+            "reason": f"{product} sells steadily at branch {i % 12 + 1} but stock is uneven across branches"
+        })
+
+    findings = {
+        "summary": "Combined inventory and sales review for the requested goal.",
+        "key_findings": [f"Finding {i}: {row['product']} from {row['supplier']}" for i, row in enumerate(relevant[:40])],
+        "relevant_suppliers": relevant,
+        "statistics": {
+            "total_products": len(relevant),
+            "unique_suppliers": len({row["supplier"] for row in relevant}),
+            "departments": {row["department"]: 1 for row in relevant}
+        },
+        "recommendations": [f"Review ordering for {row['product']}" for row in relevant[:20]]
+    }
+    drafts = {
+        "emails": [
+            {
+                "supplier_id": f"SUP-{i:03d}",
+                "supplier_name": row["supplier"],
+                "to": f"orders{i}@example.com",
+                "subject": f"Stock review: {row['product']}",
+                "body": (f"Dear {row['supplier']} team,\n\nOur recent sales of {row['product']} "
+                         f"({row['qty_sold']:.0f} units, turnover {row['turnover']:.2f}) suggest we should review "
+                         "order quantities and delivery cadence for the coming quarter.\n\nKind regards,\nBuying team")
+            }
+            for i, row in enumerate(relevant)
+        ],
+        "summary": "One email per supplier with the relevant product context."
+    }
+    return {
+        "workflow_id": "bench", "goal": "Benchmark goal", "status": "completed", "current_step": 4,
+        "plan": [{"step_number": n, "title": f"Step {n}", "description": "…", "status": "pending"} for n in range(1, 5)],
+        "findings": findings, "drafts": drafts, "version": 7
+    }
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> (float, Any):
+    """Best-of-N wall time in seconds, and the last result"""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(suppliers: int, repeat: int, mbps: float) -> Dict[str, Any]:
+    state = build_state(suppliers)
+    encoders = {
+        "json (jsonify, debug)": lambda: json.dumps(state, indent=2, sort_keys=True).encode("utf-8"),
+        "json (compact)": lambda: json.dumps(state, separators=(",", ":")).encode("utf-8"),
+    }
+    if response_codec.orjson is not None:
+        encoders["orjson"] = lambda: response_codec.dumps(state)
+
+    codings: Dict[str, Callable[[bytes], bytes]] = {
+        "identity": lambda body: body,
+        "gzip": lambda body: gzip.compress(body, compresslevel=int(os.getenv('GZIP_LEVEL', '6'))),
+    }
+    if response_codec.brotli is not None:
+        codings["br"] = lambda body: response_codec.compress(body, "br")
+
+    bytes_per_second = mbps * 1_000_000 / 8
+    results: List[Dict[str, Any]] = []
+    for encoder, encode in encoders.items():
+        encode_s, body = timed(encode, repeat)
+        for coding, compress in codings.items():
+            compress_s, wire = timed(lambda: compress(body), repeat)
+            results.append({
+                "encoder": encoder,
+                "coding": coding,
+                "encode_ms": round(encode_s * 1000, 3),
+                "compress_ms": round(compress_s * 1000, 3),
+                "bytes": len(wire),
+                "total_ms": round((encode_s + compress_s + len(wire) / bytes_per_second) * 1000, 2)
+            })
+
+    baseline = next(r for r in results if r["encoder"] == "json (jsonify, debug)" and r["coding"] == "identity")
+    for row in results:
+        row["speedup"] = round(baseline["total_ms"] / row["total_ms"], 2)
+    return {"suppliers": suppliers, "repeat": repeat, "mbps": mbps, "results": results}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark state serialization and compression")
+    parser.add_argument("--suppliers", type=int, default=400, help="Supplier rows in findings/drafts (default: 400)")
+    parser.add_argument("--repeat", type=int, default=20, help="Repetitions per measurement, best is kept (default: 20)")
+    parser.add_argument("--mbps", type=float, default=20.0, help="Link speed for the transfer estimate (default: 20)")
+    parser.add_argument("--json", dest="json_path", help="Also write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    report = run(args.suppliers, args.repeat, args.mbps)
+
+    print(f"State with {report['suppliers']} suppliers, best of {report['repeat']}, {report['mbps']} Mbit/s link")
+    print(f"{'encoder':<24}{'coding':<10}{'encode ms':>11}{'compress ms':>13}{'bytes':>11}{'total ms':>11}{'speedup':>9}")
+    for row in report["results"]:
+        print(f"{row['encoder']:<24}{row['coding']:<10}{row['encode_ms']:>11.2f}{row['compress_ms']:>13.2f}"
+              f"{row['bytes']:>11,}{row['total_ms']:>11.2f}{row['speedup']:>8.1f}x")
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Results written to {args.json_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
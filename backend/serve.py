@@ -0,0 +1,205 @@
+"""
+Production Server - Runs the orchestrator or notification service outside the dev server
+
+`python orchestrator.py` starts werkzeug with the debugger and reloader: one process and
+no worker management. This entry point serves the same Flask apps with gunicorn (Linux,
+macOS) or waitress (Windows, or when gunicorn isn't installed):
+
+    gunicorn  Pre-fork: the app module is imported and the service's warm-up (datasets,
+              model SDK imports) runs once in the master, then everything is frozen out
+              of the garbage collector's reach before the workers fork, so every worker
+              shares those pages copy-on-write. Each worker serves requests on a pool of
+              threads (gthread).
+    waitress  One process with a thread pool. Warm-up runs in the background while it
+              starts listening; /api/health/ready reports 503 until it is done.
+
+On SIGTERM or Ctrl+C the service stops reporting ready (/api/health/ready returns 503),
+lets in-flight requests and background stages (research, drafting, voice generation)
+finish for up to DRAIN_TIMEOUT seconds, then exits. A second signal exits immediately.
+
+Usage:
+    python backend/serve.py orchestrator --workers 2 --threads 8
+    python backend/serve.py notifications --bind 0.0.0.0:5001
+    python backend/serve.py orchestrator --server waitress
+
+Configuration (command-line flags take precedence):
+    WEB_SERVER      'auto' (default: gunicorn when available, else waitress), 'gunicorn'
+                    or 'waitress'
+    WEB_BIND        host:port (default: 0.0.0.0:5000 orchestrator, 0.0.0.0:5001 notifications)
+    WEB_WORKERS     Worker processes for gunicorn (default: 1). Workflows are shared
+                    between workers only through the SQLite store (stage claims are
+                    conditional updates there, so only one worker starts a stage), and
+                    progress streams only see stages run by their own worker, so scale
+                    out with sticky sessions. The notification service keeps its state in
+                    memory and always runs a single worker.
+    WEB_THREADS     Request threads per worker (default: 32). Every open progress stream
+                    (/api/workflows/<id>/events) holds one thread for as long as the client
+                    stays connected, so allow for the streams you expect on top of the
+                    concurrent requests; once threads run out, requests queue.
+    WEB_TIMEOUT     Seconds a gunicorn worker may go silent before it is restarted (default: 120)
+    DRAIN_TIMEOUT   Seconds to wait for in-flight work on shutdown (default: 30)
+
+Install gunicorn and/or waitress from -guides/requirements.txt.
+"""
+import argparse
+import gc
+import importlib
+import os
+import signal
+import sys
+import threading
+import _thread
+from typing import Any, Dict
+
+# Service name -> (module, default port, can run several worker processes)
+SERVICES = {
+    "orchestrator": ("orchestrator", 5000, True),
+    "notifications": ("notification_system", 5001, False),
+}
+
+
+def load_service(name: str, prefork: bool):
+    """Import the service module; before forking workers, also warm what they will share"""
+    module_name, _, _ = SERVICES[name]
+    module = importlib.import_module(module_name)
+    # Here, once: startup tasks include rolling back interrupted stages, which the workers
+    # must not do to each other's running stages (they inherit the started flag instead)
+    module.health.start(background=not prefork)
+
+    if prefork:
+        # Objects created so far live for the whole process. Freezing them keeps collections
+        # from writing to their pages, which would otherwise un-share them after fork.
+        gc.collect()
+        if hasattr(gc, "freeze"):
+            gc.freeze()
+    return module
+
+
+def pick_server(requested: str) -> str:
+    if requested != "auto":
+        return requested
+    if os.name != "nt":
+        try:
+            import gunicorn  # noqa: F401
+            return "gunicorn"
+        except ImportError:
+            pass
+    return "waitress"
+
+
+def serve_gunicorn(module, options: Dict[str, Any]):
+    from gunicorn.app.base import BaseApplication
+
+    health = module.health
+    drain_timeout = options["drain_timeout"]
+
+    def post_worker_init(worker):
+        # Report not-ready as soon as the worker is told to stop, while it still finishes its
+        # requests: progress streams see the drain and close, freeing their threads
+        stop = signal.getsignal(signal.SIGTERM)
+
+        def handle_term(signum, frame):
+            health.begin_drain()
+            if callable(stop):
+                stop(signum, frame)
+
+        signal.signal(signal.SIGTERM, handle_term)
+
+    def worker_exit(server, worker):
+        # The worker has stopped accepting and finished its requests; let stages finish too
+        health.drain(drain_timeout)
+
+    class ServiceApplication(BaseApplication):
+        def load_config(self):
+            settings = {
+                "bind": options["bind"],
+                "workers": options["workers"],
+                "threads": options["threads"],
+                "worker_class": "gthread",
+                "preload_app": True,
+                "timeout": options["timeout"],
+                # Leave room for the drain itself before the master kills the worker
+                "graceful_timeout": drain_timeout + 10,
+                "post_worker_init": post_worker_init,
+                "worker_exit": worker_exit,
+                "accesslog": "-",
+            }
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return module.app
+
+    ServiceApplication().run()
+
+
+def serve_waitress(module, options: Dict[str, Any]):
+    from waitress import create_server
+
+    health = module.health
+    host, _, port = options["bind"].rpartition(":")
+    server = create_server(module.app, host=host or "0.0.0.0", port=int(port), threads=options["threads"])
+
+    def drain_then_stop():
+        health.drain(options["drain_timeout"])
+        _thread.interrupt_main()  # waitress closes its sockets on KeyboardInterrupt
+
+    def handle_signal(signum, frame):
+        if health.draining:
+            raise KeyboardInterrupt
+        print(f"[SERVE] Signal {signum}: draining (send again to exit immediately)")
+        threading.Thread(target=drain_then_stop, daemon=True).start()
+
+    for name in ("SIGTERM", "SIGINT", "SIGBREAK"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), handle_signal)
+
+    print(f"✓ waitress listening on {options['bind']} with {options['threads']} threads")
+    server.run()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve a SourceBot backend service in production")
+    parser.add_argument("service", choices=sorted(SERVICES), help="Service to run")
+    parser.add_argument("--server", choices=("auto", "gunicorn", "waitress"), default=os.getenv('WEB_SERVER', 'auto'))
+    parser.add_argument("--bind", default=os.getenv('WEB_BIND'), help="host:port to listen on")
+    parser.add_argument("--workers", type=int, default=int(os.getenv('WEB_WORKERS', '1')), help="Worker processes (gunicorn)")
+    parser.add_argument("--threads", type=int, default=int(os.getenv('WEB_THREADS', '32')), help="Request threads per worker")
+    parser.add_argument("--timeout", type=int, default=int(os.getenv('WEB_TIMEOUT', '120')), help="Worker timeout in seconds (gunicorn)")
+    parser.add_argument("--drain-timeout", type=float, default=float(os.getenv('DRAIN_TIMEOUT', '30')),
+                        help="Seconds to let in-flight work finish on shutdown")
+    args = parser.parse_args(argv)
+
+    _, default_port, multi_process = SERVICES[args.service]
+    workers = max(1, args.workers)
+    if workers > 1 and not multi_process:
+        print(f"⚠ {args.service} keeps its state in memory; running 1 worker instead of {workers}")
+        workers = 1
+    if workers > 1 and os.getenv('WORKFLOW_STORE', 'sqlite').lower() == 'memory':
+        print("⚠ WORKFLOW_STORE=memory is per process; workers won't see each other's workflows")
+
+    options = {
+        "bind": args.bind or f"0.0.0.0:{default_port}",
+        "workers": workers,
+        "threads": max(1, args.threads),
+        "timeout": args.timeout,
+        "drain_timeout": args.drain_timeout,
+    }
+    server = pick_server(args.server)
+    print(f"Starting {args.service} with {server} on {options['bind']} "
+          f"({options['workers'] if server == 'gunicorn' else 1} worker(s) x {options['threads']} threads)")
+
+    module = load_service(args.service, prefork=server == "gunicorn")
+    try:
+        if server == "gunicorn":
+            serve_gunicorn(module, options)
+        else:
+            serve_waitress(module, options)
+    except ImportError as e:
+        print(f"✗ {e}. Install gunicorn or waitress (see -guides/requirements.txt)")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+Service Health - Liveness and readiness for the orchestrator and notification services
+
+Liveness only says the process answers requests. Readiness says it should receive new
+traffic: every registered check passes (e.g. datasets loaded), warm-up has finished and
+the service is not draining. A load balancer or container orchestrator polls the
+readiness endpoint and stops routing to an instance as soon as it starts shutting down,
+while requests and background stages already in flight are allowed to finish.
+
+Warm-up tasks (parsing datasets, importing model SDKs) run in a background thread once
+the server starts, so the port opens immediately and the first request doesn't pay for
+them; readiness reports each task's status and duration until they are all done.
+Startup tasks (e.g. rolling back stages interrupted by the last shutdown) run inline
+before warm-up. start() runs both once per process: serve.py calls it before forking
+workers, and the apps call it again from a first-request/startup hook, which is a no-op
+by then, so running an app under any server still starts it.
+
+Endpoints added by install_health_routes(app, health, prefix):
+    <prefix>/live     200 while the process is up
+    <prefix>/ready    200 when ready, 503 otherwise (body lists each check)
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class ServiceHealth:
+    """Readiness checks plus a draining flag for one service process"""
+
+    def __init__(self, service: str):
+        self.service = service
+        self.started_at = datetime.utcnow().isoformat()
+        self._checks: Dict[str, Callable[[], bool]] = {}
+        self._draining = threading.Event()
+        self._drain_hooks = []
+        self._created = time.monotonic()
+        self._warmup_tasks: List[Tuple[str, Callable[[], Any]]] = []
+        self._warmup: Dict[str, Dict[str, Any]] = {}
+        self._warm = threading.Event()
+        self._warm_after_ms: Optional[float] = None
+        self._warmup_started = False
+        self._startup_tasks: List[Tuple[str, Callable[[], Any]]] = []
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    def add_check(self, name: str, check: Callable[[], bool]):
+        """check() returns True when this dependency is ready; exceptions count as not ready"""
+        self._checks[name] = check
+
+    def on_drain(self, hook: Callable[[float], bool]):
+        """hook(timeout) waits for in-flight work and returns True if it all finished"""
+        self._drain_hooks.append(hook)
+
+    def add_warmup(self, name: str, task: Callable[[], Any]):
+        """task() runs once at startup, in registration order; failures are reported, not raised"""
+        self._warmup_tasks.append((name, task))
+        self._warmup[name] = {"status": "pending"}
+
+    def add_startup(self, name: str, task: Callable[[], Any]):
+        """task() runs once, inline, before warm-up and before the first request; failures are raised"""
+        self._startup_tasks.append((name, task))
+
+    def start(self, background: bool = True):
+        """Run the startup tasks, then start warm-up; later calls return at once"""
+        if self._started:
+            return
+        with self._start_lock:
+            if self._started:
+                return
+            for name, task in self._startup_tasks:
+                task()
+            # Only once they all succeeded: after a failure the next request tries again
+            self._started = True
+        self.start_warmup(background)
+
+    def start_warmup(self, background: bool = True):
+        """Run the warm-up tasks in a daemon thread (or inline, e.g. before forking workers)"""
+        if self._warmup_started or not self._warmup_tasks:
+            return
+        self._warmup_started = True
+        if background:
+            threading.Thread(target=self._run_warmup, name=f"{self.service}-warmup", daemon=True).start()
+        else:
+            self._run_warmup()
+
+    def _run_warmup(self):
+        for name, task in self._warmup_tasks:
+            self._warmup[name] = {"status": "running"}
+            start = time.perf_counter()
+            try:
+                task()
+                entry = {"status": "done"}
+            except Exception as e:
+                print(f"⚠ {self.service} warm-up '{name}' failed: {e}")
+                entry = {"status": "failed", "error": str(e)}
+            entry["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            self._warmup[name] = entry
+        self._warm_after_ms = round((time.monotonic() - self._created) * 1000, 1)
+        self._warm.set()
+        print(f"✓ {self.service} warm ({self._warm_after_ms:.0f} ms after start): "
+              + ", ".join(f"{name} {entry['status']} in {entry['duration_ms']:.0f} ms" for name, entry in self._warmup.items()))
+
+    @property
+    def warm(self) -> bool:
+        """True when every warm-up task has finished (or there are none)"""
+        return not self._warmup_tasks or self._warm.is_set()
+
+    def wait_warm(self, timeout: Optional[float] = None) -> bool:
+        return self.warm or self._warm.wait(timeout)
+
+    @property
+    def draining(self) -> bool:
+        return self._draining.is_set()
+
+    def begin_drain(self):
+        """Stop reporting ready; new traffic should go elsewhere from now on"""
+        if not self._draining.is_set():
+            self._draining.set()
+            print(f"[HEALTH] {self.service} draining: readiness now reports 503")
+
+    def drain(self, timeout: float) -> bool:
+        """Mark the service as draining and wait up to timeout seconds for in-flight work"""
+        self.begin_drain()
+        deadline = time.monotonic() + timeout
+        drained = True
+        for hook in self._drain_hooks:
+            try:
+                drained = hook(max(0.0, deadline - time.monotonic())) and drained
+            except Exception as e:
+                print(f"[HEALTH] Drain hook failed: {e}")
+                drained = False
+        print(f"{'✓' if drained else '⚠'} {self.service} drained" + ("" if drained else " (timed out)"))
+        return drained
+
+    def readiness(self) -> Dict[str, Any]:
+        checks = {}
+        for name, check in self._checks.items():
+            try:
+                checks[name] = bool(check())
+            except Exception:
+                checks[name] = False
+        report = {
+            "service": self.service,
+            "ready": not self.draining and self.warm and all(checks.values()),
+            "draining": self.draining,
+            "checks": checks,
+            "started_at": self.started_at
+        }
+        if self._warmup_tasks:
+            checks["warmup"] = self.warm
+            report["warmup"] = {"tasks": dict(self._warmup), "warm_after_ms": self._warm_after_ms}
+        return report
+
+
+def install_health_routes(app, health: ServiceHealth, prefix: Optional[str] = '/api/health'):
+    """Add <prefix>/live and <prefix>/ready to a Flask or Quart app"""
+
+    def live():
+        return app.json.response({"service": health.service, "status": "alive"})
+
+    def ready():
+        report = health.readiness()
+        response = app.json.response(report)
+        response.status_code = 200 if report["ready"] else 503
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+    app.add_url_rule(f"{prefix}/live", endpoint="health_live", view_func=live, methods=['GET'])
+    app.add_url_rule(f"{prefix}/ready", endpoint="health_ready", view_func=ready, methods=['GET'])
@@ -0,0 +1,124 @@
+"""
+Single Flight - Concurrent identical requests share one in-flight computation
+
+When several managers ask the same question at once, or a dashboard fires the same
+report request repeatedly, only the first caller (the leader) runs the Claude/ElevenLabs
+calls; callers arriving while it runs (followers) wait for it and get its result. Nothing
+is cached: once the computation finishes, the next request starts a new one.
+
+Keys are tuples whose first element names the kind of work, e.g.
+("plan", normalize_text(goal), dataset_version) or ("report", workflow_id, version).
+Every caller gets its own deep copy of the result, so one can modify what it gets back
+while another is still copying it; an exception raised by the leader is raised in every
+follower too.
+
+SingleFlight is for threads. AsyncSingleFlight runs the computation as its own task, so
+it carries on for the remaining callers when the caller that started it is cancelled.
+"""
+import asyncio
+import copy
+import re
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+import metrics
+
+
+def normalize_text(text: str) -> str:
+    """Case, whitespace and trailing punctuation folded, so trivially different goals match"""
+    return re.sub(r"\s+", " ", text or "").strip().rstrip(".!?").strip().lower()
+
+
+class _Call:
+    """One in-flight computation and its outcome"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _Flights:
+    """Per-kind leader/follower counts shared by the thread and asyncio versions"""
+
+    def __init__(self, service: str):
+        self.service = service
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def _record(self, key: Hashable, role: str):
+        kind = key[0] if isinstance(key, tuple) and key else str(key)
+        counts = self._counts.setdefault(kind, {"leader": 0, "follower": 0})
+        counts[role] += 1
+        metrics.single_flight.inc(service=self.service, kind=kind, role=role)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "kinds": {kind: dict(counts) for kind, counts in self._counts.items()}
+            }
+
+
+class SingleFlight(_Flights):
+    """Thread version: followers block until the leader's call returns"""
+
+    def __init__(self, service: str):
+        super().__init__(service)
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn() unless an identical call is in flight
+
+        Returns:
+            (result, shared): shared is True when the result came from another caller's call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._record(key, "leader" if leader else "follower")
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result), True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return copy.deepcopy(call.result), False
+
+
+class AsyncSingleFlight(_Flights):
+    """asyncio version: the computation is a task every caller awaits through a shield"""
+
+    def __init__(self, service: str):
+        super().__init__(service)
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Await fn() unless an identical call is in flight; returns (result, shared)"""
+        with self._lock:
+            task = self._calls.get(key)
+            leader = task is None
+            if leader:
+                task = self._calls[key] = asyncio.ensure_future(fn())
+                task.add_done_callback(lambda _: self._finished(key))
+            self._record(key, "leader" if leader else "follower")
+
+        result = await asyncio.shield(task)
+        return copy.deepcopy(result), not leader
+
+    def _finished(self, key: Hashable):
+        with self._lock:
+            self._calls.pop(key, None)
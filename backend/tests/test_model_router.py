@@ -0,0 +1,65 @@
+"""
+Model routing against the local fake server: falling back to the fast model under timeouts
+"""
+import time
+
+import pytest
+
+import effects
+import model_router
+import resilience
+from fake_llm_server import FakeLLMServer
+from llm_backend import RemoteBackend
+from model_router import Route, routed_call_effects
+from resilience import ResiliencePolicy
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    with FakeLLMServer() as server:
+        monkeypatch.setenv("ANTHROPIC_BASE_URL", server.url)
+        yield server
+
+
+@pytest.fixture
+def backend(fake):
+    backend = RemoteBackend()
+    # As at service start: importing the SDK inside the first, timed, call would skew it
+    backend.warm_up()
+    return backend
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    name = "router_test"
+    monkeypatch.setitem(model_router._routes, name, Route(name, "claude-strong", "claude-fast"))
+    # The full budget would take minutes to use up
+    monkeypatch.setitem(resilience._policies, name, ResiliencePolicy(timeout=60, max_retries=2))
+    return name
+
+
+def request(backend, agent):
+    return lambda model: effects.Either(
+        backend.complete, backend.acomplete, agent, model, "Plan this", max_tokens=100, api_key="fake-key"
+    )
+
+
+def test_timeout_falls_back_within_the_primary_budget(fake, backend, agent, monkeypatch):
+    monkeypatch.setenv("ROUTER_PRIMARY_DEADLINE", "300")
+    fake.script("slow:3", "ok")
+
+    start = time.monotonic()
+    assert effects.run(routed_call_effects(agent, request(backend, agent))) == fake.text
+    assert time.monotonic() - start < 2
+    assert fake.requests == 2
+    assert model_router.get_route_stats_entry(agent, "claude-fast").fallback_calls == 1
+
+
+def test_last_model_keeps_the_full_policy(fake, backend, agent, monkeypatch):
+    # Both models overloaded once: the primary gives up at once, the fallback retries
+    monkeypatch.setenv("ROUTER_PRIMARY_DEADLINE", "300")
+    monkeypatch.setitem(resilience._policies, agent, ResiliencePolicy(timeout=60, max_retries=2, backoff_base=0.01))
+    fake.script("overloaded", "overloaded", "ok")
+
+    assert effects.run(routed_call_effects(agent, request(backend, agent))) == fake.text
+    assert fake.requests == 3
@@ -0,0 +1,192 @@
+"""
+Resilience layer against the local fake server: deadlines, jittered retry, hedging and
+the circuit breaker's closed → open → half-open transitions, on both effect drivers.
+"""
+import asyncio
+import itertools
+import time
+
+import pytest
+
+import effects
+import metrics
+import resilience
+from fake_llm_server import FakeLLMServer
+from llm_backend import RemoteBackend
+from resilience import (
+    CallTimeoutError,
+    CircuitBreaker,
+    CircuitOpenError,
+    ResiliencePolicy,
+    call_with_resilience_effects,
+    get_breaker,
+    get_tracker,
+)
+
+_names = itertools.count()
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    with FakeLLMServer() as server:
+        monkeypatch.setenv("ANTHROPIC_BASE_URL", server.url)
+        yield server
+
+
+@pytest.fixture
+def backend(fake):
+    # A fresh backend, so its SDK client is created against this test's fake
+    return RemoteBackend()
+
+
+@pytest.fixture(params=["threads", "asyncio"])
+def drive(request):
+    if request.param == "threads":
+        return effects.run
+    return lambda gen: asyncio.run(effects.arun(gen))
+
+
+def call_name() -> str:
+    """Breakers and latency stats are per call name; each test gets its own"""
+    return f"test_{next(_names)}"
+
+
+def message(backend):
+    return effects.Either(
+        backend.complete, backend.acomplete, "planner", "claude-fake", "Plan this", max_tokens=100,
+        api_key="fake-key", timeout=10
+    )
+
+
+def test_attempt_deadline(fake, backend, drive):
+    fake.script("slow:2")
+    policy = ResiliencePolicy(timeout=0.3, max_retries=0)
+
+    start = time.monotonic()
+    with pytest.raises(CallTimeoutError):
+        drive(call_with_resilience_effects(call_name(), message(backend), policy=policy))
+    assert time.monotonic() - start < 1.5
+
+
+def test_total_deadline_stops_retries(fake, backend, drive):
+    fake.default = "slow:2"
+    policy = ResiliencePolicy(timeout=0.3, deadline=0.5, max_retries=5, backoff_base=0.01)
+
+    start = time.monotonic()
+    with pytest.raises(CallTimeoutError):
+        drive(call_with_resilience_effects(call_name(), message(backend), policy=policy))
+    assert time.monotonic() - start < 1.5
+    assert fake.requests <= 2
+
+
+def test_retries_retryable_errors(fake, backend, drive):
+    fake.script("overloaded", "error")
+    policy = ResiliencePolicy(timeout=5, max_retries=2, backoff_base=0.01)
+
+    assert drive(call_with_resilience_effects(call_name(), message(backend), policy=policy)) == fake.text
+    assert fake.requests == 3
+
+
+def test_caller_errors_are_not_retried(fake, backend, drive):
+    fake.script("bad_request")
+    name = call_name()
+    policy = ResiliencePolicy(timeout=5, max_retries=2, backoff_base=0.01)
+
+    with pytest.raises(Exception) as raised:
+        drive(call_with_resilience_effects(name, message(backend), policy=policy))
+    assert getattr(raised.value, "status_code", None) == 400
+    assert fake.requests == 1
+    assert get_breaker(name).state == "closed"
+
+
+def test_backoff_is_full_jitter():
+    policy = ResiliencePolicy(backoff_base=0.5, backoff_max=4.0)
+    for attempt in range(5):
+        ceiling = min(4.0, 0.5 * 2 ** attempt)
+        delays = [policy.backoff(attempt) for _ in range(50)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+        assert len(set(delays)) > 1
+
+
+def test_hedged_request_wins_over_slow_one(fake, backend, drive):
+    name = call_name()
+    for _ in range(5):
+        get_tracker(name).record(0.05)
+    fake.script("slow:3", "ok")
+    policy = ResiliencePolicy(timeout=5, max_retries=0, hedge=True, hedge_min_samples=5)
+
+    start = time.monotonic()
+    assert drive(call_with_resilience_effects(name, message(backend), policy=policy)) == fake.text
+    assert time.monotonic() - start < 2
+    assert fake.requests == 2
+
+
+def test_no_hedge_before_enough_samples(fake, backend, drive):
+    fake.script("slow:0.3")
+    policy = ResiliencePolicy(timeout=5, max_retries=0, hedge=True, hedge_min_samples=5)
+
+    assert drive(call_with_resilience_effects(call_name(), message(backend), policy=policy)) == fake.text
+    assert fake.requests == 1
+
+
+def test_breaker_transitions():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.2)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    time.sleep(0.25)
+    assert breaker.allow() and breaker.state == "half_open"
+    # One trial call at a time
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    time.sleep(0.25)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_breaker_opens_and_recovers_through_the_fake(fake, backend, drive, monkeypatch):
+    name = call_name()
+    monkeypatch.setenv(f"{name.upper()}_CIRCUIT_FAILURE_THRESHOLD", "2")
+    monkeypatch.setenv(f"{name.upper()}_CIRCUIT_RESET_SECONDS", "0.3")
+    policy = ResiliencePolicy(timeout=5, max_retries=0)
+    fake.default = "overloaded"
+
+    for _ in range(2):
+        with pytest.raises(Exception):
+            drive(call_with_resilience_effects(name, message(backend), policy=policy))
+    assert get_breaker(name).state == "open"
+
+    # Open: rejected without reaching the server, or answered by the fallback
+    with pytest.raises(CircuitOpenError):
+        drive(call_with_resilience_effects(name, message(backend), policy=policy))
+    assert drive(call_with_resilience_effects(name, message(backend), fallback=lambda: "canned", policy=policy)) == "canned"
+    assert fake.requests == 2
+
+    # Half-open after the reset timeout: one trial call, which closes the circuit again
+    time.sleep(0.35)
+    fake.default = "ok"
+    assert drive(call_with_resilience_effects(name, message(backend), policy=policy)) == fake.text
+    assert get_breaker(name).state == "closed"
+    assert fake.requests == 3
+
+
+def test_planner_outage_is_degraded(fake, monkeypatch):
+    import llm_backend
+    import planner
+
+    fake.default = "overloaded"
+    monkeypatch.setattr(llm_backend, "_backend", RemoteBackend())
+    monkeypatch.setitem(resilience._policies, "planner", ResiliencePolicy(timeout=5, max_retries=0))
+    before = metrics.agent_fallbacks._values.get(("planner",), 0)
+
+    result = planner.create_plan("Find cable suppliers", "fake-key")
+    assert result["success"] and result["degraded"]
+    assert result["plan"][0]["title"] == planner.FALLBACK_PLAN[0]["title"]
+    assert metrics.agent_fallbacks._values.get(("planner",), 0) == before + 1
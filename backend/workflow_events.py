@@ -0,0 +1,190 @@
+"""
+Workflow Events - Per-workflow event log feeding the server-sent events stream
+
+Stage transitions (workflow state changes) and job progress are published here as they
+happen. Each workflow keeps a short history of numbered events so a client that
+reconnects with Last-Event-ID receives only what it missed; clients too far behind are
+resynchronised with a full state snapshot instead.
+
+Event IDs are "<epoch>-<seq>". Sequence numbers start at 1 in every process, so the epoch,
+drawn at random when the process (or forked worker) starts, tells this process's events
+from those of a previous run or another worker: an ID with another epoch means resync.
+
+Configuration:
+    EVENT_HISTORY           Events kept per workflow for resuming (default: 256)
+    EVENT_WORKFLOWS         Workflows whose logs are kept; the least recently active
+                            logs without live subscribers are dropped (default: 1000)
+    SSE_HEARTBEAT_SECONDS   Keep-alive comment interval on idle streams (default: 15)
+"""
+import os
+import secrets
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from response_codec import dumps_text
+
+# Sequence number of a Last-Event-ID from another epoch: older than any event, so the
+# subscriber is resynchronised
+RESYNC = -1
+
+
+def _new_epoch() -> str:
+    return secrets.token_hex(4)
+
+
+_epoch = _new_epoch()
+
+
+def _renew_epoch():
+    global _epoch
+    _epoch = _new_epoch()
+
+
+if hasattr(os, "register_at_fork"):
+    # Workers forked from a preloading server number their events independently
+    os.register_at_fork(after_in_child=_renew_epoch)
+
+
+def format_event_id(seq: int) -> str:
+    """SSE id for one of this process's sequence numbers"""
+    return f"{_epoch}-{seq}"
+
+
+class WorkflowEvent:
+    """One numbered event in a stream (a workflow's, or the notifications), encoded once for every subscriber"""
+
+    __slots__ = ("id", "event", "encoded")
+
+    def __init__(self, seq: int, event: str, data: Dict[str, Any]):
+        self.id = seq  # Sequence number; sent as format_event_id(seq)
+        self.event = event
+        self.encoded = encode_sse(event, data, format_event_id(seq))
+
+    def to_sse(self) -> str:
+        return self.encoded
+
+
+class _WorkflowLog:
+    def __init__(self, history: int):
+        self.next_id = 1
+        self.events: deque = deque(maxlen=history)
+        self.subscribers: List[Callable[[WorkflowEvent], None]] = []
+
+
+class WorkflowEventBus:
+    """Thread-safe publish/subscribe with bounded replay, keyed by workflow ID"""
+
+    def __init__(self, history: Optional[int] = None, max_workflows: Optional[int] = None):
+        self.history = history or int(os.getenv('EVENT_HISTORY', '256'))
+        self.max_workflows = max_workflows or int(os.getenv('EVENT_WORKFLOWS', '1000'))
+        self._logs: "OrderedDict[str, _WorkflowLog]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _log(self, workflow_id: str) -> _WorkflowLog:
+        """Log for a workflow, marked most recently active (caller holds the lock)"""
+        if workflow_id in self._logs:
+            self._logs.move_to_end(workflow_id)
+            return self._logs[workflow_id]
+
+        self._logs[workflow_id] = _WorkflowLog(self.history)
+        excess = len(self._logs) - self.max_workflows
+        if excess > 0:
+            idle = [key for key, log in self._logs.items() if not log.subscribers][:excess]
+            for key in idle:
+                del self._logs[key]
+        return self._logs[workflow_id]
+
+    def publish(self, workflow_id: Optional[str], event: str, data: Dict[str, Any]) -> Optional[WorkflowEvent]:
+        """Append an event to the workflow's log and hand it to live subscribers"""
+        if not workflow_id:
+            return None
+        # Numbering and delivery under one lock: publishers on different threads (store
+        # changes, job progress) can't hand a subscriber event n+1 before event n
+        with self._lock:
+            log = self._log(workflow_id)
+            item = WorkflowEvent(log.next_id, event, data)
+            log.next_id += 1
+            log.events.append(item)
+            for deliver in log.subscribers:
+                try:
+                    deliver(item)
+                except Exception as e:
+                    print(f"[EVENTS] Dropping event {item.id} for a subscriber: {e}")
+        return item
+
+    def subscribe(
+        self,
+        workflow_id: str,
+        deliver: Callable[[WorkflowEvent], None],
+        last_event_id: Optional[int] = None
+    ) -> Tuple[Optional[List[WorkflowEvent]], int, Callable[[], None]]:
+        """
+        Register a subscriber and collect what it missed, atomically
+
+        Args:
+            workflow_id: Workflow to follow
+            deliver: Called (from the publishing thread, under the bus's lock) with each new
+                event, in ID order; must not block or publish
+            last_event_id: Sequence number of the last event the client saw (see parse_last_event_id)
+
+        Returns:
+            (missed events or None when the client must resync from a snapshot,
+             ID of the latest event at subscription time, unsubscribe)
+        """
+        with self._lock:
+            log = self._log(workflow_id)
+            log.subscribers.append(deliver)
+            current_id = log.next_id - 1
+            oldest = log.events[0].id if log.events else log.next_id
+            if last_event_id is None or not oldest - 1 <= last_event_id <= current_id:
+                missed = None
+            else:
+                missed = [item for item in log.events if item.id > last_event_id]
+
+        def unsubscribe():
+            with self._lock:
+                if deliver in log.subscribers:
+                    log.subscribers.remove(deliver)
+
+        return missed, current_id, unsubscribe
+
+    def subscriber_count(self) -> int:
+        """Live subscribers across every workflow (open event streams)"""
+        with self._lock:
+            return sum(len(log.subscribers) for log in self._logs.values())
+
+    def discard(self, workflow_id: str):
+        """Drop a deleted workflow's log (after publishing its final event)"""
+        with self._lock:
+            log = self._logs.pop(workflow_id, None)
+        if log:
+            log.subscribers.clear()
+
+
+def encode_sse(event: Optional[str], data: Dict[str, Any], event_id: Optional[str] = None) -> str:
+    """Encode one message in text/event-stream format (event None: a plain "message")"""
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {dumps_text(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    """
+    Sequence number in a Last-Event-ID header (or ?last_event_id=); None when absent or
+    malformed, RESYNC when the ID is from another epoch (or has none)
+    """
+    if value in (None, ""):
+        return None
+    epoch, _, seq = value.rpartition("-")
+    try:
+        seq = int(seq)
+    except ValueError:
+        return None
+    return seq if epoch == _epoch else RESYNC
+
+
+def heartbeat_seconds() -> float:
+    return float(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
@@ -0,0 +1,530 @@
+"""
+Workflow Stages - Planning, research, approval and drafting, shared by both orchestrators
+
+Each stage is written once, as a generator of effects (see effects.py): orchestrator.py
+drives it on threads and async_orchestrator.py on its event loop. What is left in each
+orchestrator is its routes and the glue that runs a claimed stage as a background job
+(JobManager or AsyncJobManager) or inline.
+
+Starting a stage takes two parts:
+    claim    Moves the workflow out of the status the stage starts from with a conditional
+             update (store.transition), so two requests, in any process, can't both start
+             the stage; returns a StageRun, or the answer refusing the request
+    runner   Does the agent work and saves the stage's checkpoint (see checkpoints.py)
+             when it succeeds; returns (payload, http_status)
+
+Store calls block (SQLite). Inside the generators each one is a Blocking effect, so on the
+event loop it runs in a worker thread and no store lock is ever held across a yield. The
+plain methods (claims, state reads, the store helpers) block too: the async orchestrator
+calls them with asyncio.to_thread.
+"""
+import asyncio
+from datetime import datetime
+from typing import Any, Callable, Dict, NamedTuple, Tuple
+
+import effects
+import metrics
+from admission import AdmissionRejected
+from checkpoints import RESUMABLE, STAGE_STATUS, first_incomplete, is_current, record, stage_inputs
+from communicator import draft_emails_effects, merge_drafts
+from jobs import JobCancelled
+from plan_executor import gate_steps, normalize_plan, phase_steps, rejected_plan
+from planner import create_plan_effects
+from reporter import generate_status_report_effects, generate_voice_report_effects
+from researcher import analyze_suppliers_effects, dataset_version, load_suppliers_cached, merge_findings
+from single_flight import normalize_text
+from workflow_store import dataset_reference
+
+# (JSON payload, HTTP status) for the orchestrator to send
+Answer = Tuple[Dict[str, Any], int]
+
+
+class StageRun(NamedTuple):
+    """A claimed stage, ready to run in the background (or inline with ?wait=true)"""
+    kind: str                                    # Job kind: 'research', 'drafting' or 'resume'
+    runner: Callable[[Any], effects.Effects]     # runner(job or None) -> effects returning an Answer
+    rollback: Dict[str, Any]                     # Fields restored if the stage is not admitted, is cancelled or raises
+    priority: str                                # Admission priority class
+
+
+def public_state(state):
+    """State fields as returned by the API: the dataset reference is summarised, not sent"""
+    if state.get("suppliers_data"):
+        state["suppliers_count"] = len(state["suppliers_data"])
+    state.pop("suppliers_data", None)
+    return state
+
+
+def report_progress(job, progress, message):
+    """Progress update + cancellation checkpoint (no-op when running inline)"""
+    if job:
+        job.update_progress(progress, message)
+
+
+def commit(job):
+    """Final cancellation checkpoint, before a stage stores its outputs (no-op when running inline)"""
+    if job:
+        job.commit()
+
+
+class WorkflowStages:
+    """
+    The workflow's stages over one orchestrator's store, admission and single-flight
+
+    Args:
+        service: Metrics label ('orchestrator', 'orchestrator-async')
+        store: Workflow store (see workflow_store.py)
+        admission: AdmissionController or AsyncAdmissionController
+        single_flight: SingleFlight or AsyncSingleFlight
+        execute_steps: plan_executor.execute_steps or execute_steps_async
+        drive: effects.run or effects.arun; runs the callbacks handed to single_flight
+            and execute_steps in the orchestrator's flavour
+        inventory_file, sales_file: Dataset the research runs on
+        api_key, elevenlabs_api_key: Agent credentials
+    """
+
+    def __init__(self, service, store, admission, single_flight, execute_steps, drive,
+                 inventory_file, sales_file, api_key, elevenlabs_api_key):
+        self.service = service
+        self.store = store
+        self.admission = admission
+        self.single_flight = single_flight
+        self.execute_steps = execute_steps
+        self.drive = drive
+        self.inventory_file = inventory_file
+        self.sales_file = sales_file
+        self.api_key = api_key
+        self.elevenlabs_api_key = elevenlabs_api_key
+
+    def dataset(self):
+        return dataset_version(self.inventory_file, self.sales_file)
+
+    # Agent calls; identical concurrent requests share one call
+
+    def plan_goal(self, goal, admit=True):
+        """
+        Planner result for the goal; managers submitting the same goal at once share one call
+
+        admit=False when the caller already holds an admission slot (a resumed workflow).
+        """
+        def plan():
+            if not admit:
+                return (yield from create_plan_effects(goal, self.api_key))
+            permit = yield effects.Call(self.admission.acquire, "research")
+            with permit:
+                return (yield from create_plan_effects(goal, self.api_key))
+
+        key = ("plan", normalize_text(goal), self.dataset())
+        result, _ = yield effects.Call(self.single_flight.do, key, lambda: self.drive(plan()))
+        return result
+
+    def status_report(self, workflow_id, state):
+        """Text report for this version of the workflow; concurrent requests share one call"""
+        def report():
+            permit = yield effects.Call(self.admission.acquire, "report")
+            with permit:
+                return (yield from generate_status_report_effects(state, self.api_key))
+
+        key = ("report", workflow_id, state["version"])
+        result, _ = yield effects.Call(self.single_flight.do, key, lambda: self.drive(report()))
+        return result
+
+    def voice_report(self, workflow_id, state):
+        """(report result, voice result or None) for this version of the workflow, shared like status_report"""
+        def voice():
+            report_result = yield from self.status_report(workflow_id, state)
+            if not report_result.get('success'):
+                return report_result, None
+            # Speech synthesis uses no model tokens, only a slot
+            permit = yield effects.Call(self.admission.acquire, "report", 0)
+            with permit:
+                return report_result, (yield from generate_voice_report_effects(report_result["report"], self.elevenlabs_api_key))
+
+        key = ("voice", workflow_id, state["version"])
+        result, _ = yield effects.Call(self.single_flight.do, key, lambda: self.drive(voice()))
+        return result
+
+    # State
+
+    def save_checkpoint(self, workflow_id, stage, expect_status=None, **fields):
+        """
+        Store a finished stage's output fields together with a checkpoint of the inputs it ran on
+
+        With expect_status the fields are only stored while the workflow is still in that
+        status (see store.transition); returns None when it no longer is, or the workflow
+        was deleted.
+        """
+        if not self.store.exists(workflow_id):
+            return None
+        with self.store.lock(workflow_id):
+            state = {**self.store.get(workflow_id, blobs=("findings",) if stage in ("approval", "drafting") else ()), **fields}
+            digest = stage_inputs(stage, state, self.dataset())
+            fields["checkpoints"] = record(state.get("checkpoints"), stage, digest)
+            if expect_status is not None:
+                return self.store.transition(workflow_id, expect_status, **fields)
+            return self.store.update(workflow_id, **fields)
+
+    def update_plan_step(self, workflow_id, step_number, fields):
+        """Write one plan step's status and timings back into the workflow's plan"""
+        if not self.store.exists(workflow_id):
+            return
+        with self.store.lock(workflow_id):
+            plan = [dict(step) for step in self.store.get(workflow_id, blobs=())["plan"]]
+            for step in plan:
+                if step.get("step_number") == step_number:
+                    step.update(fields)
+            self.store.update(workflow_id, plan=plan)
+
+    def executable_plan(self, workflow_id):
+        """The workflow's plan with agents and dependencies (older plans are normalized once)"""
+        plan = self.store.get(workflow_id, blobs=())["plan"]
+        if not all(isinstance(step, dict) and "agent" in step and "depends_on" in step for step in plan):
+            plan = normalize_plan(plan)
+            self.store.update(workflow_id, plan=plan)
+        return [dict(step) for step in plan]
+
+    def snapshot_answer(self, workflow_id, message):
+        return {"message": message, "workflow_id": workflow_id, "state": self.store.snapshot(workflow_id)}, 200
+
+    def state_payload(self, workflow_id, since):
+        """
+        (payload, kind) for /api/state: the fields changed after version `since` when it is
+        given and still answerable ("delta"), else the whole state ("full")
+        """
+        delta = self.store.changes(workflow_id, since) if since is not None and since >= 0 else None
+        if delta and delta["version"] >= since:
+            return {
+                "workflow_id": workflow_id,
+                "version": delta["version"],
+                "since": since,
+                "changes": public_state(delta["changes"])
+            }, "delta"
+        return public_state(self.store.snapshot(workflow_id)), "full"
+
+    def report_state(self, workflow_id):
+        """(state with findings and drafts, None), or (None, answer) when there is nothing to report on"""
+        state = self.store.snapshot(workflow_id, blobs=("findings", "drafts"))
+        if not state or state["status"] == "idle":
+            return None, ({"error": "No active workflow"}, 400)
+        return state, None
+
+    # Planning
+
+    def submit_goal(self, goal):
+        """Create a workflow for the goal and plan it; returns (payload, http_status)"""
+        # New workflow for this goal (other managers' workflows are untouched)
+        workflow_id = (yield effects.Blocking(self.store.create, goal))["workflow_id"]
+        yield effects.Blocking(self.store.update, workflow_id, status="planning")
+
+        try:
+            plan_result = yield from self.plan_goal(goal)
+        except AdmissionRejected:
+            yield effects.Blocking(self.store.delete, workflow_id)
+            raise
+
+        if not plan_result.get('success'):
+            yield effects.Blocking(self.store.update, workflow_id, status="error")
+            error_details = plan_result.get('error', 'Unknown error')
+            print(f"[ERROR] Planner failed: {error_details}")
+            metrics.errors.inc(service=self.service, stage="planning")
+            return {
+                "error": "Failed to create plan",
+                "details": error_details,
+                "workflow_id": workflow_id
+            }, 500
+
+        yield effects.Blocking(self.save_checkpoint, workflow_id, "planning", plan=plan_result["plan"],
+                               degraded=plan_result.get("degraded", False), status="planned")
+        message = ("Goal submitted; the planner is unavailable, so the default plan was used"
+                   if plan_result.get("degraded") else "Goal submitted and plan created")
+        return (yield effects.Blocking(self.snapshot_answer, workflow_id, message))
+
+    # Plan execution
+
+    def run_plan_step(self, workflow_id, goal, step, outputs, context):
+        """
+        Carry out one plan step with its agent; returns a result dict with "success"
+
+        context holds what the phase shares between steps: suppliers_data, findings (approved),
+        focus (several research steps: each researches its own part of the goal) and
+        communicators (drafting steps, which split the relevant suppliers between them).
+        """
+        agent = step.get("agent")
+
+        if agent == "researcher":
+            step_goal = f"{goal}\nFocus for this step: {step['title']}: {step['description']}" if context["focus"] else goal
+            # Workflows researching the same goal on the same data at once share the analysis
+            key = ("research", normalize_text(step_goal), self.dataset())
+            result, _ = yield effects.Call(self.single_flight.do, key, lambda: self.drive(
+                analyze_suppliers_effects(step_goal, context["suppliers_data"], self.api_key)
+            ))
+            return result
+
+        if agent == "communicator":
+            findings = context["findings"]
+            shard, shards = context["communicators"].index(step["step_number"]), len(context["communicators"])
+            relevant_suppliers = findings.get("relevant_suppliers", [])[shard::shards]
+            return (yield from draft_emails_effects(goal, findings, relevant_suppliers, self.api_key))
+
+        if agent == "reporter":
+            state = yield effects.Blocking(self.store.snapshot, workflow_id, blobs=("findings", "drafts"))
+            drafted = [result["drafts"] for result in outputs.values() if "drafts" in result]
+            if drafted:
+                state["drafts"] = merge_drafts(drafted)
+            report_result = yield from generate_status_report_effects(state, self.api_key)
+            if report_result.get('success'):
+                yield effects.Blocking(self.update_plan_step, workflow_id, step["step_number"], {"report": report_result["report"]})
+            return report_result
+
+        # 'none': bookkeeping covered by the steps it depends on
+        return {"success": True}
+
+    def run_plan_phase(self, workflow_id, goal, plan, phase, context, job):
+        """Run one phase of the plan as a DAG, reporting progress between 0.3 and 0.9"""
+        return (yield effects.Call(
+            self.execute_steps,
+            plan,
+            phase_steps(plan, phase),
+            lambda step, outputs: self.drive(self.run_plan_step(workflow_id, goal, step, outputs, context)),
+            on_step=lambda number, fields: self.drive(effects.perform(
+                effects.Blocking(self.update_plan_step, workflow_id, number, fields)
+            )),
+            on_progress=lambda done, total, step: report_progress(
+                job, 0.3 + 0.6 * done / total, f"Step {step['step_number']} done: {step['title']}"
+            ),
+            phase=f"{phase} {workflow_id[:8]}"
+        ))
+
+    # Research
+
+    def claim_research(self, workflow_id):
+        """(StageRun, None) moving a planned workflow to researching, or (None, answer)"""
+        state = self.store.transition(workflow_id, "planned", status="researching", current_step=1)
+        if state is None:
+            return None, ({"error": "Must complete planning first"}, 400)
+        goal = state["goal"]
+        return StageRun(
+            "research",
+            lambda job: self.run_research_stage(workflow_id, goal, job),
+            rollback={"status": "planned", "current_step": 0},
+            priority="research"
+        ), None
+
+    def run_research_stage(self, workflow_id, goal, job=None):
+        """Load data and run the plan's research steps; returns (payload, http_status)"""
+        report_progress(job, 0.1, "Loading inventory and sales data")
+
+        # CSV parsing is blocking; kept off the event loop
+        data_result = yield effects.Blocking(load_suppliers_cached, self.inventory_file, self.sales_file)
+
+        if not data_result.get('success'):
+            yield effects.Blocking(self.store.update, workflow_id, status="error")
+            return {
+                "error": "Failed to load data",
+                "details": data_result.get('error')
+            }, 500
+
+        suppliers_data = data_result["combined_data"]
+        # Keep only a reference to the dataset on the workflow, not the rows
+        yield effects.Blocking(
+            self.store.update, workflow_id,
+            suppliers_data=dataset_reference(self.inventory_file, self.sales_file, suppliers_data)
+        )
+        report_progress(job, 0.3, "Analyzing suppliers")
+
+        # Research steps (Researcher Agent) run concurrently where the plan allows
+        plan = yield effects.Blocking(self.executable_plan, workflow_id)
+        researchers = [n for n in phase_steps(plan, "research") if plan[n - 1]["agent"] == "researcher"]
+        context = {"suppliers_data": suppliers_data, "focus": len(researchers) > 1}
+        summary = yield from self.run_plan_phase(workflow_id, goal, plan, "research", context, job)
+
+        if not summary["success"]:
+            yield effects.Blocking(self.store.update, workflow_id, status="error")
+            return {
+                "error": "Failed to analyze suppliers",
+                "details": summary["error"]
+            }, 500
+
+        report_progress(job, 0.9, "Saving findings")
+        commit(job)
+        for number in gate_steps(plan):
+            yield effects.Blocking(self.update_plan_step, workflow_id, number, {"status": "awaiting_approval"})
+        yield effects.Blocking(
+            self.save_checkpoint,
+            workflow_id,
+            "research",
+            findings=merge_findings([summary["outputs"][n]["findings"] for n in researchers]),
+            status="awaiting_approval",
+            current_step=2
+        )
+        return (yield effects.Blocking(self.snapshot_answer, workflow_id, "Research completed"))
+
+    # Approval and drafting
+
+    def claim_approval(self, workflow_id, approved):
+        """
+        Record the manager's decision on the findings: (StageRun, None) for the drafting
+        stage on approval, or (None, answer) on rejection or when nothing awaits approval
+        """
+        state = self.store.get(workflow_id, blobs=("findings",))
+        if not state or state["status"] != "awaiting_approval":
+            return None, ({"error": "No findings awaiting approval"}, 400)
+
+        if not approved:
+            if self.store.transition(workflow_id, "awaiting_approval", plan=rejected_plan(state["plan"]),
+                                     status="rejected") is None:
+                return None, ({"error": "No findings awaiting approval"}, 400)
+            return None, self.snapshot_answer(workflow_id, "Findings rejected")
+
+        if self.save_checkpoint(workflow_id, "approval", expect_status="awaiting_approval",
+                                status="drafting", current_step=3) is None:
+            return None, ({"error": "No findings awaiting approval"}, 400)
+        goal, findings = state["goal"], state["findings"]
+        return StageRun(
+            "drafting",
+            lambda job: self.run_drafting_stage(workflow_id, goal, findings, job),
+            rollback={"status": "awaiting_approval", "current_step": 2},
+            priority="approval"
+        ), None
+
+    def run_drafting_stage(self, workflow_id, goal, findings, job=None):
+        """Run the plan's steps after approval (Communicator Agent etc.); returns (payload, http_status)"""
+        report_progress(job, 0.1, "Drafting supplier emails")
+
+        plan = yield effects.Blocking(self.executable_plan, workflow_id)
+        gates = gate_steps(plan)
+        for number in gates:
+            yield effects.Blocking(
+                self.update_plan_step, workflow_id, number, {"status": "completed", "finished_at": datetime.utcnow().isoformat()}
+            )
+
+        steps = phase_steps(plan, "drafting")
+        context = {
+            "findings": findings,
+            "communicators": [n for n in steps if plan[n - 1]["agent"] == "communicator"],
+            "focus": False
+        }
+        if any(plan[n - 1]["agent"] == "researcher" for n in steps):
+            data_result = yield effects.Blocking(load_suppliers_cached, self.inventory_file, self.sales_file)
+            context["suppliers_data"] = data_result.get("combined_data", {})
+
+        try:
+            summary = yield from self.run_plan_phase(workflow_id, goal, plan, "drafting", context, job)
+        except (JobCancelled, asyncio.CancelledError):
+            for number in gates:
+                yield effects.Blocking(self.update_plan_step, workflow_id, number, {"status": "awaiting_approval", "finished_at": None})
+            raise
+
+        if not summary["success"]:
+            yield effects.Blocking(self.store.update, workflow_id, status="error")
+            return {
+                "error": "Failed to draft emails",
+                "details": summary["error"]
+            }, 500
+
+        report_progress(job, 0.9, "Saving drafts")
+        commit(job)
+        drafted = [summary["outputs"][n]["drafts"] for n in context["communicators"]]
+        yield effects.Blocking(
+            self.save_checkpoint,
+            workflow_id,
+            "drafting",
+            drafts=merge_drafts(drafted) if drafted else {"emails": [], "summary": "No drafting steps in the plan."},
+            status="completed",
+            current_step=4
+        )
+        return (yield effects.Blocking(self.snapshot_answer, workflow_id, "Emails drafted successfully"))
+
+    # Resume
+
+    def claim_resume(self, workflow_id):
+        """
+        (StageRun, None) resuming a failed or interrupted workflow from its first stage
+        without a current checkpoint, or (None, answer) when it can't be resumed or there
+        is nothing to run
+        """
+        state = self.store.get(workflow_id, blobs=("findings",))
+        if not state:
+            return None, ({"error": f"Workflow {workflow_id} not found"}, 404)
+        if state["status"] not in RESUMABLE:
+            return None, ({
+                "error": f"Workflow is {state['status']}; only {', '.join(RESUMABLE)} workflows can be resumed",
+                "workflow_id": workflow_id
+            }, 409)
+
+        stage = first_incomplete(state, self.dataset())
+        if stage in (None, "approval"):
+            # Nothing to run: either finished, or waiting for the manager
+            done = stage is None
+            if self.store.transition(workflow_id, state["status"], status="completed" if done else "awaiting_approval",
+                                     current_step=4 if done else 2) is None:
+                return self.claim_resume(workflow_id)  # Changed meanwhile: decide on the new state
+            payload, status_code = self.snapshot_answer(
+                workflow_id, "Every stage is up to date" if done else "Findings await approval"
+            )
+            payload["resume"] = {"from": stage, "skipped": ["planning", "research", "approval", "drafting"] if done
+                                 else ["planning", "research"]}
+            return None, (payload, status_code)
+
+        rollback = {"status": state["status"], "current_step": state["current_step"]}
+        if self.store.transition(workflow_id, state["status"], status=STAGE_STATUS[stage]) is None:
+            return self.claim_resume(workflow_id)
+        return StageRun(
+            "resume",
+            lambda job: self.run_resume(workflow_id, stage, job),
+            rollback=rollback,
+            priority="research"
+        ), None
+
+    def run_resume(self, workflow_id, stage, job=None):
+        """
+        Run a workflow's stages from `stage` on, skipping each one whose checkpoint is still
+        current; stops at awaiting_approval when the findings need a (new) approval.
+        Returns (payload, http_status).
+        """
+        dataset = self.dataset()
+        goal = (yield effects.Blocking(self.store.get, workflow_id, blobs=()))["goal"]
+        skipped = [] if stage == "planning" else ["planning"]
+
+        def resumed(payload, status_code):
+            payload["resume"] = {"from": stage, "skipped": skipped}
+            return payload, status_code
+
+        if stage == "planning":
+            report_progress(job, 0.05, "Planning")
+            plan_result = yield from self.plan_goal(goal, admit=False)
+            if not plan_result.get('success'):
+                yield effects.Blocking(self.store.update, workflow_id, status="error")
+                return resumed({
+                    "error": "Failed to create plan",
+                    "details": plan_result.get('error', 'Unknown error'),
+                    "workflow_id": workflow_id
+                }, 500)
+            yield effects.Blocking(self.save_checkpoint, workflow_id, "planning", plan=plan_result["plan"],
+                                   degraded=plan_result.get("degraded", False), status="planned")
+
+        state = yield effects.Blocking(self.store.get, workflow_id, blobs=("findings",))
+        if is_current(state, "research", dataset):
+            skipped.append("research")
+        else:
+            yield effects.Blocking(self.store.update, workflow_id, status="researching", current_step=1)
+            payload, status_code = yield from self.run_research_stage(workflow_id, goal, job)
+            if status_code >= 400:
+                return resumed(payload, status_code)
+            state = yield effects.Blocking(self.store.get, workflow_id, blobs=("findings",))
+
+        if not is_current(state, "approval", dataset):
+            yield effects.Blocking(self.store.update, workflow_id, status="awaiting_approval", current_step=2)
+            researched = "Research is up to date" if "research" in skipped else "Research re-run"
+            return resumed(*(yield effects.Blocking(
+                self.snapshot_answer, workflow_id, f"{researched}; findings await approval"
+            )))
+        skipped.append("approval")
+
+        if is_current(state, "drafting", dataset):
+            skipped.append("drafting")
+            yield effects.Blocking(self.store.update, workflow_id, status="completed", current_step=4)
+            return resumed(*(yield effects.Blocking(self.snapshot_answer, workflow_id, "Every stage is up to date")))
+
+        yield effects.Blocking(self.store.update, workflow_id, status="drafting", current_step=3)
+        return resumed(*(yield from self.run_drafting_stage(workflow_id, goal, state["findings"], job)))
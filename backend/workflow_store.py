@@ -0,0 +1,549 @@
+"""
+Workflow Store - Keyed, thread-safe storage for concurrent workflows
+
+Each workflow (one manager goal) lives under its own ID with its own lock, so several
+managers can run workflows side by side without overwriting each other's state.
+
+Every update bumps the workflow's version and records which fields changed at that
+version, so clients can revalidate with an ETag or fetch only what changed since the
+version they hold. Listeners registered with add_listener() see every change in order
+(the progress stream is fed this way).
+
+Stages left running by a shutdown are rolled back by recover_interrupted(), which each
+orchestrator registers as a startup task (see service_health): it runs once per start,
+before any worker serves. Opening a store never recovers: to a second process, a stage another
+process is still running looks exactly like an interrupted one.
+
+Two implementations share one interface:
+    SQLiteWorkflowStore  Persistent (default). SQLite in WAL mode; large fields are kept
+                         in a separate table and only read when a caller asks for them,
+                         so memory stays flat as workflows accumulate and restarts keep
+                         every workflow.
+    WorkflowStore        In-process dict, lost on restart.
+
+Configuration:
+    WORKFLOW_STORE      'sqlite' (default) or 'memory'
+    WORKFLOW_DB_PATH    SQLite database file (default: data/workflows.sqlite3)
+"""
+import copy
+import hashlib
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from response_codec import dumps_text, loads
+
+# Fields that are never mutated after being set; snapshots share them instead of copying
+READ_ONLY_FIELDS = ("suppliers_data",)
+
+# Large fields stored apart from the workflow row and loaded on demand
+BLOB_FIELDS = ("findings", "drafts", "suppliers_data")
+
+# Stages interrupted by a restart go back to the state before the stage started
+INTERRUPTED_ROLLBACK = {
+    "planning": {"status": "error"},
+    "researching": {"status": "planned", "current_step": 0},
+    "drafting": {"status": "awaiting_approval", "current_step": 2}
+}
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'workflows.sqlite3')
+
+
+def new_workflow_state(workflow_id: Optional[str] = None, goal: Optional[str] = None) -> Dict[str, Any]:
+    """Return a fresh workflow state dict"""
+    return {
+        "workflow_id": workflow_id,
+        "goal": goal,
+        "status": "idle",  # idle, planning, researching, reviewing, drafting, completed
+        "current_step": 0,
+        "plan": [],
+        "findings": None,
+        "drafts": None,
+        "suppliers_data": None,
+        "job_id": None,  # Most recent background job for this workflow
+        "degraded": False,  # The plan is the planner's canned fallback (Claude was unavailable)
+        "checkpoints": {},  # Stage -> hash of the inputs it last succeeded on (see checkpoints.py)
+        "version": 0,  # Bumped on every update
+        "created_at": datetime.utcnow().isoformat(),
+        "updated_at": datetime.utcnow().isoformat()
+    }
+
+
+def dataset_reference(inventory_path: str, sales_path: str, combined_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    What a workflow keeps about the dataset it was researched on: file paths and row
+    counts, not the rows themselves (those can be reloaded from the files)
+    """
+    return {
+        "inventory_file": os.path.abspath(inventory_path),
+        "sales_file": os.path.abspath(sales_path),
+        "inventory_count": combined_data.get("inventory_count", len(combined_data.get("inventory", []))),
+        "sales_count": combined_data.get("sales_count", len(combined_data.get("sales", [])))
+    }
+
+
+class _ChangeListeners:
+    """Callbacks run after every change, under the workflow's lock so they see changes in order"""
+
+    def add_listener(self, listener: Callable[[str, Optional[int], Optional[Dict[str, Any]]], None]):
+        """listener(workflow_id, version, changed_fields); version and fields are None on delete"""
+        self._listeners.append(listener)
+
+    def _notify(self, workflow_id: str, version: Optional[int], changes: Optional[Dict[str, Any]]):
+        for listener in self._listeners:
+            try:
+                listener(workflow_id, version, changes)
+            except Exception as e:
+                print(f"[STORE] Change listener failed for {workflow_id}: {e}")
+
+
+class WorkflowStore(_ChangeListeners):
+    """In-memory workflow store with a per-workflow lock"""
+
+    def __init__(self):
+        self._listeners: List[Callable] = []
+        self._workflows: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, threading.RLock] = {}
+        self._field_versions: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, goal: str) -> Dict[str, Any]:
+        """Create a new workflow and return its state"""
+        workflow_id = str(uuid.uuid4())
+        state = new_workflow_state(workflow_id, goal)
+        state["version"] = 1
+        with self._lock:
+            self._workflows[workflow_id] = state
+            self._locks[workflow_id] = threading.RLock()
+            self._field_versions[workflow_id] = dict.fromkeys(state, 1)
+        self._notify(workflow_id, 1, dict(state))
+        return state
+
+    def exists(self, workflow_id: Optional[str]) -> bool:
+        with self._lock:
+            return workflow_id in self._workflows
+
+    def lock(self, workflow_id: str) -> threading.RLock:
+        """Per-workflow lock; hold it while reading-then-writing a workflow's state"""
+        with self._lock:
+            if workflow_id not in self._locks:
+                raise KeyError(workflow_id)
+            return self._locks[workflow_id]
+
+    def get(self, workflow_id: str, blobs: Iterable[str] = BLOB_FIELDS) -> Optional[Dict[str, Any]]:
+        """Live state dict for a workflow (mutate only while holding its lock); blobs is a hint"""
+        with self._lock:
+            return self._workflows.get(workflow_id)
+
+    def update(self, workflow_id: str, **fields) -> Optional[Dict[str, Any]]:
+        """Update fields of a workflow under its lock and return the live state (None if it was deleted)"""
+        try:
+            lock = self.lock(workflow_id)
+        except KeyError:
+            return None
+        with lock:
+            state = self._workflows.get(workflow_id)
+            if state is None:
+                return None
+            state.update(fields)
+            state["updated_at"] = datetime.utcnow().isoformat()
+            state["version"] += 1
+            field_versions = self._field_versions[workflow_id]
+            for key in (*fields, "updated_at", "version"):
+                field_versions[key] = state["version"]
+            self._notify(workflow_id, state["version"], {
+                **fields, "updated_at": state["updated_at"], "version": state["version"]
+            })
+            return state
+
+    def transition(self, workflow_id: str, expect_status: str, **fields) -> Optional[Dict[str, Any]]:
+        """
+        Update fields only if the workflow's status is still expect_status, atomically;
+        returns the live state, or None when the status had moved on (or the workflow is gone)
+        """
+        try:
+            lock = self.lock(workflow_id)
+        except KeyError:
+            return None
+        with lock:
+            if self._workflows[workflow_id]["status"] != expect_status:
+                return None
+            return self.update(workflow_id, **fields)
+
+    def version(self, workflow_id: str) -> Optional[int]:
+        """Current version of a workflow, or None if unknown"""
+        with self._lock:
+            state = self._workflows.get(workflow_id)
+            return state["version"] if state else None
+
+    def changes(self, workflow_id: str, since: int) -> Optional[Dict[str, Any]]:
+        """Copies of the fields updated after version `since`, plus the current version"""
+        try:
+            lock = self.lock(workflow_id)
+        except KeyError:
+            return None
+        with lock:
+            state = self._workflows[workflow_id]
+            changed = [key for key, version in self._field_versions[workflow_id].items() if version > since]
+            return {
+                "version": state["version"],
+                "changes": {
+                    key: state[key] if key in READ_ONLY_FIELDS else copy.deepcopy(state[key])
+                    for key in changed
+                }
+            }
+
+    def snapshot(self, workflow_id: str, blobs: Iterable[str] = BLOB_FIELDS) -> Optional[Dict[str, Any]]:
+        """Consistent deep copy of a workflow's state, with only the requested large fields"""
+        try:
+            lock = self.lock(workflow_id)
+        except KeyError:
+            return None
+        skipped = set(BLOB_FIELDS) - set(blobs)
+        with lock:
+            state = self._workflows.get(workflow_id)
+            if state is None:
+                return None
+            return {
+                key: value if key in READ_ONLY_FIELDS else copy.deepcopy(value)
+                for key, value in state.items()
+                if key not in skipped
+            }
+
+    def rollback_interrupted(self) -> int:
+        """Nothing outlives the process, so there is never anything to roll back"""
+        return 0
+
+    def delete(self, workflow_id: str) -> bool:
+        with self._lock:
+            removed = self._workflows.pop(workflow_id, None) is not None
+            self._locks.pop(workflow_id, None)
+            self._field_versions.pop(workflow_id, None)
+        if removed:
+            self._notify(workflow_id, None, None)
+        return removed
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Lightweight summaries of all workflows, newest first"""
+        with self._lock:
+            states = list(self._workflows.values())
+        return [
+            {
+                "workflow_id": state["workflow_id"],
+                "goal": state["goal"],
+                "status": state["status"],
+                "current_step": state["current_step"],
+                "created_at": state["created_at"],
+                "updated_at": state["updated_at"]
+            }
+            for state in reversed(states)
+        ]
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._workflows)
+
+
+class SQLiteWorkflowStore(_ChangeListeners):
+    """Persistent workflow store: one row per workflow, large fields in a side table"""
+
+    # Columns kept on the workflow row; every other small field goes in its JSON 'data' column
+    COLUMNS = ("workflow_id", "goal", "status", "current_step", "job_id", "version", "created_at", "updated_at")
+    LOCK_STRIPES = 64
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = os.path.abspath(path or os.getenv('WORKFLOW_DB_PATH', DEFAULT_DB_PATH))
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._local = threading.local()
+        self._listeners: List[Callable] = []
+        # Striped locks keep memory constant however many workflows exist
+        self._locks = [threading.RLock() for _ in range(self.LOCK_STRIPES)]
+        self._init_schema()
+        if hasattr(os, "register_at_fork"):
+            # A worker forked from a preloading server must not reuse the parent's connections
+            os.register_at_fork(after_in_child=self._reset_connections)
+
+    def _reset_connections(self):
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections are not shared across threads)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS workflows (
+                workflow_id TEXT PRIMARY KEY,
+                goal TEXT,
+                status TEXT NOT NULL,
+                current_step INTEGER NOT NULL DEFAULT 0,
+                job_id TEXT,
+                version INTEGER NOT NULL DEFAULT 0,
+                field_versions TEXT NOT NULL DEFAULT '{}',
+                data TEXT NOT NULL DEFAULT '{}',
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS workflow_blobs (
+                workflow_id TEXT NOT NULL,
+                field TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (workflow_id, field)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS workflows_status ON workflows (status);
+        """)
+        # Databases created before versioning get the columns added in place
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(workflows)")}
+        if "version" not in existing:
+            conn.execute("ALTER TABLE workflows ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        if "field_versions" not in existing:
+            conn.execute("ALTER TABLE workflows ADD COLUMN field_versions TEXT NOT NULL DEFAULT '{}'")
+
+    def rollback_interrupted(self) -> int:
+        """Roll back every stage marked as running (see recover_interrupted); returns how many"""
+        recovered = 0
+        for status, rollback in INTERRUPTED_ROLLBACK.items():
+            for (workflow_id,) in self._conn().execute(
+                "SELECT workflow_id FROM workflows WHERE status = ?", (status,)
+            ).fetchall():
+                self.update(workflow_id, job_id=None, **rollback)
+                recovered += 1
+        return recovered
+
+    def create(self, goal: str) -> Dict[str, Any]:
+        """Create a new workflow and return its state"""
+        state = new_workflow_state(str(uuid.uuid4()), goal)
+        state["version"] = 1
+        self._write(state["workflow_id"], state, insert=True)
+        self._notify(state["workflow_id"], 1, dict(state))
+        return state
+
+    def exists(self, workflow_id: Optional[str]) -> bool:
+        if not workflow_id:
+            return False
+        return self._conn().execute(
+            "SELECT 1 FROM workflows WHERE workflow_id = ?", (workflow_id,)
+        ).fetchone() is not None
+
+    def lock(self, workflow_id: str) -> threading.RLock:
+        """Per-workflow lock; hold it while reading-then-writing a workflow's state"""
+        if not self.exists(workflow_id):
+            raise KeyError(workflow_id)
+        digest = hashlib.blake2b(workflow_id.encode(), digest_size=2).digest()
+        return self._locks[int.from_bytes(digest, "big") % self.LOCK_STRIPES]
+
+    def get(self, workflow_id: str, blobs: Iterable[str] = BLOB_FIELDS) -> Optional[Dict[str, Any]]:
+        """
+        Load a workflow's state
+        
+        Args:
+            workflow_id: Workflow to load
+            blobs: Which large fields (see BLOB_FIELDS) to read; pass () for just the row
+        
+        Returns:
+            A detached state dict (change it with update()), or None if unknown
+        """
+        conn = self._conn()
+        row = conn.execute(
+            f"SELECT {', '.join(self.COLUMNS)}, data FROM workflows WHERE workflow_id = ?",
+            (workflow_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        state = dict(zip(self.COLUMNS, row[:-1]))
+        state.update(loads(row[-1]))
+
+        blobs = [field for field in blobs if field in BLOB_FIELDS]
+        if blobs:
+            for field in blobs:
+                state[field] = None
+            placeholders = ", ".join("?" for _ in blobs)
+            for field, value in conn.execute(
+                f"SELECT field, value FROM workflow_blobs WHERE workflow_id = ? AND field IN ({placeholders})",
+                (workflow_id, *blobs)
+            ):
+                state[field] = loads(value)
+        return state
+
+    def update(self, workflow_id: str, **fields) -> Optional[Dict[str, Any]]:
+        """
+        Update fields of a workflow under its lock and return its state (without large
+        fields), or None if the workflow was deleted (e.g. reset while a stage ran)
+        """
+        if not self.exists(workflow_id):
+            return None
+        with self.lock(workflow_id):
+            fields["updated_at"] = datetime.utcnow().isoformat()
+            fields.pop("version", None)
+            if not self._write(workflow_id, fields):
+                return None
+            state = self.get(workflow_id, blobs=())
+            self._notify(workflow_id, state["version"], {**fields, "version": state["version"]})
+            return state
+
+    def transition(self, workflow_id: str, expect_status: str, **fields) -> Optional[Dict[str, Any]]:
+        """
+        Update fields only if the workflow's status is still expect_status; returns its state
+        (without large fields), or None when the status had moved on (or the workflow is gone)
+
+        The check is part of the UPDATE itself (WHERE status = ?), so it holds across
+        processes sharing the database, not just across this process's threads.
+        """
+        if not self.exists(workflow_id):
+            return None
+        with self.lock(workflow_id):
+            fields["updated_at"] = datetime.utcnow().isoformat()
+            fields.pop("version", None)
+            if not self._write(workflow_id, fields, expect_status=expect_status):
+                return None
+            state = self.get(workflow_id, blobs=())
+            self._notify(workflow_id, state["version"], {**fields, "version": state["version"]})
+            return state
+
+    def _write(self, workflow_id: str, fields: Dict[str, Any], insert: bool = False,
+               expect_status: Optional[str] = None) -> bool:
+        """Write fields in one transaction; False (nothing written) if the row is gone or not in expect_status"""
+        columns = {key: value for key, value in fields.items() if key in self.COLUMNS}
+        blobs = {key: value for key, value in fields.items() if key in BLOB_FIELDS}
+        data = {key: value for key, value in fields.items() if key not in self.COLUMNS and key not in BLOB_FIELDS}
+
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if insert:
+                names = list(columns) + ["field_versions", "data"]
+                conn.execute(
+                    f"INSERT INTO workflows ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)})",
+                    (*columns.values(), dumps_text(dict.fromkeys(fields, columns["version"])), dumps_text(data))
+                )
+            else:
+                row = conn.execute(
+                    "SELECT version, field_versions, data FROM workflows WHERE workflow_id = ?", (workflow_id,)
+                ).fetchone()
+                if row is None:
+                    conn.execute("ROLLBACK")
+                    return False
+                version, field_versions, current = row
+                version += 1
+                columns["version"] = version
+                columns["field_versions"] = dumps_text({
+                    **loads(field_versions), **dict.fromkeys([*fields, "version"], version)
+                })
+                if data:
+                    columns["data"] = dumps_text({**loads(current), **data})
+                condition, params = "workflow_id = ?", [workflow_id]
+                if expect_status is not None:
+                    condition, params = condition + " AND status = ?", params + [expect_status]
+                updated = conn.execute(
+                    f"UPDATE workflows SET {', '.join(f'{name} = ?' for name in columns)} WHERE {condition}",
+                    (*columns.values(), *params)
+                ).rowcount
+                if not updated:
+                    conn.execute("ROLLBACK")
+                    return False
+            for field, value in blobs.items():
+                if value is None:
+                    conn.execute("DELETE FROM workflow_blobs WHERE workflow_id = ? AND field = ?", (workflow_id, field))
+                else:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO workflow_blobs (workflow_id, field, value) VALUES (?, ?, ?)",
+                        (workflow_id, field, dumps_text(value))
+                    )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return True
+
+    def version(self, workflow_id: str) -> Optional[int]:
+        """Current version of a workflow, or None if unknown"""
+        row = self._conn().execute("SELECT version FROM workflows WHERE workflow_id = ?", (workflow_id,)).fetchone()
+        return row[0] if row else None
+
+    def changes(self, workflow_id: str, since: int) -> Optional[Dict[str, Any]]:
+        """The fields updated after version `since`, plus the current version; unchanged blobs are not read"""
+        if not self.exists(workflow_id):
+            return None
+        with self.lock(workflow_id):
+            row = self._conn().execute(
+                "SELECT field_versions FROM workflows WHERE workflow_id = ?", (workflow_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            changed = [key for key, version in loads(row[0]).items() if version > since]
+            state = self.get(workflow_id, blobs=[key for key in changed if key in BLOB_FIELDS])
+            return {
+                "version": state["version"],
+                "changes": {key: state.get(key) for key in changed}
+            }
+
+    def snapshot(self, workflow_id: str, blobs: Iterable[str] = BLOB_FIELDS) -> Optional[Dict[str, Any]]:
+        """Consistent copy of a workflow's state (every get() already returns a fresh copy)"""
+        if not self.exists(workflow_id):
+            return None
+        with self.lock(workflow_id):
+            return self.get(workflow_id, blobs)
+
+    def delete(self, workflow_id: str) -> bool:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            removed = conn.execute("DELETE FROM workflows WHERE workflow_id = ?", (workflow_id,)).rowcount > 0
+            conn.execute("DELETE FROM workflow_blobs WHERE workflow_id = ?", (workflow_id,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if removed:
+            self._notify(workflow_id, None, None)
+        return removed
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Lightweight summaries of all workflows, newest first"""
+        rows = self._conn().execute(
+            "SELECT workflow_id, goal, status, current_step, created_at, updated_at "
+            "FROM workflows ORDER BY rowid DESC"
+        ).fetchall()
+        keys = ("workflow_id", "goal", "status", "current_step", "created_at", "updated_at")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM workflows").fetchone()[0]
+
+
+def open_workflow_store():
+    """Create the store selected by WORKFLOW_STORE"""
+    kind = os.getenv('WORKFLOW_STORE', 'sqlite').lower()
+    if kind == 'memory':
+        print("✓ Workflow store: memory (workflows are lost on restart)")
+        return WorkflowStore()
+    if kind != 'sqlite':
+        raise ValueError(f"Unknown WORKFLOW_STORE '{kind}' (expected 'sqlite' or 'memory')")
+
+    store = SQLiteWorkflowStore()
+    print(f"✓ Workflow store: sqlite ({store.path}, {store.count()} workflows)")
+    return store
+
+
+def recover_interrupted(store) -> int:
+    """
+    Roll back the stages interrupted by the last shutdown (see INTERRUPTED_ROLLBACK)
+
+    Call once per start, from the serving entrypoint, before any worker serves requests:
+    a stage running in another worker would be rolled back too.
+    """
+    recovered = store.rollback_interrupted()
+    if recovered:
+        print(f"⚠ Rolled back {recovered} workflow stage(s) interrupted by the last shutdown")
+    return recovered
@@ -33,7 +33,11 @@ type VoiceEvent = {
   voice_url?: string;
 };
 
-type StreamEvent = Notification | VoiceEvent | { type: 'keepalive' | 'connected' };
+type StreamEvent =
+  | Notification
+  | VoiceEvent
+  | { type: 'keepalive' | 'connected' | 'resync' }
+  | { type: 'dropped'; count: number };
 
 const resolveVoiceUrl = (url: string | null | undefined, id?: string) => {
   if (!url && !id) {
@@ -74,10 +78,34 @@ export function NotificationCenter() {
   const [isConnected, setIsConnected] = useState(false);
   const audioRef = useRef<HTMLAudioElement | null>(null);
   const eventSourceRef = useRef<EventSource | null>(null);
+  const lastEventIdRef = useRef<string | null>(null);
+
+  const loadHistory = (autoPlay: boolean) => {
+    fetch(`${SERVICE_URL}/api/notifications/history?limit=${MAX_NOTIFICATIONS}`)
+      .then((res) => (res.ok ? res.json() : Promise.reject(new Error(res.statusText))))
+      .then((data) => {
+        const history = Array.isArray(data?.history) ? data.history : [];
+        const normalized = history.map((item: any) => normalizeNotification(item));
+        setNotifications(normalized);
+        setUnreadCount(normalized.length);
+
+        const urgent = normalized.find(
+          (n) => n.voice_available && (n.priority === 'high' || n.priority === 'critical')
+        );
+        if (autoPlay && urgent) {
+          setTimeout(() => playVoice(urgent, true), 1000);
+        }
+      })
+      .catch((err) => console.error('Failed to load notification history', err));
+  };
 
   useEffect(() => {
     const connect = () => {
-      const source = new EventSource(`${SERVICE_URL}/api/notifications/stream`);
+      // Reconnects resume after the last event seen; the server replays what was missed
+      const resumeFrom = lastEventIdRef.current
+        ? `?last_event_id=${encodeURIComponent(lastEventIdRef.current)}`
+        : '';
+      const source = new EventSource(`${SERVICE_URL}/api/notifications/stream${resumeFrom}`);
 
       source.onopen = () => {
         setIsConnected(true);
@@ -88,6 +116,10 @@ export function NotificationCenter() {
           return;
         }
 
+        if (event.lastEventId) {
+          lastEventIdRef.current = event.lastEventId;
+        }
+
         let payload: StreamEvent;
         try {
           payload = JSON.parse(event.data);
@@ -104,6 +136,17 @@ export function NotificationCenter() {
           return;
         }
 
+        if ('type' in payload && payload.type === 'resync') {
+          // Missed events are no longer kept on the server
+          loadHistory(false);
+          return;
+        }
+
+        if ('type' in payload && payload.type === 'dropped') {
+          console.warn(`Notification stream fell behind; ${(payload as { count: number }).count} events skipped`);
+          return;
+        }
+
         if ('type' in payload && payload.type === 'voice_ready') {
           const voiceEvent = payload as VoiceEvent;
           const voiceUrl = resolveVoiceUrl(voiceEvent.voice_url, voiceEvent.notification_id);
@@ -162,22 +205,7 @@ export function NotificationCenter() {
   }, []);
 
   useEffect(() => {
-    fetch(`${SERVICE_URL}/api/notifications/history?limit=${MAX_NOTIFICATIONS}`)
-      .then((res) => (res.ok ? res.json() : Promise.reject(new Error(res.statusText))))
-      .then((data) => {
-        const history = Array.isArray(data?.history) ? data.history : [];
-        const normalized = history.map((item: any) => normalizeNotification(item));
-        setNotifications(normalized);
-        setUnreadCount(normalized.length);
-
-        const urgent = normalized.find(
-          (n) => n.voice_available && (n.priority === 'high' || n.priority === 'critical')
-        );
-        if (urgent) {
-          setTimeout(() => playVoice(urgent, true), 1000);
-        }
-      })
-      .catch((err) => console.error('Failed to load notification history', err));
+    loadHistory(true);
   }, []);
 
   const showToast = (notification: Notification) => {
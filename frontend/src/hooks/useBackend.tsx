@@ -1,11 +1,13 @@
 import { useState, useEffect, useCallback } from 'react';
-import { getState, submitGoal, executeResearch, approveFindings, resetWorkflow, BackendState } from '@/lib/backendApi';
+import { getState, submitGoal, executeResearch, approveFindings, resetWorkflow, subscribeToWorkflow, BackendState } from '@/lib/backendApi';
 import { toast } from '@/hooks/use-toast';
 
 export function useBackend() {
   const [state, setState] = useState<BackendState | null>(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  // True while the server is pushing updates, so polling can stop
+  const [streaming, setStreaming] = useState(false);
 
   // Fetch current state
   const fetchState = useCallback(async () => {
@@ -129,10 +131,28 @@ export function useBackend() {
     fetchState();
   }, [fetchState]);
 
+  // Follow the current workflow over server-sent events
+  const workflowId = state?.workflow_id;
+  useEffect(() => {
+    if (!workflowId || typeof EventSource === 'undefined') return;
+    const close = subscribeToWorkflow(workflowId, {
+      onState: (pushed) => {
+        setState(pushed);
+        setStreaming(true);
+      },
+      onError: () => setStreaming(false),
+    });
+    return () => {
+      close();
+      setStreaming(false);
+    };
+  }, [workflowId]);
+
   return {
     state,
     loading,
     error,
+    streaming,
     fetchState,
     submitGoal: handleSubmitGoal,
     executeResearch: handleExecuteResearch,
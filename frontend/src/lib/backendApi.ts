@@ -3,15 +3,196 @@
 
 import { API_BASE_URL, apiFetch } from './apiConfig';
 
+// One planner step; the orchestrator runs the plan as a DAG and records status and timings
+export interface PlanStep {
+  step_number: number;
+  title: string;
+  description: string;
+  agent?: 'researcher' | 'manager' | 'communicator' | 'reporter' | 'none';
+  depends_on?: number[];
+  status: 'pending' | 'running' | 'completed' | 'failed' | 'skipped' | 'awaiting_approval' | 'rejected';
+  started_at?: string | null;
+  finished_at?: string | null;
+  duration_ms?: number | null;
+  error?: string | null;
+  report?: string;
+}
+
 // Backend State Interface
 export interface BackendState {
+  workflow_id?: string | null;
   goal: string | null;
   status: 'idle' | 'planning' | 'planned' | 'researching' | 'awaiting_approval' | 'reviewing' | 'rejected' | 'drafting' | 'completed' | 'error';
   current_step: number;
-  plan: string[];
+  plan: Array<string | PlanStep>;
   findings: any;
   drafts: any;
   suppliers_data: any;
+  suppliers_count?: number;
+  version?: number;
+}
+
+// Delta response from /api/state?since=<version>
+interface BackendStateDelta {
+  workflow_id: string;
+  version: number;
+  since: number;
+  changes: Partial<BackendState>;
+}
+
+// Workflow tracking: each submitted goal gets its own workflow on the orchestrator
+const WORKFLOW_ID_KEY = 'serica.workflowId';
+
+let currentWorkflowId: string | null = localStorage.getItem(WORKFLOW_ID_KEY);
+
+function setWorkflowId(workflowId: string | null) {
+  currentWorkflowId = workflowId;
+  if (workflowId) {
+    localStorage.setItem(WORKFLOW_ID_KEY, workflowId);
+  } else {
+    localStorage.removeItem(WORKFLOW_ID_KEY);
+  }
+}
+
+/**
+ * Append the current workflow ID to an endpoint URL
+ */
+function withWorkflow(url: string): string {
+  return currentWorkflowId ? `${url}?workflow_id=${encodeURIComponent(currentWorkflowId)}` : url;
+}
+
+// Last state received, so polls can revalidate (304) or fetch only what changed
+let cachedState: BackendState | null = null;
+let cachedStateEtag: string | null = null;
+
+/**
+ * Fetch /api/state, revalidating against the cached copy for the current workflow
+ */
+async function fetchState(): Promise<BackendState> {
+  const cached = cachedState && currentWorkflowId && cachedState.workflow_id === currentWorkflowId ? cachedState : null;
+  let url = withWorkflow(`${API_BASE_URL}/api/state`);
+  if (cached?.version) {
+    url += `&since=${cached.version}`;
+  }
+
+  const response = await fetch(url, {
+    method: 'GET',
+    headers: {
+      'Accept': 'application/json',
+      ...(cached && cachedStateEtag ? { 'If-None-Match': cachedStateEtag } : {}),
+    },
+  });
+
+  if (response.status === 304 && cached) {
+    // Same object, so React skips the re-render
+    return cached;
+  }
+  if (!response.ok) {
+    const errorData = await response.json().catch(() => ({}));
+    throw new Error(errorData.error || errorData.message || `HTTP ${response.status}: ${response.statusText}`);
+  }
+
+  const body: BackendState | BackendStateDelta = await response.json();
+  const state = 'changes' in body && cached ? { ...cached, ...body.changes, version: body.version } : (body as BackendState);
+  cachedState = state;
+  cachedStateEtag = response.headers.get('ETag');
+  return state;
+}
+
+/**
+ * State of a workflow that has not been submitted yet (what the orchestrator reports without an ID)
+ */
+function idleState(): BackendState {
+  return {
+    workflow_id: null,
+    goal: null,
+    status: 'idle',
+    current_step: 0,
+    plan: [],
+    findings: null,
+    drafts: null,
+    suppliers_data: null,
+    version: 0,
+  };
+}
+
+export function getWorkflowId(): string | null {
+  return currentWorkflowId;
+}
+
+// Background job returned by long stages (202 Accepted)
+export interface BackendJob {
+  job_id: string;
+  kind: string;
+  workflow_id: string | null;
+  status: 'queued' | 'running' | 'succeeded' | 'failed' | 'cancelling' | 'cancelled';
+  progress: number;
+  message: string;
+  result: any;
+  error: string | null;
+}
+
+const JOB_POLL_INTERVAL_MS = 1000;
+
+/**
+ * Poll a background job until it finishes and return its result
+ */
+export async function waitForJob<T>(jobId: string): Promise<T> {
+  for (;;) {
+    const job = await apiFetch<BackendJob>(`${API_BASE_URL}/api/jobs/${jobId}`, { method: 'GET' });
+    if (job.status === 'succeeded') {
+      return job.result as T;
+    }
+    if (job.status === 'failed' || job.status === 'cancelled') {
+      throw new Error(job.error || job.message);
+    }
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+  }
+}
+
+export interface WorkflowStreamHandlers {
+  onState: (state: BackendState) => void;
+  onJob?: (job: BackendJob) => void;
+  onError?: () => void;
+}
+
+/**
+ * Follow a workflow's progress over server-sent events; returns a function that closes the stream.
+ * EventSource reconnects by itself and resumes with Last-Event-ID, so no events are missed.
+ */
+export function subscribeToWorkflow(workflowId: string, handlers: WorkflowStreamHandlers): () => void {
+  const source = new EventSource(`${API_BASE_URL}/api/workflows/${encodeURIComponent(workflowId)}/events`);
+
+  source.addEventListener('snapshot', (event) => {
+    cachedState = JSON.parse((event as MessageEvent).data);
+    cachedStateEtag = null;
+    handlers.onState(cachedState as BackendState);
+  });
+  source.addEventListener('state', (event) => {
+    const delta: BackendStateDelta = JSON.parse((event as MessageEvent).data);
+    if (!cachedState || cachedState.workflow_id !== delta.workflow_id || (cachedState.version ?? 0) >= delta.version) {
+      return;
+    }
+    cachedState = { ...cachedState, ...delta.changes, version: delta.version };
+    cachedStateEtag = null;
+    handlers.onState(cachedState);
+  });
+  source.addEventListener('job', (event) => {
+    handlers.onJob?.(JSON.parse((event as MessageEvent).data));
+  });
+  source.addEventListener('deleted', () => source.close());
+  source.onerror = () => handlers.onError?.();
+
+  return () => source.close();
+}
+
+/**
+ * Cancel a background job
+ */
+export async function cancelJob(jobId: string): Promise<{ message: string; job: BackendJob }> {
+  return apiFetch(`${API_BASE_URL}/api/jobs/${jobId}/cancel`, {
+    method: 'POST',
+  });
 }
 
 // API Functions
@@ -20,45 +201,63 @@ export interface BackendState {
  * Get current workflow state
  */
 export async function getState(): Promise<BackendState> {
-  return apiFetch<BackendState>(`${API_BASE_URL}/api/state`, {
-    method: 'GET',
-  });
+  if (!currentWorkflowId) {
+    return idleState();
+  }
+  try {
+    return await fetchState();
+  } catch (err) {
+    // The orchestrator no longer knows our workflow (e.g. it restarted): start over
+    if (err instanceof Error && err.message.includes('not found')) {
+      setWorkflowId(null);
+      cachedState = null;
+      cachedStateEtag = null;
+      return idleState();
+    }
+    throw err;
+  }
 }
 
 /**
  * Submit a new procurement goal
  */
-export async function submitGoal(goal: string): Promise<{ message: string; state: BackendState }> {
-  return apiFetch(`${API_BASE_URL}/api/submit-goal`, {
+export async function submitGoal(goal: string): Promise<{ message: string; workflow_id: string; state: BackendState }> {
+  const result = await apiFetch<{ message: string; workflow_id: string; state: BackendState }>(`${API_BASE_URL}/api/submit-goal`, {
     method: 'POST',
     body: JSON.stringify({ goal }),
   });
+  setWorkflowId(result.workflow_id);
+  return result;
 }
 
 /**
  * Execute research phase
  */
 export async function executeResearch(): Promise<{ message: string; state: BackendState }> {
-  return apiFetch(`${API_BASE_URL}/api/execute-research`, {
+  const accepted = await apiFetch<{ job: BackendJob }>(`${API_BASE_URL}/api/execute-research`, {
     method: 'POST',
+    body: JSON.stringify({ workflow_id: currentWorkflowId }),
   });
+  return waitForJob(accepted.job.job_id);
 }
 
 /**
  * Approve or reject findings
  */
 export async function approveFindings(approved: boolean): Promise<{ message: string; state: BackendState }> {
-  return apiFetch(`${API_BASE_URL}/api/approve-findings`, {
+  const result = await apiFetch<{ message: string; state: BackendState; job?: BackendJob }>(`${API_BASE_URL}/api/approve-findings`, {
     method: 'POST',
-    body: JSON.stringify({ approved }),
+    body: JSON.stringify({ workflow_id: currentWorkflowId, approved }),
   });
+  // Approval starts a drafting job; rejection answers immediately
+  return result.job ? waitForJob(result.job.job_id) : result;
 }
 
 /**
  * Get voice report
  */
 export async function getVoiceReport(): Promise<Blob> {
-  const response = await fetch(`${API_BASE_URL}/api/get-voice-report`, {
+  const response = await fetch(withWorkflow(`${API_BASE_URL}/api/get-voice-report`), {
     method: 'GET',
   });
   
@@ -73,7 +272,7 @@ export async function getVoiceReport(): Promise<Blob> {
  * Get text report
  */
 export async function getTextReport(): Promise<{ report: string }> {
-  return apiFetch(`${API_BASE_URL}/api/get-text-report`, {
+  return apiFetch(withWorkflow(`${API_BASE_URL}/api/get-text-report`), {
     method: 'GET',
   });
 }
@@ -82,9 +281,15 @@ export async function getTextReport(): Promise<{ report: string }> {
  * Reset workflow
  */
 export async function resetWorkflow(): Promise<{ message: string; state: BackendState }> {
-  return apiFetch(`${API_BASE_URL}/api/reset`, {
+  if (!currentWorkflowId) {
+    return { message: 'Workflow reset', state: idleState() };
+  }
+  const result = await apiFetch<{ message: string; state: BackendState }>(`${API_BASE_URL}/api/reset`, {
     method: 'POST',
+    body: JSON.stringify({ workflow_id: currentWorkflowId }),
   });
+  setWorkflowId(null);
+  return result;
 }
 
 /**
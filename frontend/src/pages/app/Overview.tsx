@@ -116,17 +116,17 @@ export default function Overview() {
   );
   
   // Use real backend
-  const { state, loading, submitGoal, executeResearch, approveFindings, resetWorkflow, fetchState } = useBackend();
+  const { state, loading, streaming, submitGoal, executeResearch, approveFindings, resetWorkflow, fetchState } = useBackend();
 
-  // Auto-refresh state every 3 seconds when workflow is active
+  // Updates are pushed by the server; poll every 3 seconds only while the stream is down
   useEffect(() => {
-    if (state && state.status !== 'idle' && state.status !== 'completed') {
+    if (!streaming && state && state.status !== 'idle' && state.status !== 'completed') {
       const interval = setInterval(() => {
         fetchState();
       }, 3000);
       return () => clearInterval(interval);
     }
-  }, [state, fetchState]);
+  }, [state, streaming, fetchState]);
 
   useEffect(() => {
     const status = state?.status;
@@ -301,6 +301,7 @@ export default function Overview() {
           title: step,
           description: step,
           rawStatus: undefined,
+          durationMs: undefined,
         };
       }
 
@@ -310,6 +311,7 @@ export default function Overview() {
         title: record.title ?? record.description ?? `Step ${index + 1}`,
         description: record.description ?? record.title ?? '',
         rawStatus: record.status,
+        durationMs: typeof record.duration_ms === 'number' ? record.duration_ms : undefined,
       };
     });
   }, [state?.plan]);
@@ -323,7 +325,20 @@ export default function Overview() {
 
   const isBlocked = state?.status === 'error' || state?.status === 'rejected';
 
+  // Plans run as a DAG report each step's own status; older plans only have current_step
+  const hasStepStatuses = planSteps.some(step => step.rawStatus && step.rawStatus !== 'pending');
+
   const getStepVisualState = (index: number) => {
+    if (hasStepStatuses) {
+      switch (planSteps[index]?.rawStatus) {
+        case 'completed': return 'completed';
+        case 'running': return 'active';
+        case 'failed':
+        case 'rejected': return 'blocked';
+        case 'awaiting_approval': return 'pending';
+        default: return 'upcoming';
+      }
+    }
     if (state?.status === 'completed') return 'completed';
     if (isBlocked && index === derivedStepIndex) return 'blocked';
     if (derivedStepIndex === -1) return 'upcoming';
@@ -606,6 +621,7 @@ export default function Overview() {
                             <div>
                               <p className="text-xs font-semibold uppercase tracking-wide text-muted-foreground">
                                 Step {step.number}
+                                {step.durationMs !== undefined && ` · ${(step.durationMs / 1000).toFixed(1)}s`}
                               </p>
                               <p className="text-sm font-semibold text-foreground">
                                 {step.title}